@@ -107,20 +107,74 @@ def _setup_daemon_io():
 # Set up I/O FIRST before any other imports (which might print)
 _setup_daemon_io()
 
+# ============================================================================
+# TORCH-FREE SERVING MODE
+# ============================================================================
+# Inference already runs on ONNX Runtime - torch was only pulled in by
+# sentence-transformers, thread control and CUDA cleanup. In torch-free mode
+# the bundled model is served with onnxruntime + tokenizers + numpy and
+# `import torch` never happens (saves hundreds of MB RSS and seconds of
+# cold-start import time).
+#
+# SPECMEM_TORCH_FREE:
+#   auto (default) - torch-free whenever the bundled ONNX model is on disk
+#   1              - torch-free even without onnx auto-detection (still needs
+#                    the bundled model; without it the torch path is used)
+#   0              - legacy sentence-transformers/torch path
+#
+# The torch-free encoder can only load from a local directory, so the mode and
+# BUNDLED_MODEL_PATH (what base_model resolves to) come from the same check.
+_BUNDLED_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'all-MiniLM-L6-v2')
+
+
+def _bundled_model_present(model_dir: str) -> bool:
+    """Tokenizer + at least one ONNX file under onnx/ - servable without the hub."""
+    onnx_dir = os.path.join(model_dir, 'onnx')
+    return (
+        os.path.isfile(os.path.join(model_dir, 'tokenizer.json'))
+        and os.path.isdir(onnx_dir)
+        and any(f.endswith('.onnx') for f in os.listdir(onnx_dir))
+    )
+
+
+_BUNDLED_MODEL_PRESENT = _bundled_model_present(_BUNDLED_MODEL_DIR)
+
+
+def _detect_torch_free_mode() -> bool:
+    setting = os.environ.get('SPECMEM_TORCH_FREE', 'auto').lower()
+    if setting in ('0', 'false', 'no'):
+        return False
+    if not _BUNDLED_MODEL_PRESENT:
+        if setting in ('1', 'true', 'yes'):
+            print(f"⚠️ SPECMEM_TORCH_FREE=1 but no bundled model in {_BUNDLED_MODEL_DIR} - "
+                  f"using sentence-transformers", file=sys.stderr)
+        return False
+    return True
+
+TORCH_FREE = _detect_torch_free_mode()
+
 # ============================================================================
 # AUTO-INSTALL MISSING DEPENDENCIES
 # ============================================================================
-def _auto_install_deps():
+def _auto_install_deps(torch_free: bool):
     """Install missing Python packages automatically."""
     import subprocess
     import sys as _sys
 
-    REQUIRED_PACKAGES = [
-        ('sentence_transformers', 'sentence-transformers'),
-        ('torch', 'torch'),
-        ('numpy', 'numpy'),
-        ('psycopg2', 'psycopg2-binary'),
-    ]
+    if torch_free:
+        REQUIRED_PACKAGES = [
+            ('onnxruntime', 'onnxruntime'),
+            ('tokenizers', 'tokenizers'),
+            ('numpy', 'numpy'),
+            ('psycopg2', 'psycopg2-binary'),
+        ]
+    else:
+        # sentence-transformers brings torch along - no need to force it separately
+        REQUIRED_PACKAGES = [
+            ('sentence_transformers', 'sentence-transformers'),
+            ('numpy', 'numpy'),
+            ('psycopg2', 'psycopg2-binary'),
+        ]
 
     missing = []
     for import_name, pip_name in REQUIRED_PACKAGES:
@@ -141,7 +195,7 @@ def _auto_install_deps():
             except subprocess.CalledProcessError as e:
                 print(f"   ✗ Failed to install {pkg}: {e}")
 
-_auto_install_deps()
+_auto_install_deps(TORCH_FREE)
 
 import os
 import hashlib
@@ -191,9 +245,7 @@ SPECMEM_HOME = os.environ.get('SPECMEM_HOME', os.path.dirname(os.path.dirname(os
 SPECMEM_RUN_DIR = os.environ.get('SPECMEM_RUN_DIR', os.path.join(SPECMEM_HOME, 'run'))
 
 # Bundled model: shipped with the npm package, no download needed
-_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-_BUNDLED_MODEL_DIR = os.path.join(_SCRIPT_DIR, 'models', 'all-MiniLM-L6-v2')
-BUNDLED_MODEL_PATH = _BUNDLED_MODEL_DIR if os.path.isfile(os.path.join(_BUNDLED_MODEL_DIR, 'onnx', 'model_quint8_avx2.onnx')) else None
+BUNDLED_MODEL_PATH = _BUNDLED_MODEL_DIR if _BUNDLED_MODEL_PRESENT else None
 if BUNDLED_MODEL_PATH:
     print(f"📦 Bundled model found: {BUNDLED_MODEL_PATH}", file=sys.stderr)
 # Socket directory: {PROJECT}/specmem/sockets/ - matches config.ts expectations
@@ -218,10 +270,17 @@ import threading
 import time
 import resource
 import hashlib
+import heapq
+import atexit
+import mmap
+import struct
+import zlib
+import shutil
 from typing import List, Dict, Tuple, Optional, Any
 from pathlib import Path
 from dataclasses import dataclass, field
-from collections import deque
+from collections import deque, OrderedDict
+from contextlib import contextmanager
 from queue import Queue, PriorityQueue
 from enum import IntEnum
 import subprocess
@@ -235,11 +294,27 @@ except ImportError:
     print("ℹ️ QQMS v2 not available - using legacy throttler", file=sys.stderr)
 
 # Check dependencies
+if TORCH_FREE:
+    try:
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+    except ImportError as e:
+        if os.environ.get('SPECMEM_TORCH_FREE', 'auto').lower() != 'auto':
+            print(f"Missing dependency: {e}", file=sys.stderr)
+            print("Install: pip install onnxruntime tokenizers numpy", file=sys.stderr)
+            sys.exit(1)
+        print(f"ℹ️ Torch-free mode unavailable ({e}) - falling back to sentence-transformers", file=sys.stderr)
+        TORCH_FREE = False
+        _auto_install_deps(TORCH_FREE)  # Auto mode only installed the torch-free set
+
 try:
-    from sentence_transformers import SentenceTransformer
-    from sklearn.decomposition import PCA, IncrementalPCA
-    from sklearn.random_projection import SparseRandomProjection
-    import torch
+    if TORCH_FREE:
+        SentenceTransformer = None
+        torch = None
+    else:
+        from sentence_transformers import SentenceTransformer
+        import torch
+    # sklearn is imported by AdaptivePCA only when it trains - serving is numpy-only
 except ImportError as e:
     print(f"Missing dependency: {e}", file=sys.stderr)
     print("Install: pip install sentence-transformers scikit-learn torch", file=sys.stderr)
@@ -278,8 +353,35 @@ def _get_cpu_thread_limit():
 
 _CPU_THREAD_LIMIT = _get_cpu_thread_limit()
 _CPU_THREAD_MIN = int(os.environ.get('SPECMEM_CPU_THREADS_MIN', '1'))
-torch.set_num_threads(_CPU_THREAD_LIMIT)
-torch.set_num_interop_threads(1)  # Limit cross-op parallelism to prevent CPU spikes
+
+# Current intra-op thread budget for inference. Torch applies it immediately;
+# OnnxSentenceEncoder picks it up on its next encode() (ORT fixes the thread
+# pool size per session, so the session is rebuilt when the budget changes).
+_inference_threads = _CPU_THREAD_LIMIT
+
+
+def _set_inference_threads(n: int):
+    """Set inference thread count for whichever runtime is serving."""
+    global _inference_threads
+    _inference_threads = max(1, int(n))
+    if not TORCH_FREE:
+        torch.set_num_threads(_inference_threads)
+
+
+def _release_accelerator_memory():
+    """Free CUDA cache after an unload/cleanup. No-op without torch."""
+    if TORCH_FREE:
+        return
+    try:
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except Exception:
+        pass
+
+
+_set_inference_threads(_CPU_THREAD_LIMIT)
+if not TORCH_FREE:
+    torch.set_num_interop_threads(1)  # Limit cross-op parallelism to prevent CPU spikes
 # Also limit OpenMP/MKL threads used by numpy/sklearn
 os.environ.setdefault('OMP_NUM_THREADS', str(_CPU_THREAD_LIMIT))
 os.environ.setdefault('MKL_NUM_THREADS', str(_CPU_THREAD_LIMIT))
@@ -287,6 +389,214 @@ os.environ.setdefault('NUMEXPR_NUM_THREADS', str(_CPU_THREAD_LIMIT))
 os.environ.setdefault('OPENBLAS_NUM_THREADS', str(_CPU_THREAD_LIMIT))
 print(f"🔒 CPU threads: {_CPU_THREAD_MIN}-{_CPU_THREAD_LIMIT} (cpucoremin/cpucoremax to adjust)", file=sys.stderr)
 
+# ============================================================================
+# CPU AFFINITY - Pin this server's inference threads to a fixed core set
+# ============================================================================
+# Several per-project servers on one host otherwise let ORT/OpenMP threads
+# migrate across cores and thrash each other's caches.
+#
+# SPECMEM_CPU_AFFINITY:
+#   unset / "" -> no pinning (default)
+#   "0-3,8"    -> explicit core list
+#   "auto"     -> claim _CPU_THREAD_LIMIT free cores, partitioned among running
+#                 servers via ~/.specmem/cpu-affinity.json (flock-protected),
+#                 keeping the claim inside one NUMA node when possible
+#
+# Registry entries are keyed "<container id or hostname>:<pid>" - containers
+# sharing the file reuse the same PIDs. Only claims from this host/container
+# can be checked for liveness; foreign ones stay until their server exits.
+_CPU_AFFINITY_REGISTRY = os.path.expanduser('~/.specmem/cpu-affinity.json')
+_CPU_AFFINITY_LOCK = os.path.expanduser('~/.specmem/cpu-affinity.lock')
+
+
+def _container_id() -> Optional[str]:
+    """Docker/containerd/podman container id from cgroup or mount info, if we're in one."""
+    for path in ('/proc/self/cgroup', '/proc/self/mountinfo'):
+        try:
+            with open(path, 'r') as f:
+                match = re.search(r'(?:docker|containerd|libpod|containers)[/-]([0-9a-f]{64})', f.read())
+            if match:
+                return match.group(1)[:12]
+        except OSError:
+            pass
+    return None
+
+
+_CPU_CLAIM_HOST = _container_id() or socket.gethostname()
+
+
+def _cpu_claim_key() -> str:
+    return f"{_CPU_CLAIM_HOST}:{os.getpid()}"
+
+
+def _cpu_claim_stale(key: str) -> bool:
+    """True for this process's own entry or a local server that has exited."""
+    host, _, pid = key.rpartition(':')
+    if host and host != _CPU_CLAIM_HOST:
+        return False  # Another container/host - its PIDs mean nothing here
+    try:
+        pid_int = int(pid)
+    except ValueError:
+        return True
+    return pid_int == os.getpid() or not _pid_alive(pid_int)
+
+
+def _parse_cpu_list(spec: str) -> List[int]:
+    """Parse a Linux cpulist string like '0-3,8,10-11'."""
+    cores = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            lo, hi = part.split('-', 1)
+            cores.update(range(int(lo), int(hi) + 1))
+        else:
+            cores.add(int(part))
+    return sorted(cores)
+
+
+def _read_numa_nodes() -> Dict[int, List[int]]:
+    """NUMA node -> cores, from sysfs. Single pseudo-node when unavailable."""
+    nodes: Dict[int, List[int]] = {}
+    node_root = '/sys/devices/system/node'
+    try:
+        for entry in os.listdir(node_root):
+            if entry.startswith('node') and entry[4:].isdigit():
+                with open(os.path.join(node_root, entry, 'cpulist'), 'r') as f:
+                    nodes[int(entry[4:])] = _parse_cpu_list(f.read())
+    except Exception:
+        pass
+    return nodes or {0: sorted(os.sched_getaffinity(0))}
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def _pick_cores(count: int, allowed: List[int], claimed: Dict[int, int], nodes: Dict[int, List[int]]) -> List[int]:
+    """
+    Choose `count` cores: free ones from a single NUMA node first, then free
+    ones across nodes, then the least-shared cores when the host is oversubscribed.
+    """
+    allowed_set = set(allowed)
+    free_by_node = {
+        node: [c for c in cores if c in allowed_set and claimed.get(c, 0) == 0]
+        for node, cores in nodes.items()
+    }
+    for node, free in sorted(free_by_node.items(), key=lambda kv: -len(kv[1])):
+        if len(free) >= count:
+            return free[:count]
+
+    picked = [c for _, free in sorted(free_by_node.items(), key=lambda kv: -len(kv[1])) for c in free][:count]
+    if len(picked) < count:
+        rest = sorted((c for c in allowed if c not in picked), key=lambda c: (claimed.get(c, 0), c))
+        picked += rest[:count - len(picked)]
+    return sorted(picked)
+
+
+def _claim_auto_cores(count: int, allowed: List[int]) -> List[int]:
+    """Claim cores in the shared registry under an exclusive file lock."""
+    import fcntl
+    os.makedirs(os.path.dirname(_CPU_AFFINITY_REGISTRY), exist_ok=True)
+    with open(_CPU_AFFINITY_LOCK, 'a+') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            registry = {}
+            try:
+                with open(_CPU_AFFINITY_REGISTRY, 'r') as f:
+                    registry = json.load(f)
+            except (FileNotFoundError, ValueError):
+                pass
+            # Drop claims from local servers that have exited
+            registry = {key: claim for key, claim in registry.items() if not _cpu_claim_stale(key)}
+
+            claimed: Dict[int, int] = {}
+            for claim in registry.values():
+                for core in claim.get('cores', []):
+                    claimed[core] = claimed.get(core, 0) + 1
+
+            cores = _pick_cores(count, allowed, claimed, _read_numa_nodes())
+            registry[_cpu_claim_key()] = {
+                'cores': cores,
+                'project': PROJECT_DIR_NAME,
+                'claimed_at': time.time()
+            }
+            tmp_path = _CPU_AFFINITY_REGISTRY + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(registry, f)
+            os.replace(tmp_path, _CPU_AFFINITY_REGISTRY)
+            return cores
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _release_cpu_claim():
+    """Remove this server's entry from the shared registry (atexit)."""
+    try:
+        import fcntl
+        with open(_CPU_AFFINITY_LOCK, 'a+') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(_CPU_AFFINITY_REGISTRY, 'r') as f:
+                    registry = json.load(f)
+                if registry.pop(_cpu_claim_key(), None) is not None:
+                    tmp_path = _CPU_AFFINITY_REGISTRY + '.tmp'
+                    with open(tmp_path, 'w') as f:
+                        json.dump(registry, f)
+                    os.replace(tmp_path, _CPU_AFFINITY_REGISTRY)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    except Exception:
+        pass
+
+
+def _apply_cpu_affinity() -> Optional[List[int]]:
+    """Resolve SPECMEM_CPU_AFFINITY and pin every existing thread to the core set."""
+    spec = os.environ.get('SPECMEM_CPU_AFFINITY', '').strip().lower()
+    if not spec or not hasattr(os, 'sched_setaffinity'):
+        return None
+
+    try:
+        allowed = sorted(os.sched_getaffinity(0))
+        if spec == 'auto':
+            cores = _claim_auto_cores(min(_CPU_THREAD_LIMIT, len(allowed)), allowed)
+            atexit.register(_release_cpu_claim)
+        else:
+            cores = [c for c in _parse_cpu_list(spec) if c in set(allowed)]
+            if not cores:
+                print(f"⚠️ SPECMEM_CPU_AFFINITY={spec} has no usable cores - not pinning", file=sys.stderr)
+                return None
+            spanned = [node for node, node_cores in _read_numa_nodes().items() if set(cores) & set(node_cores)]
+            if len(spanned) > 1:
+                print(f"⚠️ CPU affinity {cores} spans NUMA nodes {spanned} - expect remote memory access", file=sys.stderr)
+
+        # sched_setaffinity(0) only covers the calling thread; pin threads that
+        # imports already started (BLAS pools etc.). Later threads inherit it.
+        for tid in os.listdir('/proc/self/task'):
+            try:
+                os.sched_setaffinity(int(tid), cores)
+            except OSError:
+                pass
+        os.sched_setaffinity(0, cores)
+
+        if len(cores) < _CPU_THREAD_LIMIT:
+            print(f"⚠️ {_CPU_THREAD_LIMIT} threads pinned to {len(cores)} cores - threads will share cores", file=sys.stderr)
+        print(f"📌 CPU affinity: cores {cores} ({spec})", file=sys.stderr)
+        return cores
+    except Exception as e:
+        print(f"⚠️ Could not apply CPU affinity ({spec}): {e}", file=sys.stderr)
+        return None
+
+
+_CPU_AFFINITY = _apply_cpu_affinity()
+
 # ============================================================================
 # ONNX FILE SELECTION - Auto-detect best quantized model for CPU
 # ============================================================================
@@ -340,6 +650,217 @@ def _detect_best_onnx_file():
 _BEST_ONNX_FILE = _detect_best_onnx_file()
 
 
+# ============================================================================
+# MODEL TIERS - fast tier for bulk/backfill, accurate tier for live queries
+# ============================================================================
+# SPECMEM_MODEL_TIERS=1 loads a second ONNX variant of the bundled model:
+#   fast     -> distilled file if bundled, else _BEST_ONNX_FILE (quantized)
+#   accurate -> full-precision onnx/model.onnx
+# Overrides: SPECMEM_FAST_ONNX_FILE / SPECMEM_ACCURATE_ONNX_FILE.
+# Routing: backfill jobs and LOW/TRIVIAL -> fast, CRITICAL/HIGH -> accurate,
+# MEDIUM -> SPECMEM_TIER_MEDIUM (default fast).
+MODEL_TIERS_ENABLED = os.environ.get('SPECMEM_MODEL_TIERS', '0') == '1'
+
+
+def _detect_tier_onnx_files() -> Dict[str, str]:
+    """Map tier name -> ONNX file (relative to the bundled model dir)."""
+    tiers = {'fast': _BEST_ONNX_FILE, 'accurate': _BEST_ONNX_FILE}
+    if not MODEL_TIERS_ENABLED:
+        return tiers
+
+    onnx_dir = os.path.join(_BUNDLED_MODEL_DIR, 'onnx')
+    available = sorted(os.listdir(onnx_dir)) if os.path.isdir(onnx_dir) else []
+
+    distilled = [f for f in available if f.endswith('.onnx') and 'distil' in f]
+    if distilled:
+        tiers['fast'] = f"onnx/{distilled[0]}"
+    if 'model.onnx' in available:
+        tiers['accurate'] = "onnx/model.onnx"
+
+    tiers['fast'] = os.environ.get('SPECMEM_FAST_ONNX_FILE', tiers['fast'])
+    tiers['accurate'] = os.environ.get('SPECMEM_ACCURATE_ONNX_FILE', tiers['accurate'])
+
+    if tiers['fast'] == tiers['accurate']:
+        print(f"ℹ️ Model tiers requested but only {tiers['fast']} is available - single tier", file=sys.stderr)
+    else:
+        print(f"🎚️ Model tiers: fast={tiers['fast']}, accurate={tiers['accurate']}", file=sys.stderr)
+    return tiers
+
+
+_TIER_ONNX_FILES = _detect_tier_onnx_files()
+
+# Text-dependent expansion features: 'legacy' (default) or 'fast' (vectorized).
+# 'fast' changes every expanded vector, so stored rows must be re-embedded
+# before switching - it stays opt-in until that migration exists.
+HASH_FEATURES_MODE = 'fast' if os.environ.get('SPECMEM_HASH_FEATURES', 'legacy').lower() == 'fast' else 'legacy'
+
+# Bump when the dims transform changes what a given native vector becomes at a
+# target dimension - it is part of every embedding_hash / transform memo
+# namespace. Native cache keys don't carry it (the model files identify those).
+# 2 = vectorized hashed n-gram features (SPECMEM_HASH_FEATURES=fast)
+EMBEDDING_TRANSFORM_VERSION = 1 if HASH_FEATURES_MODE == 'legacy' else 2
+
+
+def _file_fingerprint(path: str) -> str:
+    """Short content hash of a model file ('local' if the file isn't on disk, e.g. a hub id)."""
+    if not os.path.isfile(path):
+        return 'local'
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+# ============================================================================
+# ONNX SENTENCE ENCODER - torch-free drop-in for SentenceTransformer
+# ============================================================================
+class OnnxSentenceEncoder:
+    """
+    Serves a sentence-transformers model directory straight from its ONNX
+    export: tokenizers for WordPiece, onnxruntime for the transformer,
+    numpy for pooling/normalization. Exposes the subset of the
+    SentenceTransformer API this server uses (encode, max_seq_length,
+    tokenizer(), get_sentence_embedding_dimension).
+
+    Mirrors sentence-transformers behaviour: texts are length-sorted,
+    chunked by batch_size, each chunk padded to its longest text and
+    truncated at max_seq_length; pooling mode comes from 1_Pooling/config.json
+    and L2 normalization is applied if modules.json has a Normalize module.
+    """
+
+    def __init__(self, model_dir: str, onnx_file: str):
+        if not os.path.isdir(model_dir):
+            raise FileNotFoundError(f"Torch-free mode needs a local model dir, got: {model_dir}")
+        self.model_dir = model_dir
+        self.onnx_path = os.path.join(model_dir, onnx_file)
+
+        st_config = self._read_json('sentence_bert_config.json')
+        self.max_seq_length = int(st_config.get('max_seq_length', 256))
+        self.do_lower_case = bool(st_config.get('do_lower_case', False))
+
+        pooling = self._read_json(os.path.join('1_Pooling', 'config.json'))
+        if pooling.get('pooling_mode_cls_token'):
+            self.pooling_mode = 'cls'
+        elif pooling.get('pooling_mode_max_tokens'):
+            self.pooling_mode = 'max'
+        else:
+            self.pooling_mode = 'mean'
+        modules = self._read_json('modules.json') or []
+        self.normalize = any(m.get('type', '').endswith('Normalize') for m in modules)
+
+        self._tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        # Padding/truncation are done per chunk in numpy - the tokenizer object
+        # is shared across request threads, so keep it stateless
+        self._tokenizer.no_padding()
+        self._tokenizer.no_truncation()
+        self._sep_id = self._tokenizer.token_to_id('[SEP]')
+
+        self._session_lock = threading.Lock()
+        self._session = None
+        self._session_threads = 0
+        self._session_inputs: set = set()
+        self._dims = pooling.get('word_embedding_dimension')
+        self._get_session()
+
+    def _read_json(self, name: str) -> Any:
+        path = os.path.join(self.model_dir, name)
+        if not os.path.isfile(path):
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _get_session(self):
+        """ORT session sized to the current thread budget (rebuilt if it changed)."""
+        threads = _inference_threads
+        if self._session is not None and self._session_threads == threads:
+            return self._session
+        with self._session_lock:
+            if self._session is None or self._session_threads != threads:
+                opts = ort.SessionOptions()
+                opts.intra_op_num_threads = threads
+                opts.inter_op_num_threads = 1  # Limit cross-op parallelism to prevent CPU spikes
+                opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+                opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                session = ort.InferenceSession(self.onnx_path, sess_options=opts, providers=['CPUExecutionProvider'])
+                self._session_inputs = {i.name for i in session.get_inputs()}
+                self._session = session
+                self._session_threads = threads
+            return self._session
+
+    def tokenizer(self, texts: List[str], add_special_tokens: bool = True, truncation: bool = False) -> Dict[str, List[List[int]]]:
+        """HF-tokenizer-style call used for token counting."""
+        if self.do_lower_case:
+            texts = [t.lower() for t in texts]
+        encoded = self._tokenizer.encode_batch(texts, add_special_tokens=add_special_tokens)
+        return {'input_ids': [e.ids for e in encoded]}
+
+    def get_sentence_embedding_dimension(self) -> Optional[int]:
+        return self._dims
+
+    def _tokenize_chunk(self, texts: List[str], max_len: int) -> Dict[str, np.ndarray]:
+        # Tokenizing text the model never sees is wasted work - clip first
+        max_chars = (max_len + 1) * SequenceLengthTracker.CHARS_PER_TOKEN_MAX
+        clipped = [t[:max_chars].lower() if self.do_lower_case else t[:max_chars] for t in texts]
+        encoded = self._tokenizer.encode_batch(clipped)
+        seq_len = min(max_len, max(len(e.ids) for e in encoded))
+        input_ids = np.zeros((len(encoded), seq_len), dtype=np.int64)
+        type_ids = np.zeros((len(encoded), seq_len), dtype=np.int64)
+        mask = np.zeros((len(encoded), seq_len), dtype=np.int64)
+        for row, e in enumerate(encoded):
+            ids = e.ids
+            if len(ids) > seq_len:
+                # Truncate the content but keep the closing [SEP]
+                ids = ids[:seq_len - 1] + [self._sep_id]
+                types = e.type_ids[:seq_len]
+            else:
+                types = e.type_ids
+            input_ids[row, :len(ids)] = ids
+            type_ids[row, :len(types)] = types
+            mask[row, :len(ids)] = 1
+        return {'input_ids': input_ids, 'attention_mask': mask, 'token_type_ids': type_ids}
+
+    def _pool(self, token_embeddings: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        if self.pooling_mode == 'cls':
+            return token_embeddings[:, 0]
+        mask_f = mask[..., None].astype(token_embeddings.dtype)
+        if self.pooling_mode == 'max':
+            return np.where(mask_f > 0, token_embeddings, -1e9).max(axis=1)
+        summed = (token_embeddings * mask_f).sum(axis=1)
+        return summed / np.clip(mask_f.sum(axis=1), 1e-9, None)
+
+    def encode(self, sentences, convert_to_numpy: bool = True, show_progress_bar: bool = False,
+               batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self._dims or 0), dtype=np.float32)
+
+        session = self._get_session()
+        max_len = self.max_seq_length
+        # Longest first, like sentence-transformers, so chunks pad to similar lengths
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        out = [None] * len(texts)
+
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            inputs = self._tokenize_chunk([texts[i] for i in idx], max_len)
+            feeds = {k: v for k, v in inputs.items() if k in self._session_inputs}
+            hidden = session.run(None, feeds)[0]
+            pooled = hidden if hidden.ndim == 2 else self._pool(hidden, inputs['attention_mask'])
+            pooled = pooled.astype(np.float32, copy=False)
+            if self.normalize:
+                norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+                pooled = pooled / np.where(norms > 0, norms, 1.0)
+            for row, i in enumerate(idx):
+                out[i] = pooled[row]
+
+        if self._dims is None:
+            self._dims = int(out[0].shape[-1])
+        embeddings = np.stack(out)
+        return embeddings[0] if single else embeddings
+
+
 class EmbeddingPriority(IntEnum):
     """Priority levels for embedding requests - lower = higher priority"""
     CRITICAL = 0    # Real-time search queries
@@ -570,6 +1091,856 @@ class LowResourceConfig:
         print(f"", file=sys.stderr)
 
 
+# ============================================================================
+# CACHE VECTOR CODECS - recorded per entry so mixed caches keep working
+# ============================================================================
+# float32 is lossless; float16 halves the footprint (~1e-3 relative error on
+# unit vectors); int8 stores a float32 scale + one byte per dim (4x smaller).
+# CODEC_ZSTD is OR-ed into the code when the payload is zstd-compressed.
+CODEC_FLOAT32 = 0
+CODEC_FLOAT16 = 1
+CODEC_FLOAT64 = 2
+CODEC_INT8 = 3
+CODEC_ZSTD = 0x80
+CACHE_CODECS = {'float32': CODEC_FLOAT32, 'float16': CODEC_FLOAT16, 'int8': CODEC_INT8}
+_CODEC_DTYPES = {CODEC_FLOAT32: np.float32, CODEC_FLOAT16: np.float16, CODEC_FLOAT64: np.float64}
+
+try:
+    import zstandard as _zstd
+except ImportError:
+    _zstd = None
+
+_zstd_local = threading.local()
+
+
+def _zstd_codec():
+    """Per-thread (compressor, decompressor) - zstandard objects aren't thread-safe."""
+    pair = getattr(_zstd_local, 'pair', None)
+    if pair is None:
+        pair = (_zstd.ZstdCompressor(level=3), _zstd.ZstdDecompressor())
+        _zstd_local.pair = pair
+    return pair
+
+
+def _codec_payload_len(code: int, dims: int) -> int:
+    base = code & ~CODEC_ZSTD
+    if base == CODEC_INT8:
+        return 4 + dims
+    return dims * np.dtype(_CODEC_DTYPES[base]).itemsize
+
+
+def encode_vector(vec: np.ndarray, codec: int, use_zstd: bool = False) -> Tuple[int, bytes]:
+    """Encode one vector -> (codec code, payload bytes)."""
+    arr = np.asarray(vec, dtype=np.float32).reshape(-1)
+    if codec == CODEC_INT8:
+        scale = float(np.abs(arr).max()) / 127.0 or 1.0
+        quantized = np.clip(np.rint(arr / scale), -127, 127).astype(np.int8)
+        payload = struct.pack('<f', scale) + quantized.tobytes()
+    else:
+        payload = arr.astype(_CODEC_DTYPES[codec], copy=False).tobytes()
+    if use_zstd and _zstd is not None:
+        compressed = _zstd_codec()[0].compress(payload)
+        if len(compressed) < len(payload):
+            return codec | CODEC_ZSTD, compressed
+    return codec, payload
+
+
+def decode_vectors(code: int, payloads: List[bytes], dims: int) -> np.ndarray:
+    """Vectorized decode of same-codec, same-dims payloads -> (N, dims) float32."""
+    if code & CODEC_ZSTD:
+        decompressor = _zstd_codec()[1]
+        payloads = [decompressor.decompress(p) for p in payloads]
+    base = code & ~CODEC_ZSTD
+    joined = b''.join(payloads)
+    if base == CODEC_INT8:
+        rows = np.frombuffer(joined, dtype=np.uint8).reshape(len(payloads), 4 + dims)
+        scales = rows[:, :4].copy().view(np.float32)
+        return rows[:, 4:].view(np.int8).astype(np.float32) * scales
+    return np.frombuffer(joined, dtype=_CODEC_DTYPES[base]).reshape(len(payloads), dims).astype(np.float32)
+
+
+class NpyFileStore:
+    """
+    Legacy disk-cache backend: one .npy file per embedding, spread over 256
+    subdirectories. Selected with SPECMEM_CACHE_BACKEND=files.
+    The .npy dtype is the per-entry codec: only float32/float16 are supported
+    here (int8 falls back to float16, zstd is ignored).
+    """
+
+    name = 'files'
+
+    def __init__(self, root: Path, codec: int = CODEC_FLOAT32):
+        self.root = root
+        self._lock = threading.Lock()
+        self.dtype = np.float32 if codec == CODEC_FLOAT32 else np.float16
+
+    def _path(self, key: str) -> Path:
+        # Use first 2 chars as subdirectory for better filesystem performance
+        subdir = self.root / key[:2]
+        subdir.mkdir(exist_ok=True)
+        return subdir / f"{key}.npy"
+
+    def entries(self) -> Optional[List[Tuple[str, int]]]:
+        """(key, nbytes) for every stored entry, or None if only index.json knows."""
+        return None
+
+    def read(self, key: str) -> Optional[np.ndarray]:
+        path = self._path(key)
+        with self._lock:
+            if not path.exists():
+                return None
+            try:
+                return np.load(path).astype(np.float32, copy=False)
+            except Exception:
+                # Corrupted cache file - remove it
+                try:
+                    path.unlink()
+                except:
+                    pass
+                return None
+
+    def write(self, key: str, embedding: np.ndarray) -> int:
+        """Store one vector; returns the stored payload size in bytes."""
+        path = self._path(key)
+        temp_path = path.with_suffix('.tmp')
+        stored = np.asarray(embedding).astype(self.dtype, copy=False)
+        try:
+            with self._lock:
+                # Write to temp file first, then rename (atomic on POSIX).
+                # Through a handle - np.save(path) would append .npy to the temp name
+                with open(temp_path, 'wb') as f:
+                    np.save(f, stored)
+                temp_path.rename(path)
+            return stored.nbytes
+        except Exception:
+            try:
+                if temp_path.exists():
+                    temp_path.unlink()
+            except:
+                pass
+            raise
+
+    def read_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        return [self.read(key) for key in keys]
+
+    def write_many(self, keys: List[str], embeddings: List[np.ndarray]) -> List[int]:
+        return [self.write(key, embedding) for key, embedding in zip(keys, embeddings)]
+
+    def delete(self, key: str):
+        path = self._path(key)
+        with self._lock:
+            if path.exists():
+                path.unlink()
+
+    def compact(self, min_dead_ratio: float = 0.5, include_active: bool = False) -> int:
+        return 0
+
+    def flush(self):
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'codec': np.dtype(self.dtype).name}
+
+
+@dataclass
+class _Segment:
+    """One memory-mapped segment file of fixed-size record slots."""
+    seg_id: int
+    path: Path
+    slot_size: int
+    capacity: int
+    file: Any
+    mm: Any
+    cursor: int = 0   # Next free slot (everything before it has been written)
+    live: int = 0     # Slots still referenced by the index
+
+
+class SegmentStore:
+    """
+    Log-structured disk-cache backend (SPECMEM_CACHE_BACKEND=segments, default).
+
+    Embeddings are appended to segment files of fixed-size record slots
+    (24-byte header + payload, rounded up to 64 bytes) that are memory-mapped
+    for reads AND writes - a put is a memcpy into the page cache, a disk hit
+    is a dict probe plus an mmap slice. No per-entry files, mkdirs or renames.
+
+    - One active segment per slot size, preallocated sparse and sealed when full
+    - Hash index (int key -> segment id << 32 | slot) rebuilt on startup by
+      scanning record headers
+    - Overwrites/deletes flip the old slot to DEAD in place, so the files
+      always agree with the index (no tombstones to replay)
+    - compact() copies live records out of mostly-dead sealed segments into
+      the active one and unlinks the old file; an explicit compact
+      (include_active=True) seals and rotates the active segments first, so
+      a small cache living in a single segment is reclaimed too
+    - Payload CRC32 is checked on every read; torn records are dropped
+    - Payloads are encoded with the configured codec (float32/float16/int8,
+      optionally zstd); the codec byte lives in each record header, so
+      entries written under a different codec still decode
+    """
+
+    name = 'segments'
+    MAGIC = b'SPMSEG01'
+    FILE_HEADER = 64
+    RECORD_HEADER = struct.Struct('<8sIIIBBxx')  # key, payload_len, crc32, dims, codec, flags
+    FLAGS_OFFSET = 21
+    SLOT_ALIGN = 64
+    FLAG_EMPTY = 0
+    FLAG_LIVE = 1
+    FLAG_DEAD = 2
+
+    def __init__(self, root: Path, segment_mb: int = 16, codec: int = CODEC_FLOAT32, use_zstd: bool = False):
+        self.root = root / "segments"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = max(1, segment_mb) * 1024 * 1024
+        self.codec = codec
+        self.use_zstd = use_zstd and _zstd is not None
+        if use_zstd and _zstd is None:
+            print("⚠️ SPECMEM_CACHE_ZSTD=1 but zstandard is not installed - storing uncompressed", file=sys.stderr)
+        self._lock = threading.Lock()
+        self.segments: Dict[int, _Segment] = {}
+        self._active: Dict[int, _Segment] = {}   # slot_size -> segment being appended
+        self.index: Dict[int, int] = {}
+        self._next_id = 0
+        self.compactions = 0
+        self._open_existing()
+
+    # ─── Layout helpers ────────────────────────────────────────────────────
+
+    def _slot_size(self, payload_len: int) -> int:
+        needed = self.RECORD_HEADER.size + payload_len
+        return -(-needed // self.SLOT_ALIGN) * self.SLOT_ALIGN
+
+    def _offset(self, seg: _Segment, slot: int) -> int:
+        return self.FILE_HEADER + slot * seg.slot_size
+
+    @staticmethod
+    def _key_int(key: str) -> int:
+        return int(key, 16)
+
+    # ─── Segment lifecycle ─────────────────────────────────────────────────
+
+    def _map(self, seg_id: int, path: Path, slot_size: int, f) -> _Segment:
+        size = os.fstat(f.fileno()).st_size
+        mm = mmap.mmap(f.fileno(), size)
+        capacity = (size - self.FILE_HEADER) // slot_size
+        return _Segment(seg_id, path, slot_size, capacity, f, mm)
+
+    def _open_existing(self):
+        """Map every segment on disk and rebuild the index from record headers."""
+        for path in sorted(self.root.glob('*.seg')):
+            try:
+                seg_id = int(path.stem)
+                f = open(path, 'r+b')
+                header = f.read(self.FILE_HEADER)
+                if header[:8] != self.MAGIC:
+                    f.close()
+                    path.unlink()
+                    continue
+                slot_size = struct.unpack_from('<I', header, 8)[0]
+                seg = self._map(seg_id, path, slot_size, f)
+            except Exception as e:
+                print(f"⚠️ Dropping unreadable cache segment {path.name}: {e}", file=sys.stderr)
+                try:
+                    path.unlink()
+                except:
+                    pass
+                continue
+
+            self.segments[seg_id] = seg
+            self._next_id = max(self._next_id, seg_id + 1)
+            for slot in range(seg.capacity):
+                off = self._offset(seg, slot)
+                key, _, _, _, _, flags = self.RECORD_HEADER.unpack_from(seg.mm, off)
+                if flags == self.FLAG_EMPTY:
+                    break
+                seg.cursor = slot + 1
+                if flags != self.FLAG_LIVE:
+                    continue
+                key_int = int.from_bytes(key, 'big')
+                old = self.index.get(key_int)
+                if old is not None:
+                    # Crash mid-compaction/overwrite: both copies are valid, keep the later one
+                    self._mark_dead(old)
+                self.index[key_int] = (seg_id << 32) | slot
+                seg.live += 1
+
+            if seg.cursor < seg.capacity:
+                self._active.setdefault(slot_size, seg)
+
+        if self.segments:
+            print(f"💾 Segment store: {len(self.index)} entries in {len(self.segments)} segments", file=sys.stderr)
+
+    def _new_segment(self, slot_size: int) -> _Segment:
+        seg_id = self._next_id
+        self._next_id += 1
+        path = self.root / f"{seg_id:08d}.seg"
+        capacity = max(1, (self.segment_bytes - self.FILE_HEADER) // slot_size)
+        f = open(path, 'w+b')
+        f.write(self.MAGIC + struct.pack('<I', slot_size))
+        f.truncate(self.FILE_HEADER + capacity * slot_size)  # Sparse - no blocks until written
+        f.flush()
+        seg = self._map(seg_id, path, slot_size, f)
+        self.segments[seg_id] = seg
+        return seg
+
+    def _active_segment(self, slot_size: int) -> _Segment:
+        seg = self._active.get(slot_size)
+        if seg is None or seg.cursor >= seg.capacity:
+            if seg is not None:
+                seg.mm.flush()  # Seal the full segment
+            seg = self._new_segment(slot_size)
+            self._active[slot_size] = seg
+        return seg
+
+    def _drop_segment(self, seg: _Segment):
+        self.segments.pop(seg.seg_id, None)
+        if self._active.get(seg.slot_size) is seg:
+            del self._active[seg.slot_size]
+        try:
+            seg.mm.close()
+            seg.file.close()
+            seg.path.unlink()
+        except Exception:
+            pass
+
+    def _mark_dead(self, loc: int):
+        seg = self.segments.get(loc >> 32)
+        if seg is None:
+            return
+        seg.mm[self._offset(seg, loc & 0xFFFFFFFF) + self.FLAGS_OFFSET] = self.FLAG_DEAD
+        seg.live -= 1
+
+    def _append(self, slot_size: int, record: bytes) -> int:
+        """Write a full record (header last) into the active segment. Caller holds the lock."""
+        seg = self._active_segment(slot_size)
+        slot = seg.cursor
+        off = self._offset(seg, slot)
+        hs = self.RECORD_HEADER.size
+        seg.mm[off + hs:off + len(record)] = record[hs:]
+        seg.mm[off:off + hs] = record[:hs]  # Header last - a torn write reads as empty
+        seg.cursor += 1
+        seg.live += 1
+        return (seg.seg_id << 32) | slot
+
+    # ─── Store API ─────────────────────────────────────────────────────────
+
+    def sort_by_location(self, keys: List[str]) -> List[str]:
+        """Order keys by (segment, slot) so a bulk read walks each file front to back."""
+        with self._lock:
+            return sorted(keys, key=lambda k: self.index.get(self._key_int(k), 0))
+
+    def entries(self) -> Optional[List[Tuple[str, int]]]:
+        """(key, nbytes) for every live record."""
+        with self._lock:
+            out = []
+            for key_int, loc in self.index.items():
+                seg = self.segments[loc >> 32]
+                payload_len = self.RECORD_HEADER.unpack_from(seg.mm, self._offset(seg, loc & 0xFFFFFFFF))[1]
+                out.append((f"{key_int:016x}", payload_len))
+            return out
+
+    def read(self, key: str) -> Optional[np.ndarray]:
+        return self.read_many([key])[0]
+
+    def read_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Probe and slice every key under one lock; CRC check + vectorized decode outside it."""
+        out: List[Optional[np.ndarray]] = [None] * len(keys)
+        raw = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                loc = self.index.get(self._key_int(key))
+                if loc is None:
+                    continue
+                seg = self.segments[loc >> 32]
+                off = self._offset(seg, loc & 0xFFFFFFFF)
+                _, payload_len, crc, dims, code, _ = self.RECORD_HEADER.unpack_from(seg.mm, off)
+                start = off + self.RECORD_HEADER.size
+                raw.append((i, loc, seg.mm[start:start + payload_len], crc, dims, code))
+
+        bad: List[Tuple[int, int]] = []
+        groups: Dict[Tuple[int, int], List[Tuple[int, int, bytes]]] = {}
+        for i, loc, payload, crc, dims, code in raw:
+            known = (code & ~CODEC_ZSTD) in (CODEC_FLOAT32, CODEC_FLOAT16, CODEC_FLOAT64, CODEC_INT8)
+            if not known or zlib.crc32(payload) != crc or \
+                    (not code & CODEC_ZSTD and len(payload) != _codec_payload_len(code, dims)):
+                bad.append((i, loc))
+                continue
+            groups.setdefault((code, dims), []).append((i, loc, payload))
+
+        for (code, dims), members in groups.items():
+            try:
+                decoded = decode_vectors(code, [payload for _, _, payload in members], dims)
+            except Exception:
+                bad.extend((i, loc) for i, loc, _ in members)
+                continue
+            for row, (i, _, _) in enumerate(members):
+                out[i] = decoded[row]
+
+        if bad:
+            # Only drop a record if the index still points at the slot we read -
+            # a writer may have replaced the key since the probe above
+            with self._lock:
+                for i, loc in bad:
+                    key_int = self._key_int(keys[i])
+                    if self.index.get(key_int) == loc:
+                        del self.index[key_int]
+                        self._mark_dead(loc)
+        return out
+
+    def write(self, key: str, embedding: np.ndarray) -> int:
+        return self.write_many([key], [embedding])[0]
+
+    def write_many(self, keys: List[str], embeddings: List[np.ndarray]) -> List[int]:
+        """Encode records outside the lock, then append them all in one critical section.
+        Returns the stored payload size of each entry."""
+        records = []
+        sizes = []
+        for key, embedding in zip(keys, embeddings):
+            dims = int(np.size(embedding))
+            code, payload = encode_vector(embedding, self.codec, self.use_zstd)
+            header = self.RECORD_HEADER.pack(
+                bytes.fromhex(key), len(payload), zlib.crc32(payload), dims, code, self.FLAG_LIVE
+            )
+            records.append((self._key_int(key), self._slot_size(len(payload)), header + payload))
+            sizes.append(len(payload))
+
+        with self._lock:
+            for key_int, slot_size, record in records:
+                loc = self._append(slot_size, record)
+                old = self.index.get(key_int)
+                if old is not None:
+                    self._mark_dead(old)
+                self.index[key_int] = loc
+        return sizes
+
+    def delete(self, key: str):
+        with self._lock:
+            loc = self.index.pop(self._key_int(key), None)
+            if loc is not None:
+                self._mark_dead(loc)
+
+    def compact(self, min_dead_ratio: float = 0.5, include_active: bool = False) -> int:
+        """Rewrite live records out of mostly-dead sealed segments. Returns segments reclaimed.
+
+        With include_active, active segments past the threshold are sealed and
+        rotated out first so they become candidates as well - the background
+        pass leaves them alone, an explicit compact should not."""
+        with self._lock:
+            if include_active:
+                for slot_size, seg in list(self._active.items()):
+                    if seg.cursor > 0 and 1 - seg.live / seg.cursor >= min_dead_ratio:
+                        seg.mm.flush()  # Seal; the next append opens a fresh segment
+                        del self._active[slot_size]
+            active = set(id(s) for s in self._active.values())
+            candidates = [
+                s for s in self.segments.values()
+                if id(s) not in active and s.cursor > 0 and 1 - s.live / s.cursor >= min_dead_ratio
+            ]
+
+        reclaimed = 0
+        hs = self.RECORD_HEADER.size
+        for seg in sorted(candidates, key=lambda s: s.live):
+            for slot in range(seg.cursor):
+                # Lock per record so foreground reads/writes interleave with compaction
+                with self._lock:
+                    if seg.seg_id not in self.segments:
+                        break
+                    off = self._offset(seg, slot)
+                    key, payload_len, _, _, _, flags = self.RECORD_HEADER.unpack_from(seg.mm, off)
+                    if flags != self.FLAG_LIVE:
+                        continue
+                    record = seg.mm[off:off + hs + payload_len]
+                    key_int = int.from_bytes(key, 'big')
+                    self.index[key_int] = self._append(seg.slot_size, record)
+                    seg.mm[off + self.FLAGS_OFFSET] = self.FLAG_DEAD
+                    seg.live -= 1
+            with self._lock:
+                if seg.seg_id in self.segments and seg.live == 0:
+                    self._drop_segment(seg)
+                    reclaimed += 1
+
+        if reclaimed:
+            self.compactions += reclaimed
+            print(f"🧹 Segment store compacted {reclaimed} segments", file=sys.stderr)
+        return reclaimed
+
+    def flush(self):
+        with self._lock:
+            for seg in self.segments.values():
+                try:
+                    seg.mm.flush()
+                except Exception:
+                    pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            used = sum(s.cursor for s in self.segments.values())
+            live = sum(s.live for s in self.segments.values())
+            disk_bytes = sum(s.cursor * s.slot_size for s in self.segments.values())
+            return {
+                'backend': self.name,
+                'codec': next(k for k, v in CACHE_CODECS.items() if v == self.codec) + ('+zstd' if self.use_zstd else ''),
+                'segments': len(self.segments),
+                'live_records': live,
+                'dead_ratio': round(1 - live / used, 3) if used else 0.0,
+                'disk_mb': round(disk_bytes / 1024 / 1024, 2),
+                'compactions': self.compactions
+            }
+
+
+class TinyLFURamCache:
+    """
+    RAM tier with frequency-aware admission (W-TinyLFU style), sized in BYTES.
+
+    A plain LRU lets one 200-file backfill batch flush every hot search query.
+    Here new entries land in a small window LRU (~1% of the budget); when the
+    window overflows, its oldest entry must beat the main LRU's victims on
+    estimated access frequency to get in, otherwise it is dropped. Frequency
+    comes from a 4-row count-min sketch of 4-bit-style counters that is halved
+    every 10x-capacity accesses, so popularity ages out.
+
+    Not thread-safe on its own - the owning cache serializes access.
+    """
+
+    SKETCH_DEPTH = 4
+    COUNTER_MAX = 15
+    WINDOW_FRACTION = 0.01
+    SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+
+    def __init__(self, max_bytes: int, entry_bytes_hint: int = 1536):
+        self.max_bytes = max(0, int(max_bytes))
+        expected = max(64, self.max_bytes // max(1, entry_bytes_hint))
+        self._width_bits = max(12, (expected * 8 - 1).bit_length())  # Wide enough to keep collisions rare
+        self._width = 1 << self._width_bits
+        self._sketch = bytearray(self.SKETCH_DEPTH * self._width)
+        self._sample_limit = 10 * expected
+        self._additions = 0
+
+        self.window_max = max(int(self.max_bytes * self.WINDOW_FRACTION), entry_bytes_hint)
+        self.main_max = max(0, self.max_bytes - self.window_max)
+        self.window: OrderedDict = OrderedDict()
+        self.main: OrderedDict = OrderedDict()
+        self.window_bytes = 0
+        self.main_bytes = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    # ─── Count-min sketch ──────────────────────────────────────────────────
+
+    def _slots(self, key) -> List[int]:
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        shift = 64 - self._width_bits
+        return [row * self._width + (((h ^ seed) * seed & 0xFFFFFFFFFFFFFFFF) >> shift)
+                for row, seed in enumerate(self.SEEDS)]
+
+    def _record(self, key):
+        sketch = self._sketch
+        for slot in self._slots(key):
+            if sketch[slot] < self.COUNTER_MAX:
+                sketch[slot] += 1
+        self._additions += 1
+        if self._additions >= self._sample_limit:
+            # Age: halve every counter so yesterday's hot keys can be displaced
+            counters = np.frombuffer(self._sketch, dtype=np.uint8)
+            counters >>= 1
+            self._additions //= 2
+
+    def frequency(self, key) -> int:
+        return min(self._sketch[slot] for slot in self._slots(key))
+
+    # ─── Cache API ─────────────────────────────────────────────────────────
+
+    def get(self, key) -> Optional[np.ndarray]:
+        """Look up (and count) an access. Misses count too - that's what admits repeat queries."""
+        self._record(key)
+        for segment in (self.window, self.main):
+            vec = segment.get(key)
+            if vec is not None:
+                segment.move_to_end(key)
+                return vec
+        return None
+
+    def put(self, key, vec: np.ndarray):
+        size = vec.nbytes
+        if size > self.max_bytes:
+            return
+        for segment in (self.window, self.main):
+            old = segment.pop(key, None)
+            if old is not None:
+                if segment is self.window:
+                    self.window_bytes -= old.nbytes
+                else:
+                    self.main_bytes -= old.nbytes
+        self.window[key] = vec
+        self.window_bytes += size
+        while self.window_bytes > self.window_max and self.window:
+            cand_key, cand = self.window.popitem(last=False)
+            self.window_bytes -= cand.nbytes
+            self._admit(cand_key, cand)
+
+    def preload(self, key, vec: np.ndarray, hits: int = 1) -> bool:
+        """Startup warm: seed the key's frequency and place it straight in main. False once main is full."""
+        if key in self.window or key in self.main:
+            return True
+        size = vec.nbytes
+        if self.main_bytes + size > self.main_max:
+            return False
+        for _ in range(min(max(1, hits), self.COUNTER_MAX)):
+            self._record(key)
+        self.main[key] = vec
+        self.main_bytes += size
+        return True
+
+    def _admit(self, key, vec: np.ndarray):
+        """Window overflow: candidate enters main only if it is hotter than every victim it displaces."""
+        size = vec.nbytes
+        if size > self.main_max:
+            self.rejected += 1
+            return
+        cand_freq = self.frequency(key)
+        while self.main_bytes + size > self.main_max:
+            victim_key = next(iter(self.main))
+            if self.frequency(victim_key) >= cand_freq:
+                self.rejected += 1
+                return
+            victim = self.main.pop(victim_key)
+            self.main_bytes -= victim.nbytes
+        self.main[key] = vec
+        self.main_bytes += size
+        self.admitted += 1
+
+    def discard(self, key):
+        for segment in (self.window, self.main):
+            old = segment.pop(key, None)
+            if old is not None:
+                if segment is self.window:
+                    self.window_bytes -= old.nbytes
+                else:
+                    self.main_bytes -= old.nbytes
+
+    def clear(self):
+        self.window.clear()
+        self.main.clear()
+        self.window_bytes = 0
+        self.main_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.window) + len(self.main)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self),
+            'mb': round((self.window_bytes + self.main_bytes) / 1024 / 1024, 2),
+            'max_mb': round(self.max_bytes / 1024 / 1024, 2),
+            'admitted': self.admitted,
+            'rejected': self.rejected
+        }
+
+
+class SharedEmbeddingStore:
+    """
+    Machine-wide, content-addressed cache tier under ~/.specmem/ shared by
+    every project instance, so vendored dependencies, stdlib snippets and
+    seeded docs are embedded once per model rather than once per project.
+
+    Keys are the same sha256(model identity + text) hashes the private tier
+    uses. Each entry is one immutable file written to a unique temp name and
+    os.replace()d into place: concurrent processes publishing the same text
+    just race to write identical bytes and readers never see a torn record,
+    so the data path needs no locks. Pruning to the byte budget (oldest
+    mtime first; hits refresh mtime) takes a non-blocking flock so only one
+    process scans at a time.
+
+    Lookups are batched per fan-out directory against a listing that is
+    re-scanned at most every LISTING_TTL_SEC, so a batch of misses costs one
+    scandir per touched directory instead of one failed open() per key.
+    Entries published by other processes become visible after the TTL.
+    """
+
+    name = 'shared'
+    MAGIC = b'SPMV'
+    HEADER = struct.Struct('<4sBxxxII')  # magic, codec, dims, crc32
+    STALE_TMP_SEC = 3600
+    LISTING_TTL_SEC = 30.0
+
+    def __init__(self, root: Path, max_mb: int = 2048, codec: int = CODEC_FLOAT32, use_zstd: bool = False):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_mb * 1024 * 1024
+        self.codec = codec
+        self.use_zstd = use_zstd and _zstd is not None
+        self.lock_path = self.root / 'prune.lock'
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.listing_scans = 0
+        self.last_prune: Dict[str, Any] = {}
+        # fan-out dir -> (scanned at, entry file names)
+        self._listings: Dict[str, Tuple[float, set]] = {}
+        self._listing_lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.vec"
+
+    def _listing(self, prefix: str, now: float) -> set:
+        """Entry names in one fan-out directory, re-scanned once the cached listing is stale."""
+        with self._listing_lock:
+            cached = self._listings.get(prefix)
+            if cached is not None and now - cached[0] < self.LISTING_TTL_SEC:
+                return cached[1]
+        try:
+            with os.scandir(self.root / prefix) as it:
+                names = {entry.name for entry in it if entry.name.endswith('.vec')}
+        except OSError:
+            names = set()
+        self.listing_scans += 1
+        with self._listing_lock:
+            self._listings[prefix] = (now, names)
+        return names
+
+    def _present(self, keys: List[str]) -> List[int]:
+        """Indices of keys listed on disk, one directory scan per fan-out prefix in the batch."""
+        now = time.time()
+        by_prefix: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            by_prefix.setdefault(key[:2], []).append(i)
+        present = []
+        for prefix, idxs in by_prefix.items():
+            names = self._listing(prefix, now)
+            present.extend(i for i in idxs if f"{keys[i]}.vec" in names)
+        present.sort()
+        return present
+
+    def read_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Read listed entry files, CRC-check them and decode same-codec groups in one pass."""
+        out: List[Optional[np.ndarray]] = [None] * len(keys)
+        groups: Dict[Tuple[int, int], List[Tuple[int, bytes]]] = {}
+        for i in self._present(keys):
+            key = keys[i]
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    blob = f.read()
+            except OSError:
+                continue
+            if len(blob) < self.HEADER.size:
+                continue
+            magic, code, dims, crc = self.HEADER.unpack_from(blob)
+            payload = blob[self.HEADER.size:]
+            if magic != self.MAGIC or zlib.crc32(payload) != crc:
+                continue
+            groups.setdefault((code, dims), []).append((i, payload))
+            try:
+                os.utime(path)  # Recency for pruning
+            except OSError:
+                pass
+
+        for (code, dims), members in groups.items():
+            try:
+                decoded = decode_vectors(code, [payload for _, payload in members], dims)
+            except Exception:
+                continue
+            for row, (i, _) in enumerate(members):
+                out[i] = decoded[row]
+
+        hits = sum(1 for v in out if v is not None)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return out
+
+    def write_many(self, keys: List[str], embeddings: List[np.ndarray]):
+        """Publish entries not already present (content-addressed, so existing ones are identical)."""
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        listed = set(self._present(keys))
+        for i, (key, embedding) in enumerate(zip(keys, embeddings)):
+            if i in listed:
+                continue
+            path = self._path(key)
+            code, payload = encode_vector(embedding, self.codec, self.use_zstd)
+            temp_path = path.with_name(path.name + suffix)
+            try:
+                path.parent.mkdir(exist_ok=True)
+                with open(temp_path, 'wb') as f:
+                    f.write(self.HEADER.pack(self.MAGIC, code, int(np.size(embedding)), zlib.crc32(payload)))
+                    f.write(payload)
+                os.replace(temp_path, path)
+                self.writes += 1
+                with self._listing_lock:
+                    cached = self._listings.get(key[:2])
+                    if cached is not None:
+                        cached[1].add(path.name)
+            except OSError:
+                try:
+                    temp_path.unlink()
+                except OSError:
+                    pass
+
+    def prune(self) -> int:
+        """Trim to 80% of the budget, oldest first. Returns entries removed (0 if another process is pruning)."""
+        import fcntl
+        with open(self.lock_path, 'a+') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return 0
+            try:
+                now = time.time()
+                entries = []
+                total = 0
+                for subdir in os.scandir(self.root):
+                    if not subdir.is_dir():
+                        continue
+                    for entry in os.scandir(subdir.path):
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        if entry.name.endswith('.tmp'):
+                            # Left behind by a writer that died mid-publish
+                            if now - st.st_mtime > self.STALE_TMP_SEC:
+                                try:
+                                    os.unlink(entry.path)
+                                except OSError:
+                                    pass
+                            continue
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+                        total += st.st_size
+
+                removed = 0
+                if total > self.max_bytes:
+                    entries.sort()
+                    for _, size, path in entries:
+                        if total <= self.max_bytes * 0.8:
+                            break
+                        try:
+                            os.unlink(path)
+                            total -= size
+                            removed += 1
+                        except OSError:
+                            pass
+                if removed:
+                    with self._listing_lock:
+                        self._listings.clear()
+                self.last_prune = {'at': now, 'entries': len(entries) - removed, 'size_mb': round(total / 1024 / 1024, 2)}
+                if removed:
+                    print(f"🗑️ Shared cache pruned {removed} old entries", file=sys.stderr)
+                return removed
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'root': str(self.root),
+            'max_mb': self.max_bytes / 1024 / 1024,
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'listing_scans': self.listing_scans,
+            'last_prune': self.last_prune
+        }
+
+
 class DiskBackedEmbeddingCache:
     """
     OPT-8: DISK-BACKED EMBEDDING CACHE
@@ -580,61 +1951,356 @@ class DiskBackedEmbeddingCache:
 
     Features:
     - LRU eviction with configurable max size
-    - Content-addressable (hash of text = key)
-    - Hot entries promoted to small RAM cache
+    - Content-addressable (hash of model identity + text = key)
+    - Dimension-independent: stores NATIVE model output; expansion/PCA to the
+      target dimension happens at read time, memoized per target dim in RAM.
+      A dimension migration costs transform CPU only, never re-inference.
+    - Hot entries promoted to a byte-sized RAM tier with TinyLFU admission,
+      so bulk backfills can't flush frequently repeated queries
     - Auto-cleanup of stale entries
+    - Pluggable storage: mmap'd segment store (default) or legacy .npy files
+    - Background compaction of dead segment space
+    - O(1) bookkeeping: index is an OrderedDict in LRU order plus a running
+      byte total, so puts and evictions never scan the index
+    - Index persisted incrementally: append-only journal, folded into an
+      index.json snapshot every SPECMEM_CACHE_SNAPSHOT_OPS records
+    - Write-behind: puts land in the RAM tier + a bounded pending map and a
+      background writer persists them in batches; when the queue is full
+      new writes are dropped (counted) so a slow disk never stalls embeds
+    - This per-project store is the private tier; misses fall through to the
+      machine-wide SharedEmbeddingStore, whose hits are copied back here
+    - Index entries record native dims and a model tag (registry in
+      models.json) so entries can be purged per model version, per dims or
+      per key prefix and reported as histograms (socket cache_* commands)
     - THREAD-SAFE: All operations are protected by locks
+
+    Tunables (env):
+    - SPECMEM_CACHE_BACKEND: 'segments' (default) or 'files'
+    - SPECMEM_CACHE_CODEC: 'float32' (default, lossless), or opt-in lossy 'float16' / 'int8' (per-vector scale)
+    - SPECMEM_CACHE_ZSTD: '1' to zstd-compress payloads (needs the zstandard package)
+    - SPECMEM_CACHE_SEGMENT_MB: segment file size (default 16)
+    - SPECMEM_CACHE_COMPACT_SEC: compaction check interval (default 60)
+    - SPECMEM_CACHE_COMPACT_DEAD_RATIO: dead fraction that triggers compaction (default 0.5)
+    - SPECMEM_CACHE_SNAPSHOT_OPS: journal records between index snapshots (default 20000)
+    - SPECMEM_RAM_CACHE_MB: RAM tier budget for native vectors (default 8)
+    - SPECMEM_TRANSFORM_MEMO_MB: RAM budget for memoized target-dim vectors (default 8)
+    - SPECMEM_CACHE_WRITE_BEHIND: '1' (default) background writes, '0' synchronous
+    - SPECMEM_CACHE_WRITE_QUEUE: max entries waiting for disk (default 4096)
+    - SPECMEM_CACHE_FLUSH_MS: how long the writer waits to coalesce a batch (default 200)
+    - SPECMEM_SHARED_CACHE: '0' (default); '1' enables the cross-project shared tier
+    - SPECMEM_SHARED_CACHE_DIR: shared tier location (default ~/.specmem/shared-embedding-cache)
+    - SPECMEM_SHARED_CACHE_MB: shared tier budget (default 2048)
+    - SPECMEM_SHARED_CACHE_PRUNE_SEC: shared tier prune interval (default 600)
+    - SPECMEM_CACHE_WARM: '1' (default) preloads the hottest entries into RAM on startup
+    - SPECMEM_CACHE_WARM_ENTRIES: max entries to preload (default: as many as the RAM tier holds)
     """
 
-    def __init__(self, cache_dir: Path, max_mb: int = 500, ram_cache_size: int = 100):
+    JOURNAL_FLUSH_OPS = 100  # Buffered journal lines between flushes
+    WRITE_BATCH = 256        # Max entries per background store write
+    WARM_HALF_LIFE_SEC = 86400  # Recency decay for the startup warm score
+    WARM_READ_CHUNK = 512
+
+    def __init__(self, cache_dir: Path, max_mb: int = 500, ram_cache_mb: Optional[float] = None):
         self.cache_dir = cache_dir / "embedding_cache"
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.max_bytes = max_mb * 1024 * 1024
-        self.ram_cache_size = ram_cache_size
+        if ram_cache_mb is None:
+            ram_cache_mb = float(os.environ.get('SPECMEM_RAM_CACHE_MB', '8'))
 
         # THREAD SAFETY: Locks for concurrent access
         self._ram_cache_lock = threading.Lock()
-        self._disk_lock = threading.Lock()
         self._index_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()  # One snapshot + journal rotation at a time
+
+        backend = os.environ.get('SPECMEM_CACHE_BACKEND', 'segments').lower()
+        codec_name = os.environ.get('SPECMEM_CACHE_CODEC', 'float32').strip().lower()
+        codec = CACHE_CODECS.get(codec_name)
+        if codec is None:
+            print(f"⚠️ Unknown SPECMEM_CACHE_CODEC '{codec_name}' (expected {', '.join(CACHE_CODECS)}) - using float32",
+                  file=sys.stderr)
+            codec = CODEC_FLOAT32
+        use_zstd = os.environ.get('SPECMEM_CACHE_ZSTD', '0') == '1'
+        if backend == 'files':
+            self.store = NpyFileStore(self.cache_dir, codec)
+        else:
+            self.store = SegmentStore(
+                self.cache_dir,
+                int(os.environ.get('SPECMEM_CACHE_SEGMENT_MB', '16')),
+                codec=codec,
+                use_zstd=use_zstd
+            )
 
-        # Small RAM cache for hot entries (LRU)
-        from collections import OrderedDict
-        self.ram_cache: OrderedDict = OrderedDict()
+        # Machine-wide content-addressed tier below this private one
+        self.shared: Optional[SharedEmbeddingStore] = None
+        self.shared_prune_interval = float(os.environ.get('SPECMEM_SHARED_CACHE_PRUNE_SEC', '600'))
+        if os.environ.get('SPECMEM_SHARED_CACHE', '0') == '1':
+            shared_dir = os.environ.get('SPECMEM_SHARED_CACHE_DIR',
+                                        os.path.expanduser('~/.specmem/shared-embedding-cache'))
+            try:
+                self.shared = SharedEmbeddingStore(
+                    Path(shared_dir),
+                    int(os.environ.get('SPECMEM_SHARED_CACHE_MB', '2048')),
+                    codec=codec,
+                    use_zstd=use_zstd
+                )
+            except Exception as e:
+                print(f"⚠️ Shared embedding cache disabled: {e}", file=sys.stderr)
+        self.compact_interval = float(os.environ.get('SPECMEM_CACHE_COMPACT_SEC', '60'))
+        self.compact_dead_ratio = float(os.environ.get('SPECMEM_CACHE_COMPACT_DEAD_RATIO', '0.5'))
+
+        # RAM tier for hot native vectors (TinyLFU admission, byte budget)
+        self.ram_cache = TinyLFURamCache(int(ram_cache_mb * 1024 * 1024))
 
-        # Index file for quick lookups
+        # Read-time transform memo: (key, target_dims, transform_epoch) -> vector
+        memo_mb = float(os.environ.get('SPECMEM_TRANSFORM_MEMO_MB', '8'))
+        self.transform_memo = TinyLFURamCache(int(memo_mb * 1024 * 1024), entry_bytes_hint=4096)
+        self._memo_lock = threading.Lock()
+        self.memo_hits = 0
+
+        # Index: key -> entry, kept in LRU order (oldest first) with a running byte total
         self.index_path = self.cache_dir / "index.json"
-        self.index: Dict[str, Dict] = {}
+        self.journal_path = self.cache_dir / "index.journal"
+        self._journal_prev_path = self.cache_dir / "index.journal.1"
+        self.snapshot_ops = int(os.environ.get('SPECMEM_CACHE_SNAPSHOT_OPS', '20000'))
+        self.index: OrderedDict = OrderedDict()
+        self._total_bytes = 0
+        self._journal_ops = 0
+        # Model tag (8 hex) -> full model identity, for purge/histograms
+        self.models_path = self.cache_dir / "models.json"
+        self.models: Dict[str, str] = {}
+        try:
+            with open(self.models_path, 'r') as f:
+                self.models = json.load(f)
+        except (FileNotFoundError, ValueError):
+            pass
         self._load_index()
+        self._journal_file = open(self.journal_path, 'a', buffering=64 * 1024)
+        atexit.register(self._flush_journal)
+        self._reconcile_index()
 
         # Stats (atomic-ish, not critical)
         self.hits = 0
         self.misses = 0
         self.disk_writes = 0
 
-        print(f"💾 Disk cache initialized: {self.cache_dir} (max {max_mb}MB)", file=sys.stderr)
+        self._start_maintenance_thread()
+
+        # Write-behind queue: key -> native vector not yet on disk (readable by get_many)
+        self.write_behind = os.environ.get('SPECMEM_CACHE_WRITE_BEHIND', '1') != '0'
+        self.write_queue_max = int(os.environ.get('SPECMEM_CACHE_WRITE_QUEUE', '4096'))
+        self.flush_interval = float(os.environ.get('SPECMEM_CACHE_FLUSH_MS', '200')) / 1000
+        self._pending: OrderedDict = OrderedDict()
+        self._pending_cv = threading.Condition()
+        self.dropped_writes = 0
+        if self.write_behind:
+            threading.Thread(target=self._writer_loop, daemon=True, name="cache-writer").start()
+            atexit.register(self.flush)
+
+        print(f"💾 Disk cache initialized: {self.cache_dir} (max {max_mb}MB, {self.store.name} backend)", file=sys.stderr)
+        if self.shared is not None:
+            print(f"🤝 Shared embedding cache: {self.shared.root}", file=sys.stderr)
+
+    def _reconcile_index(self):
+        """Make index.json agree with what the store actually holds. Called only during __init__."""
+        entries = self.store.entries()
+        if entries is None:
+            return
+        stored = {}
+        with self._index_lock:
+            for key, nbytes in entries:
+                stored[key] = nbytes
+                if key not in self.index:
+                    self._index_set(key, nbytes)
+            for key in [k for k in self.index if k not in stored]:
+                self._index_remove(key)
+
+    def _migrate_legacy_files(self):
+        """Move .npy entries left by the files backend into the segment store."""
+        moved = 0
+        for subdir in self.cache_dir.iterdir():
+            if not subdir.is_dir() or len(subdir.name) != 2:
+                continue
+            for path in subdir.iterdir():
+                try:
+                    if path.suffix == '.npy':
+                        embedding = np.load(path)
+                        stored = self.store.write(path.stem, embedding)
+                        with self._index_lock:
+                            if path.stem not in self.index:
+                                self._index_set(path.stem, stored)
+                        moved += 1
+                    path.unlink()
+                except Exception:
+                    pass
+            try:
+                subdir.rmdir()
+            except OSError:
+                pass
+        if moved:
+            print(f"📦 Migrated {moved} legacy .npy cache entries into segments", file=sys.stderr)
+            self._save_index()
+
+    def _start_maintenance_thread(self):
+        """Background legacy migration + segment compaction (segments backend) and shared-tier pruning."""
+        segments = isinstance(self.store, SegmentStore)
+        if not segments and self.shared is None:
+            return
+
+        def maintenance():
+            if segments:
+                try:
+                    self._migrate_legacy_files()
+                except Exception as e:
+                    print(f"⚠️ Legacy cache migration failed: {e}", file=sys.stderr)
+            last_prune = 0.0
+            while True:
+                time.sleep(self.compact_interval)
+                if segments:
+                    try:
+                        self.store.compact(self.compact_dead_ratio)
+                        self.store.flush()
+                    except Exception as e:
+                        print(f"⚠️ Cache compaction failed: {e}", file=sys.stderr)
+                if self.shared is not None and time.time() - last_prune >= self.shared_prune_interval:
+                    last_prune = time.time()
+                    try:
+                        self.shared.prune()
+                    except Exception as e:
+                        print(f"⚠️ Shared cache prune failed: {e}", file=sys.stderr)
+
+        threading.Thread(target=maintenance, daemon=True, name="cache-compactor").start()
+
+    # ─── Index bookkeeping (caller holds _index_lock) ──────────────────────
+
+    def _index_set(self, key: str, size: int, now: Optional[float] = None, journal: bool = True,
+                   dims: int = 0, model: str = ''):
+        now = now or time.time()
+        old = self.index.pop(key, None)
+        if old is not None:
+            self._total_bytes -= old.get('size', 0)
+        self.index[key] = {
+            'size': size,
+            'created': old.get('created', now) if old else now,
+            'accessed': now,
+            'hits': old.get('hits', 0) if old else 0,
+            'dims': dims or (old.get('dims', 0) if old else 0),
+            'model': model or (old.get('model', '') if old else '')
+        }
+        self._total_bytes += size
+        if journal:
+            entry = self.index[key]
+            self._journal_append(f"P {key} {size} {now:.0f} {entry['dims']} {entry['model'] or '-'}\n")
+
+    def _index_touch(self, key: str, now: Optional[float] = None, journal: bool = True):
+        entry = self.index.get(key)
+        if entry is None:
+            return
+        entry['accessed'] = now or time.time()
+        entry['hits'] = entry.get('hits', 0) + 1
+        self.index.move_to_end(key)
+        if journal:
+            self._journal_append(f"A {key} {entry['accessed']:.0f}\n")
+
+    def _index_remove(self, key: str, journal: bool = True):
+        entry = self.index.pop(key, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry.get('size', 0)
+        if journal:
+            self._journal_append(f"D {key}\n")
+
+    def _journal_append(self, line: str):
+        try:
+            self._journal_file.write(line)
+            self._journal_ops += 1
+            if self._journal_ops % self.JOURNAL_FLUSH_OPS == 0:
+                self._journal_file.flush()
+        except Exception:
+            pass
+
+    def _flush_journal(self):
+        with self._index_lock:
+            try:
+                self._journal_file.flush()
+            except Exception:
+                pass
+
+    def _replay_journal(self, path: Path):
+        """Apply journal records on top of the loaded snapshot. A torn last line is skipped."""
+        if not path.exists():
+            return
+        with open(path, 'r') as f:
+            for line in f:
+                parts = line.split()
+                try:
+                    if parts[0] == 'P' and len(parts) == 6:
+                        self._index_set(parts[1], int(parts[2]), float(parts[3]), journal=False,
+                                        dims=int(parts[4]), model=parts[5].strip('-'))
+                    elif parts[0] == 'P' and len(parts) == 4:
+                        self._index_set(parts[1], int(parts[2]), float(parts[3]), journal=False)
+                    elif parts[0] == 'A' and len(parts) == 3:
+                        self._index_touch(parts[1], float(parts[2]), journal=False)
+                    elif parts[0] == 'D' and len(parts) == 2:
+                        self._index_remove(parts[1], journal=False)
+                except (ValueError, IndexError):
+                    continue
 
     def _load_index(self):
-        """Load cache index from disk. Called only during __init__."""
+        """Load snapshot + journal(s) from disk. Called only during __init__."""
         try:
             if self.index_path.exists():
                 with open(self.index_path, 'r') as f:
-                    self.index = json.load(f)
+                    snapshot = json.load(f)
+                # Snapshots are written in LRU order; sorting also handles pre-journal index files
+                for key, entry in sorted(snapshot.items(), key=lambda kv: kv[1].get('accessed', 0)):
+                    self.index[key] = entry
+                    self._total_bytes += entry.get('size', 0)
+            # .1 is left behind only if the process died mid-snapshot
+            self._replay_journal(self._journal_prev_path)
+            self._replay_journal(self.journal_path)
         except Exception as e:
             # Start fresh on any error
-            self.index = {}
+            self.index = OrderedDict()
+            self._total_bytes = 0
+
+    def _rotate_journal(self):
+        """Start a fresh journal; the old one stays as .1 until the snapshot lands. Lock held."""
+        self._journal_file.close()
+        if self._journal_prev_path.exists():
+            # Previous snapshot never finished - keep its records too
+            with open(self._journal_prev_path, 'a') as prev, open(self.journal_path, 'r') as cur:
+                prev.write(cur.read())
+            self.journal_path.unlink()
+        else:
+            os.replace(self.journal_path, self._journal_prev_path)
+        self._journal_file = open(self.journal_path, 'a', buffering=64 * 1024)
+        self._journal_ops = 0
+
+    def _save_index(self, if_due: bool = False):
+        """
+        Snapshot the index (atomic write) and truncate the journal. THREAD-SAFE.
 
-    def _save_index(self):
-        """Save cache index to disk using atomic write. THREAD-SAFE."""
+        Serialized by _snapshot_lock: otherwise a slower concurrent snapshot
+        could land an older copy over a newer one and delete the .1 journal
+        that still holds the records in between. if_due=True skips the
+        snapshot unless the journal still holds snapshot_ops records, so
+        threads that all saw it due write one snapshot between them.
+        """
         try:
-            with self._index_lock:
-                # Make a copy to avoid holding lock during I/O
-                index_copy = dict(self.index)
-
-            # Atomic write: write to temp file, then rename
-            temp_path = self.index_path.with_suffix('.tmp')
-            with open(temp_path, 'w') as f:
-                json.dump(index_copy, f)
-            temp_path.rename(self.index_path)
+            with self._snapshot_lock:
+                with self._index_lock:
+                    if if_due and self._journal_ops < self.snapshot_ops:
+                        return
+                    # Copy in LRU order and rotate the journal; do the I/O outside the index lock
+                    index_copy = dict(self.index)
+                    self._rotate_journal()
+
+                # Atomic write: write to temp file, then rename
+                temp_path = self.index_path.with_suffix('.tmp')
+                with open(temp_path, 'w') as f:
+                    json.dump(index_copy, f)
+                os.replace(temp_path, self.index_path)
+                self._journal_prev_path.unlink()
         except Exception as e:
             # Clean up temp file if it exists
             try:
@@ -644,181 +2310,450 @@ class DiskBackedEmbeddingCache:
             except:
                 pass
 
-    def _text_hash(self, text: str, dims: int) -> str:
-        """Generate cache key from text and target dimensions"""
-        content = f"{text}:{dims}"
+    def _text_hash(self, text: str, model_id: str) -> str:
+        """Generate cache key from model identity and text (no target dimension)"""
+        content = f"{model_id}:{text}"
         return hashlib.sha256(content.encode()).hexdigest()[:16]
 
-    def _get_cache_path(self, key: str) -> Path:
-        """Get file path for a cache key"""
-        # Use first 2 chars as subdirectory for better filesystem performance
-        subdir = self.cache_dir / key[:2]
-        subdir.mkdir(exist_ok=True)
-        return subdir / f"{key}.npy"
-
-    def get(self, text: str, dims: int) -> Optional[np.ndarray]:
-        """Get embedding from cache (RAM first, then disk). THREAD-SAFE."""
-        # EDGE CASE: Empty or None text
-        if not text or not text.strip():
-            return None
+    def _model_tag(self, model_id: str) -> str:
+        """Short tag stored per index entry; registered in models.json on first use."""
+        tag = hashlib.sha256(model_id.encode()).hexdigest()[:8]
+        if tag not in self.models:
+            with self._index_lock:
+                self.models[tag] = model_id
+                models = dict(self.models)
+            try:
+                temp_path = self.models_path.with_suffix('.tmp')
+                with open(temp_path, 'w') as f:
+                    json.dump(models, f)
+                os.replace(temp_path, self.models_path)
+            except Exception:
+                pass
+        return tag
+
+    def get_transformed(self, text: str, model_id: str, dims: int, epoch: int = 0) -> Optional[np.ndarray]:
+        """Memoized read-time transform of a cached native vector. THREAD-SAFE."""
+        memo_key = (self._text_hash(text, model_id), dims, epoch)
+        with self._memo_lock:
+            vec = self.transform_memo.get(memo_key)
+            if vec is None:
+                return None
+            self.memo_hits += 1
+            return vec.copy()
+
+    def put_transformed(self, text: str, model_id: str, dims: int, embedding: np.ndarray, epoch: int = 0):
+        """Remember a transformed vector for this (text, model, target dims, transform epoch)."""
+        if self.transform_memo.max_bytes <= 0:
+            return
+        memo_key = (self._text_hash(text, model_id), dims, epoch)
+        with self._memo_lock:
+            self.transform_memo.put(memo_key, embedding.copy())
 
-        # EDGE CASE: Invalid dimensions
-        if dims <= 0:
-            return None
+    def get(self, text: str, model_id: str, native_dims: int = 0) -> Optional[np.ndarray]:
+        """Get NATIVE embedding from cache (RAM first, then disk). THREAD-SAFE."""
+        return self.get_many([text], model_id, native_dims)[0]
 
-        key = self._text_hash(text, dims)
+    def get_many(self, texts: List[str], model_id: str, native_dims: int = 0) -> List[Optional[np.ndarray]]:
+        """
+        Batched get: hash once, probe the RAM tier under one lock, read all
+        remaining keys from the store in one pass, then one index update and
+        one RAM promotion. Returns a list aligned with texts (None = miss). THREAD-SAFE.
+        """
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        # EDGE CASE: Empty or None text never hits (and isn't counted)
+        keys = [self._text_hash(t, model_id) if t and t.strip() else None for t in texts]
 
-        # Check RAM cache first (with lock)
+        # Check RAM cache first (one lock round-trip)
+        pending: List[int] = []
         with self._ram_cache_lock:
-            if key in self.ram_cache:
-                self.hits += 1
-                self.ram_cache.move_to_end(key)  # LRU update
+            for i, key in enumerate(keys):
+                if key is None:
+                    continue
+                vec = self.ram_cache.get(key)  # Counts the access for admission
+                if vec is None:
+                    pending.append(i)
+                    continue
                 # Return a copy to prevent external modification
-                return self.ram_cache[key].copy()
+                results[i] = vec.copy()
+
+        if pending and self.write_behind:
+            # Written but not yet flushed by the write-behind thread
+            with self._pending_cv:
+                still_pending = []
+                for i in pending:
+                    queued = self._pending.get(keys[i])
+                    if queued is None:
+                        still_pending.append(i)
+                    else:
+                        results[i] = queued[0].copy()
+            pending = still_pending
+
+        if pending:
+            # Check disk store (store does its own locking and drops corrupt entries)
+            try:
+                loaded = self.store.read_many([keys[i] for i in pending])
+            except Exception:
+                loaded = [None] * len(pending)
+
+            found: List[Tuple[str, np.ndarray]] = []
+            stale: List[str] = []
+            for i, embedding in zip(pending, loaded):
+                if embedding is None:
+                    continue
+                # EDGE CASE: Validate native dimensions match the loaded model
+                if native_dims > 0 and embedding.shape[-1] != native_dims:
+                    stale.append(keys[i])
+                    continue
+                results[i] = embedding.copy()
+                found.append((keys[i], embedding))
 
-        # Check disk cache (with lock)
-        cache_path = self._get_cache_path(key)
-        with self._disk_lock:
-            if cache_path.exists():
+            for key in stale:
+                # Dimension mismatch - stale cache entry
                 try:
-                    embedding = np.load(cache_path)
+                    self.store.delete(key)
+                except:
+                    pass
 
-                    # EDGE CASE: Validate dimensions match
-                    if embedding.shape[-1] != dims:
-                        # Dimension mismatch - stale cache entry
-                        try:
-                            cache_path.unlink()
-                        except:
-                            pass
-                        self.misses += 1
-                        return None
+            if found:
+                # Update LRU position (re-index entries a crash dropped from the journal)
+                with self._index_lock:
+                    for key, embedding in found:
+                        if key in self.index:
+                            self._index_touch(key)
+                        else:
+                            self._index_set(key, embedding.nbytes)
+                    snapshot_due = self._journal_ops >= self.snapshot_ops
 
-                    self.hits += 1
+                # Read-only workloads journal only touches - compact them here too
+                if snapshot_due:
+                    self._save_index(if_due=True)
 
-                    # Promote to RAM cache
-                    self._add_to_ram_cache(key, embedding)
+                # Promote to RAM cache
+                self._add_many_to_ram_cache(found)
 
-                    # Update access time in index
-                    with self._index_lock:
-                        if key in self.index:
-                            self.index[key]['accessed'] = time.time()
+            pending = [i for i in pending if results[i] is None]
 
-                    return embedding.copy()
-                except Exception as e:
-                    # Corrupted cache file - remove it
-                    try:
-                        cache_path.unlink()
-                    except:
-                        pass
+        if pending and self.shared is not None:
+            # Fall through to the cross-project tier; copy hits into this project's tiers
+            try:
+                loaded = self.shared.read_many([keys[i] for i in pending])
+            except Exception:
+                loaded = [None] * len(pending)
 
-        self.misses += 1
-        return None
+            found = []
+            for i, embedding in zip(pending, loaded):
+                if embedding is None or (native_dims > 0 and embedding.shape[-1] != native_dims):
+                    continue
+                results[i] = embedding.copy()
+                found.append((keys[i], embedding))
+            if found:
+                self._add_many_to_ram_cache(found)
+                tag = self._model_tag(model_id)
+                self._enqueue_writes([(key, embedding, tag) for key, embedding in found])
+
+        hits = sum(1 for r in results if r is not None)
+        self.hits += hits
+        self.misses += sum(1 for k in keys if k is not None) - hits
+        return results
+
+    # ─── Startup warm ──────────────────────────────────────────────────────
+
+    def start_warm(self):
+        """Preload the RAM tier in the background (requests are served meanwhile)."""
+        if os.environ.get('SPECMEM_CACHE_WARM', '1') == '0' or self.ram_cache.max_bytes <= 0:
+            return
+        threading.Thread(target=self.warm, daemon=True, name="cache-warmer").start()
+
+    def warm(self, max_entries: Optional[int] = None) -> int:
+        """
+        Load the hottest entries - scored by hit count decayed by time since
+        last access - into the RAM tier with one location-ordered read pass.
+        Returns the number of entries preloaded.
+        """
+        start = time.time()
+        if max_entries is None:
+            max_entries = int(os.environ.get('SPECMEM_CACHE_WARM_ENTRIES', '0')) or \
+                self.ram_cache.max_bytes // 1536
+        with self._index_lock:
+            candidates = [(key, entry.get('accessed', 0), entry.get('hits', 0)) for key, entry in self.index.items()]
+        if not candidates or max_entries <= 0:
+            return 0
+
+        now = time.time()
+        scored = heapq.nlargest(
+            max_entries, candidates,
+            key=lambda c: (1 + c[2]) * 0.5 ** (max(0.0, now - c[1]) / self.WARM_HALF_LIFE_SEC)
+        )
+        hits = {key: count for key, _, count in scored}
+
+        keys = [key for key, _, _ in scored]
+        if hasattr(self.store, 'sort_by_location'):
+            keys = self.store.sort_by_location(keys)
+        loaded: Dict[str, np.ndarray] = {}
+        for i in range(0, len(keys), self.WARM_READ_CHUNK):
+            chunk = keys[i:i + self.WARM_READ_CHUNK]
+            try:
+                for key, vec in zip(chunk, self.store.read_many(chunk)):
+                    if vec is not None:
+                        loaded[key] = vec
+            except Exception:
+                continue
+
+        # Take the hottest that fit, then insert coldest-first so the hottest sit at the MRU end
+        fitting, budget = [], self.ram_cache.main_max
+        for key, _, _ in scored:
+            vec = loaded.get(key)
+            if vec is None:
+                continue
+            if vec.nbytes > budget:
+                break
+            budget -= vec.nbytes
+            fitting.append((key, vec))
+        warmed = 0
+        with self._ram_cache_lock:
+            for key, vec in reversed(fitting):
+                if self.ram_cache.preload(key, vec, hits[key] + 1):
+                    warmed += 1
+        if warmed:
+            print(f"🔥 Cache warm: {warmed} hot entries preloaded in {(time.time() - start) * 1000:.0f}ms",
+                  file=sys.stderr)
+        return warmed
 
     def _add_to_ram_cache(self, key: str, embedding: np.ndarray):
         """Add to RAM cache with LRU eviction. THREAD-SAFE."""
+        self._add_many_to_ram_cache([(key, embedding)])
+
+    def _add_many_to_ram_cache(self, items: List[Tuple[str, np.ndarray]]):
+        """Offer several entries to the RAM tier under one lock (admission decides). THREAD-SAFE."""
         with self._ram_cache_lock:
-            if len(self.ram_cache) >= self.ram_cache_size:
-                self.ram_cache.popitem(last=False)  # Remove oldest
-            # Store a copy to prevent external modification
-            self.ram_cache[key] = embedding.copy()
+            for key, embedding in items:
+                # Store a copy to prevent external modification
+                self.ram_cache.put(key, embedding.copy())
 
-    def put(self, text: str, dims: int, embedding: np.ndarray):
-        """Store embedding in cache (disk + RAM). THREAD-SAFE."""
+    def put(self, text: str, model_id: str, embedding: np.ndarray):
+        """Store NATIVE embedding in cache (disk + RAM). THREAD-SAFE."""
+        self.put_many([text], model_id, [embedding])
+
+    def put_many(self, texts: List[str], model_id: str, embeddings):
+        """
+        Batched put: entries go to the RAM tier right away; disk persistence
+        (one grouped store write, one index update, a single eviction/snapshot
+        check) happens on the write-behind thread. THREAD-SAFE.
+        """
         # EDGE CASE: Empty text or invalid embedding
-        if not text or not text.strip():
-            return
-        if embedding is None or embedding.size == 0:
-            return
-        if dims <= 0:
+        tag = self._model_tag(model_id)
+        items = [
+            (self._text_hash(text, model_id), np.array(embedding, copy=True), tag)
+            for text, embedding in zip(texts, embeddings)
+            if text and text.strip() and embedding is not None and embedding.size > 0
+        ]
+        if not items:
             return
 
-        key = self._text_hash(text, dims)
-        cache_path = self._get_cache_path(key)
+        # Add to RAM cache
+        self._add_many_to_ram_cache([(key, embedding) for key, embedding, _ in items])
+        self._enqueue_writes(items)
+
+    def _enqueue_writes(self, items: List[Tuple[str, np.ndarray, str]]):
+        """Hand (key, vector, model tag) entries to the write-behind thread (or persist inline)."""
+        if not self.write_behind:
+            self._persist(items)
+            return
 
+        with self._pending_cv:
+            for key, embedding, tag in items:
+                if key not in self._pending and len(self._pending) >= self.write_queue_max:
+                    # Disk can't keep up - drop rather than block the embed (RAM tier still has it)
+                    self.dropped_writes += 1
+                    continue
+                self._pending[key] = (embedding, tag)
+            if len(self._pending) >= self.WRITE_BATCH:
+                self._pending_cv.notify_all()
+
+    def _writer_loop(self):
+        """Background writer: drain the pending map to the store in batches."""
+        while True:
+            with self._pending_cv:
+                while not self._pending:
+                    self._pending_cv.wait()
+                if len(self._pending) < self.WRITE_BATCH:
+                    # Give puts a moment to coalesce into one grouped write
+                    self._pending_cv.wait(timeout=self.flush_interval)
+                batch = [item for _, item in zip(range(self.WRITE_BATCH), self._pending.items())]
+
+            self._persist([(key, embedding, tag) for key, (embedding, tag) in batch])
+
+            with self._pending_cv:
+                for key, queued in batch:
+                    # Only clear if nobody re-put the key while we were writing
+                    if self._pending.get(key) is queued:
+                        del self._pending[key]
+                self._pending_cv.notify_all()
+
+    def flush(self, timeout: float = 10.0):
+        """Block until the write-behind queue is drained (or timeout)."""
+        deadline = time.time() + timeout
+        with self._pending_cv:
+            while self._pending and time.time() < deadline:
+                self._pending_cv.notify_all()
+                self._pending_cv.wait(timeout=0.05)
+
+    def _persist(self, items: List[Tuple[str, np.ndarray, str]]):
+        """Write (key, vector, model tag) entries to the store and index them."""
         try:
-            # Save to disk (with lock)
-            with self._disk_lock:
-                # Write to temp file first, then rename (atomic on POSIX)
-                temp_path = cache_path.with_suffix('.tmp')
-                np.save(temp_path, embedding)
-                temp_path.rename(cache_path)
+            keys = [key for key, _, _ in items]
+            embeddings = [embedding for _, embedding, _ in items]
+            # Save to disk (store does its own locking); budget counts encoded bytes
+            sizes = self.store.write_many(keys, embeddings)
 
-            self.disk_writes += 1
+            self.disk_writes += len(items)
+
+            if self.shared is not None:
+                # Publish to the shared tier (entries already there are skipped)
+                try:
+                    self.shared.write_many(keys, embeddings)
+                except Exception:
+                    pass
 
             # Update index (with lock)
             with self._index_lock:
-                self.index[key] = {
-                    'dims': dims,
-                    'size': embedding.nbytes,
-                    'created': time.time(),
-                    'accessed': time.time()
-                }
-
-            # Add to RAM cache
-            self._add_to_ram_cache(key, embedding)
+                for (key, embedding, tag), size in zip(items, sizes):
+                    self._index_set(key, size, dims=embedding.shape[-1], model=tag)
+                snapshot_due = self._journal_ops >= self.snapshot_ops
 
             # Check if we need to evict old entries
             self._maybe_evict()
 
-            # Save index periodically (every 100 writes)
-            if self.disk_writes % 100 == 0:
-                self._save_index()
+            # Fold the journal into a fresh snapshot once it has grown enough
+            if snapshot_due:
+                self._save_index(if_due=True)
 
         except Exception as e:
-            # Clean up temp file if it exists
-            try:
-                temp_path = cache_path.with_suffix('.tmp')
-                if temp_path.exists():
-                    temp_path.unlink()
-            except:
-                pass
+            # Don't fail embedding requests on cache write errors
+            pass
 
     def _maybe_evict(self):
-        """Evict old entries if cache is too large. THREAD-SAFE."""
+        """Evict least-recently-used entries if cache is too large. O(1) per entry. THREAD-SAFE."""
         with self._index_lock:
-            # Calculate current size
-            total_size = sum(entry.get('size', 0) for entry in self.index.values())
-
-            if total_size <= self.max_bytes:
+            if self._total_bytes <= self.max_bytes:
                 return
 
-            # Sort by access time, evict oldest
-            sorted_keys = sorted(
-                self.index.keys(),
-                key=lambda k: self.index[k].get('accessed', 0)
-            )
-
             evicted = 0
-            for key in sorted_keys:
-                if total_size <= self.max_bytes * 0.8:  # Evict to 80%
-                    break
-
-                cache_path = self._get_cache_path(key)
+            while self.index and self._total_bytes > self.max_bytes * 0.8:  # Evict to 80%
+                key = next(iter(self.index))  # Oldest access
                 try:
-                    with self._disk_lock:
-                        if cache_path.exists():
-                            cache_path.unlink()
-                    total_size -= self.index[key].get('size', 0)
-                    del self.index[key]
-                    evicted += 1
+                    self.store.delete(key)
                 except:
                     pass
+                self._index_remove(key)
+                evicted += 1
 
-            if evicted > 0:
-                print(f"🗑️ Disk cache evicted {evicted} old entries", file=sys.stderr)
-
-        # Save index outside the lock to avoid blocking other operations
         if evicted > 0:
-            self._save_index()
+            print(f"🗑️ Disk cache evicted {evicted} old entries", file=sys.stderr)
+
+    # ─── Management (socket cache_* commands) ──────────────────────────────
+
+    def purge(self, model: Optional[str] = None, dims: Optional[int] = None,
+              hash_prefix: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Delete private-tier entries matching ALL given filters: model (tag or
+        substring of the model identity), native dims, cache-key prefix. The
+        key is the first 16 hex chars of sha256(model_id:text), so hash_prefix
+        selects a key range, not entries by content hash. Empty or
+        whitespace-only filters are rejected (an empty substring would match
+        every model). The shared
+        tier is left alone - its keys are namespaced by model identity, so
+        entries for a retired model are unreachable and age out via pruning.
+        """
+        for name, value in (('model', model), ('hash_prefix', hash_prefix)):
+            if value is not None and (not isinstance(value, str) or not value.strip()):
+                return {'error': f'purge filter {name} must be a non-empty string'}
+        model = model.strip() if model is not None else None
+        hash_prefix = hash_prefix.strip().lower() if hash_prefix is not None else None
+        if model is None and dims is None and hash_prefix is None:
+            return {'error': 'purge needs at least one of model, dims, hash_prefix'}
+        self.flush()
+        with self._index_lock:
+            tags = None
+            if model is not None:
+                tags = {tag for tag, model_id in self.models.items() if model == tag or model in model_id}
+            victims = [
+                key for key, entry in self.index.items()
+                if (tags is None or entry.get('model') in tags)
+                and (dims is None or entry.get('dims') == dims)
+                and (hash_prefix is None or key.startswith(hash_prefix))
+            ]
+            freed = 0
+            for key in victims:
+                try:
+                    self.store.delete(key)
+                except Exception:
+                    pass
+                freed += self.index[key].get('size', 0)
+                self._index_remove(key)
+
+        with self._ram_cache_lock:
+            for key in victims:
+                self.ram_cache.discard(key)
+        with self._memo_lock:
+            # Memo keys embed the cache key; dropping it all is cheaper than matching
+            self.transform_memo.clear()
+        self._save_index()
+
+        print(f"🧹 Cache purge: {len(victims)} entries ({freed / 1024 / 1024:.1f}MB)", file=sys.stderr)
+        return {'purged': len(victims), 'freed_mb': round(freed / 1024 / 1024, 2)}
+
+    def compact(self) -> Dict[str, Any]:
+        """Reclaim every segment holding dead records and fold the journal into a snapshot."""
+        self.flush()
+        reclaimed = self.store.compact(min_dead_ratio=1e-9, include_active=True)
+        self.store.flush()
+        self._save_index()
+        return {'segments_reclaimed': reclaimed, 'store': self.store.get_stats()}
+
+    def histograms(self) -> Dict[str, Any]:
+        """Entry count + bytes by model, native dims, age since last access and hit count."""
+        age_buckets = ((3600, '<1h'), (86400, '<1d'), (7 * 86400, '<7d'), (30 * 86400, '<30d'))
+        hit_buckets = ((0, '0'), (1, '1'), (9, '2-9'))
+        by_model: Dict[str, Dict[str, Any]] = {}
+        by_dims: Dict[str, Dict[str, int]] = {}
+        by_age: Dict[str, Dict[str, int]] = {}
+        by_hits: Dict[str, Dict[str, int]] = {}
+
+        def add(hist, label, size):
+            bucket = hist.setdefault(label, {'entries': 0, 'bytes': 0})
+            bucket['entries'] += 1
+            bucket['bytes'] += size
+
+        now = time.time()
+        with self._index_lock:
+            models = dict(self.models)
+            for entry in self.index.values():
+                size = entry.get('size', 0)
+                add(by_model, models.get(entry.get('model'), 'unknown'), size)
+                add(by_dims, str(entry.get('dims') or 'unknown'), size)
+                age = now - entry.get('accessed', 0)
+                add(by_age, next((label for limit, label in age_buckets if age < limit), 'older'), size)
+                hits = entry.get('hits', 0)
+                add(by_hits, next((label for limit, label in hit_buckets if hits <= limit), '10+'), size)
+
+        return {'by_model': by_model, 'by_dims': by_dims, 'by_age': by_age, 'by_hits': by_hits}
 
     def get_stats(self) -> Dict:
         """Get cache statistics. THREAD-SAFE."""
         with self._index_lock:
-            total_size = sum(entry.get('size', 0) for entry in self.index.values())
+            total_size = self._total_bytes
             entries = len(self.index)
+            journal_ops = self._journal_ops
+
+        with self._pending_cv:
+            write_queue = len(self._pending)
 
         with self._ram_cache_lock:
-            ram_cache_size = len(self.ram_cache)
+            ram_tier = self.ram_cache.get_stats()
+
+        with self._memo_lock:
+            memo_tier = self.transform_memo.get_stats()
 
         return {
             'entries': entries,
@@ -827,7 +2762,215 @@ class DiskBackedEmbeddingCache:
             'hits': self.hits,
             'misses': self.misses,
             'hit_rate': round(self.hits / max(1, self.hits + self.misses) * 100, 1),
-            'ram_cache_size': ram_cache_size
+            'ram_cache_size': ram_tier['entries'],
+            'ram_tier': ram_tier,
+            'transform_memo': memo_tier,
+            'transform_memo_hits': self.memo_hits,
+            'journal_records': journal_ops,
+            'write_queue': write_queue,
+            'dropped_writes': self.dropped_writes,
+            'store': self.store.get_stats(),
+            'shared': self.shared.get_stats() if self.shared is not None else None
+        }
+
+
+class PostgresEmbeddingIndex:
+    """
+    Reuse embeddings already stored in the project schema before running
+    inference. Rows written by the backfill carry an embedding_hash column
+    (sha256 of model namespace + target dims + embedded text), so identical
+    content in another branch or a duplicated memory is one indexed lookup
+    instead of a model call - after a fresh container start with an empty
+    disk cache most of a re-index becomes cheap lookups.
+
+    Only backfill batches ('backfill:<table>') consult the index, and only
+    against their own table, so socket requests never wait on a database
+    round-trip. The column and its index are added (IF NOT EXISTS) by
+    ensure_schema() from the server startup path; later connections only
+    detect which tables carry the column, and tables without it are skipped.
+    Writers outside this server update content without clearing the hash,
+    so a match is only reused after the row's current text (TEXT_COLUMNS,
+    composed by row_text exactly as the backfill does) is checked against it.
+    One persistent connection is kept and re-opened after
+    SPECMEM_PG_REUSE_RETRY_SEC when the database is down.
+
+    Tunables (env):
+    - SPECMEM_PG_REUSE: '1' (default) enables the lookup stage, '0' disables it
+    - SPECMEM_PG_REUSE_RETRY_SEC: back-off after a connection failure (default 60)
+    """
+
+    TABLES = ('memories', 'codebase_files', 'code_definitions')
+
+    # Columns the backfill builds each table's embedded text from (see row_text)
+    TEXT_COLUMNS = {
+        'memories': ('content',),
+        'codebase_files': ('file_path', 'content'),
+        'code_definitions': ('definition_type', 'name', 'signature', 'docstring', 'language', 'file_path'),
+    }
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._conn = None
+        self._lock = threading.Lock()
+        self._hash_tables: Optional[List[str]] = None
+        self._retry_at = 0.0
+        self.retry_interval = float(os.environ.get('SPECMEM_PG_REUSE_RETRY_SEC', '60'))
+        self.lookups = 0
+        self.hits = 0
+        self.stale = 0
+
+    @staticmethod
+    def row_text(table: str, values) -> str:
+        """Text a row is embedded from, given its TEXT_COLUMNS values in order."""
+        if table == 'codebase_files':
+            return f"{values[0]}\n{values[1]}"  # path + content
+        if table == 'code_definitions':
+            kind, name, signature, docstring, language, file_path = values
+            return f"{kind} {name}\n{signature or ''}\n{docstring or ''}\nFile: {file_path}\nLanguage: {language}"
+        return values[0]
+
+    @staticmethod
+    def content_hash(namespace: str, dims: int, text: str) -> str:
+        return hashlib.sha256(f"{namespace}:{dims}:{text}".encode()).hexdigest()[:32]
+
+    def _connection(self):
+        """Open (or reuse) the connection and detect the hash-carrying tables. Lock held."""
+        if self._conn is not None and not self._conn.closed:
+            return self._conn
+        if time.time() < self._retry_at:
+            return None
+        conn = self._connect()
+        if conn is None:
+            self._retry_at = time.time() + self.retry_interval
+            return None
+        self._conn = conn
+        if self._hash_tables is None:
+            self._hash_tables = self._detect_hash_columns(conn)
+        return conn
+
+    def _detect_hash_columns(self, conn) -> List[str]:
+        """Tables that already have embedding_hash (read-only; the schema change is ensure_schema's job)."""
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT table_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = ANY(%s)
+              AND column_name = 'embedding_hash'
+        """, (list(self.TABLES),))
+        present = {r[0] for r in cursor.fetchall()}
+        cursor.close()
+        conn.commit()
+        return [table for table in self.TABLES if table in present]
+
+    def ensure_schema(self) -> List[str]:
+        """Add embedding_hash + its index where missing. Called once from the startup path."""
+        with self._lock:
+            try:
+                conn = self._connection()
+                if conn is None:
+                    return []
+                self._hash_tables = self._ensure_hash_columns(conn)
+            except Exception as e:
+                print(f"⚠️ embedding_hash migration skipped: {e}", file=sys.stderr)
+                self._reset()
+            return list(self._hash_tables or [])
+
+    def _ensure_hash_columns(self, conn) -> List[str]:
+        """Add embedding_hash + its index to each table that exists. Returns tables that have it."""
+        ready = []
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT table_name FROM information_schema.tables
+            WHERE table_schema = current_schema() AND table_name = ANY(%s)
+        """, (list(self.TABLES),))
+        existing = {r[0] for r in cursor.fetchall()}
+        conn.commit()
+        for table in self.TABLES:
+            if table not in existing:
+                continue
+            try:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS embedding_hash TEXT")
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_embedding_hash ON {table} (embedding_hash)")
+                conn.commit()
+                ready.append(table)
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️ embedding_hash unavailable on {table}: {e}", file=sys.stderr)
+        cursor.close()
+        if ready:
+            print(f"🔗 Postgres embedding reuse: {', '.join(ready)}", file=sys.stderr)
+        return ready
+
+    def _reset(self):
+        """Drop a broken connection and back off. Lock held."""
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+        self._retry_at = time.time() + self.retry_interval
+
+    def hash_tables(self) -> List[str]:
+        """Tables whose rows carry embedding_hash (connects on first call)."""
+        with self._lock:
+            try:
+                self._connection()
+            except Exception:
+                self._reset()
+            return list(self._hash_tables or [])
+
+    def lookup(self, hashes: List[str], dims: int, table: str, texts: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Batch-query one hash-carrying table; returns hash -> stored embedding.
+        Other writers update content without clearing embedding_hash, so a
+        row is only reused when its current text is still the text the hash
+        was asked for.
+        """
+        found: Dict[str, np.ndarray] = {}
+        if not hashes or table not in self.TABLES:
+            return found
+        wanted = dict(zip(hashes, texts))
+        columns = ', '.join(self.TEXT_COLUMNS[table])
+        with self._lock:
+            try:
+                conn = self._connection()
+                if conn is None or table not in (self._hash_tables or []):
+                    return found
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"SELECT embedding_hash, embedding::text, {columns} FROM {table} "
+                    f"WHERE embedding_hash = ANY(%s) AND embedding IS NOT NULL",
+                    (hashes,)
+                )
+                rows = cursor.fetchall()
+                cursor.close()
+                conn.commit()
+            except Exception as e:
+                print(f"⚠️ Postgres embedding lookup failed: {e}", file=sys.stderr)
+                self._reset()
+                return found
+
+        stale = 0
+        for content_hash, text, *values in rows:
+            if content_hash in found:
+                continue
+            if self.row_text(table, values) != wanted.get(content_hash):
+                stale += 1  # Content changed under an old hash - not this text's vector
+                continue
+            vec = np.fromstring(text.strip('[]'), sep=',', dtype=np.float32)
+            if vec.shape[0] == dims:
+                found[content_hash] = vec
+        self.lookups += len(hashes)
+        self.hits += len(found)
+        self.stale += stale
+        return found
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'tables': list(self._hash_tables or []),
+            'connected': self._conn is not None,
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'stale': self.stale
         }
 
 
@@ -962,13 +3105,31 @@ class AdaptiveBatchSizer:
     - When resources available: increase batch size for throughput
     - When resources tight: decrease batch size to stay under limits
     - Same quality embeddings, smarter resource usage
+
+    CLOSED-LOOP AUTOTUNER: embed_batch reports every model.encode() call via
+    record_batch(). The sizer hill-climbs a ladder of candidate batch sizes,
+    scoring each by measured texts/sec with a p95 per-chunk latency budget,
+    and never goes above the CPU/RAM ceiling derived from ResourceConfig.
+    The best size differs a lot between AVX2 laptops and AVX512 servers,
+    so it is measured on live traffic instead of hardcoded.
+
+    Tunables (env):
+    - SPECMEM_BATCH_P95_MS: per-chunk p95 latency budget (default 1500)
+    - SPECMEM_BATCH_PROBE_SAMPLES: full batches measured per candidate (default 4)
+    - SPECMEM_BATCH_REEXPLORE_SEC: re-run the climb after convergence (default 300)
     """
 
+    # Candidate batch sizes the hill-climber moves between
+    BATCH_LADDER = [8, 16, 24, 32, 48, 64, 96, 128, 192, 256]
+
+    # Backfill jobs fetch this many encode batches per DB round-trip
+    BACKFILL_FETCH_BATCHES = 4
+
     def __init__(self, config: ResourceConfig):
         self.config = config
         self.base_batch_size = 64
         self.min_batch_size = 16
-        self.max_batch_size = 128
+        self.max_batch_size = config.get_effective_batch_size(128)
         self.current_batch_size = self.base_batch_size
         self.last_adjustment = time.time()
         self.adjustment_interval = 5.0
@@ -976,9 +3137,30 @@ class AdaptiveBatchSizer:
         # Performance tracking
         self.recent_latencies: deque = deque(maxlen=20)
         self.recent_cpu_samples: deque = deque(maxlen=10)
+        self._last_cpu_times: Optional[Tuple[float, float]] = None
+
+        # Hill-climbing state
+        self._tune_lock = threading.Lock()
+        self.p95_budget_ms = float(os.environ.get('SPECMEM_BATCH_P95_MS', '1500'))
+        self.probe_samples = int(os.environ.get('SPECMEM_BATCH_PROBE_SAMPLES', '4'))
+        self.reexplore_interval = float(os.environ.get('SPECMEM_BATCH_REEXPLORE_SEC', '300'))
+        self.ladder = [s for s in self.BATCH_LADDER if self.min_batch_size <= s <= self.max_batch_size]
+        self._ladder_idx = self._nearest_ladder_idx(self.base_batch_size)
+        self._direction = 1
+        self._reversals = 0
+        self._converged_at = 0.0
+        self.tuned_batch_size = self.ladder[self._ladder_idx]
+        self.resource_ceiling = self.max_batch_size
+        # batch size -> recent (texts_per_sec, chunk_latency_ms) observations
+        self._observations: Dict[int, deque] = {}
+        self._scores: Dict[int, float] = {}
+        self.tuning_steps = 0
+
+    def _nearest_ladder_idx(self, size: int) -> int:
+        return min(range(len(self.ladder)), key=lambda i: abs(self.ladder[i] - size))
 
     def _get_cpu_usage(self) -> float:
-        """Read CPU usage from /proc/stat"""
+        """Read CPU usage from /proc/stat (delta since the previous read)"""
         try:
             with open('/proc/stat', 'r') as f:
                 line = f.readline()
@@ -986,7 +3168,11 @@ class AdaptiveBatchSizer:
                 user, nice, system, idle = map(float, parts[1:5])
                 total = user + nice + system + idle
                 busy = user + nice + system
-                return (busy / total) * 100 if total > 0 else 0
+            last = self._last_cpu_times
+            self._last_cpu_times = (busy, total)
+            if last is not None and total > last[1]:
+                return (busy - last[0]) / (total - last[1]) * 100
+            return (busy / total) * 100 if total > 0 else 0
         except:
             return 50.0
 
@@ -1003,11 +3189,108 @@ class AdaptiveBatchSizer:
             return 0
 
     def get_adaptive_batch_size(self) -> int:
-        """Calculate optimal batch size based on current resources."""
+        """
+        Batch size for the next model.encode() call.
+
+        The hill-climbed size, capped by the CPU/RAM resource ceiling.
+        """
+        ceiling = self._get_resource_ceiling()
+        with self._tune_lock:
+            return max(self.min_batch_size, min(self.tuned_batch_size, ceiling))
+
+    def get_backfill_fetch_size(self) -> int:
+        """Rows to fetch per DB round-trip in the _process_* backfill jobs."""
+        return self.get_adaptive_batch_size() * self.BACKFILL_FETCH_BATCHES
+
+    def record_batch(self, batch_size: int, n_texts: int, latency_ms: float):
+        """
+        Feed one model.encode() measurement back into the autotuner.
+
+        Only calls that filled at least one whole batch say anything about
+        batch_size, so smaller calls just count towards latency stats.
+        """
+        self.record_latency(latency_ms)
+        if n_texts < batch_size or latency_ms <= 0 or batch_size not in self.ladder:
+            return
+
+        chunks = (n_texts + batch_size - 1) // batch_size
+        texts_per_sec = n_texts / (latency_ms / 1000.0)
+        chunk_latency_ms = latency_ms / chunks
+
+        with self._tune_lock:
+            obs = self._observations.setdefault(batch_size, deque(maxlen=self.probe_samples * 2))
+            obs.append((texts_per_sec, chunk_latency_ms))
+
+            if batch_size != self.tuned_batch_size:
+                return
+
+            now = time.time()
+            if self._converged_at:
+                if now - self._converged_at < self.reexplore_interval:
+                    return
+                # Load or hardware conditions may have changed - climb again
+                self._converged_at = 0.0
+                self._reversals = 0
+                self._scores.clear()
+
+            recent = list(obs)[-self.probe_samples:]
+            if len(recent) < self.probe_samples:
+                return
+
+            self._scores[batch_size] = self._score(recent)
+            self._step()
+
+    def _score(self, samples: List[Tuple[float, float]]) -> float:
+        """Median throughput, zeroed when p95 chunk latency blows the budget."""
+        throughputs = sorted(s[0] for s in samples)
+        latencies = sorted(s[1] for s in samples)
+        p95 = latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))]
+        if p95 > self.p95_budget_ms:
+            return 0.0
+        return throughputs[len(throughputs) // 2]
+
+    def _step(self):
+        """One hill-climbing move along the ladder. Caller holds _tune_lock."""
+        idx = self._ladder_idx
+        current_score = self._scores.get(self.ladder[idx], 0.0)
+        prev_idx = idx - self._direction
+        prev_score = self._scores.get(self.ladder[prev_idx]) if 0 <= prev_idx < len(self.ladder) else None
+
+        if prev_score is not None and current_score < prev_score * 1.02:
+            # Worse than where we came from: go back and try the other side
+            self._ladder_idx = prev_idx
+            self._direction = -self._direction
+            self._reversals += 1
+        else:
+            next_idx = idx + self._direction
+            if not 0 <= next_idx < len(self.ladder) or self.ladder[next_idx] > self.resource_ceiling:
+                self._direction = -self._direction
+                self._reversals += 1
+                next_idx = idx + self._direction
+            if 0 <= next_idx < len(self.ladder) and self.ladder[next_idx] not in self._scores:
+                self._ladder_idx = next_idx
+            else:
+                self._reversals = 2
+
+        if self._reversals >= 2:
+            # Both neighbours measured and neither beats the best - settle there
+            best = max(self._scores, key=self._scores.get)
+            self._ladder_idx = self.ladder.index(best)
+            self._converged_at = time.time()
+
+        old_size = self.tuned_batch_size
+        self.tuned_batch_size = self.ladder[self._ladder_idx]
+        self.tuning_steps += 1
+        if self.tuned_batch_size != old_size:
+            print(f"🎛️ Batch autotune: {old_size} → {self.tuned_batch_size} "
+                  f"({current_score:.1f} texts/s at {old_size})", file=sys.stderr)
+
+    def _get_resource_ceiling(self) -> int:
+        """Upper bound on batch size from current CPU/RAM usage vs ResourceConfig."""
         now = time.time()
 
         if now - self.last_adjustment < self.adjustment_interval:
-            return self.current_batch_size
+            return self.resource_ceiling
 
         self.last_adjustment = now
         cpu = self._get_cpu_usage()
@@ -1047,7 +3330,8 @@ class AdaptiveBatchSizer:
         elif new_size < self.current_batch_size:
             self.current_batch_size = max(new_size, self.current_batch_size - 8)
 
-        return self.current_batch_size
+        self.resource_ceiling = self.current_batch_size
+        return self.resource_ceiling
 
     def record_latency(self, latency_ms: float):
         """Record embedding latency for performance tracking"""
@@ -1057,15 +3341,117 @@ class AdaptiveBatchSizer:
         """Get adaptive batch sizer statistics"""
         avg_latency = sum(self.recent_latencies) / len(self.recent_latencies) if self.recent_latencies else 0
         avg_cpu = sum(self.recent_cpu_samples) / len(self.recent_cpu_samples) if self.recent_cpu_samples else 0
+        with self._tune_lock:
+            scores = {str(size): round(score, 1) for size, score in sorted(self._scores.items())}
+            tuned = self.tuned_batch_size
+            converged = bool(self._converged_at)
         return {
-            'current_batch_size': self.current_batch_size,
+            'current_batch_size': min(tuned, self.resource_ceiling),
             'base_batch_size': self.base_batch_size,
+            'tuned_batch_size': tuned,
+            'resource_ceiling': self.resource_ceiling,
+            'converged': converged,
+            'tuning_steps': self.tuning_steps,
+            'texts_per_sec_by_size': scores,
+            'backfill_fetch_size': min(tuned, self.resource_ceiling) * self.BACKFILL_FETCH_BATCHES,
             'avg_latency_ms': round(avg_latency, 2),
             'avg_cpu': round(avg_cpu, 1),
             'ram_mb': round(self._get_ram_usage_mb(), 1)
         }
 
 
+class SequenceLengthTracker:
+    """
+    Tracks the token-length distribution per request class and picks a
+    per-batch max_seq_length.
+
+    Request classes: 'query' (embed_single), 'batch' (socket batches) and
+    'backfill:<table>' for the _process_* jobs. Each batch is padded to its
+    own longest text, and only texts above the configured quantile of their
+    class get truncated (or chunked and mean-pooled). Attention cost is
+    quadratic in sequence length, so outliers no longer drag whole chunks
+    up to the model maximum.
+
+    Tunables (env):
+    - SPECMEM_SEQ_CAP_QUANTILE: quantile above which texts are capped (default 0.95, 1.0 = off)
+    - SPECMEM_SEQ_CAP_MIN_SAMPLES: samples per class before capping starts (default 200)
+    - SPECMEM_SEQ_OVERFLOW: 'truncate' (default) or 'chunk' for texts above the cap
+    """
+
+    MIN_CAP_TOKENS = 32     # Never cap below this - short texts are cheap anyway
+    CAP_ROUNDING = 8        # Round caps up so chunks share shapes
+    CHARS_PER_TOKEN_MAX = 10  # Counting only needs the first cap*10 chars
+
+    def __init__(self, history: int = 2000):
+        self.quantile = float(os.environ.get('SPECMEM_SEQ_CAP_QUANTILE', '0.95'))
+        self.min_samples = int(os.environ.get('SPECMEM_SEQ_CAP_MIN_SAMPLES', '200'))
+        self.overflow_mode = os.environ.get('SPECMEM_SEQ_OVERFLOW', 'truncate').lower()
+        if self.overflow_mode not in ('truncate', 'chunk'):
+            self.overflow_mode = 'truncate'
+        self.history = history
+        self._lengths: Dict[str, deque] = {}
+        self._capped: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count_tokens(self, model, texts: List[str], native_max: int) -> List[int]:
+        """Token counts (incl. special tokens), saturating just above native_max."""
+        max_chars = (native_max + 1) * self.CHARS_PER_TOKEN_MAX
+        clipped = [t[:max_chars] for t in texts]
+        tokenizer = getattr(model, 'tokenizer', None)
+        if tokenizer is not None:
+            try:
+                encoded = tokenizer(clipped, add_special_tokens=True, truncation=False)
+                return [min(len(ids), native_max + 1) for ids in encoded['input_ids']]
+            except Exception:
+                pass
+        # No tokenizer available - ~4 chars per token is close enough for WordPiece
+        return [min(len(t) // 4 + 2, native_max + 1) for t in clipped]
+
+    def record(self, request_class: str, lengths: List[int]):
+        with self._lock:
+            hist = self._lengths.setdefault(request_class, deque(maxlen=self.history))
+            hist.extend(lengths)
+
+    def _quantile_cap(self, request_class: str) -> Optional[int]:
+        with self._lock:
+            hist = self._lengths.get(request_class)
+            if self.quantile >= 1.0 or hist is None or len(hist) < self.min_samples:
+                return None
+            return int(np.quantile(np.fromiter(hist, dtype=np.int32), self.quantile))
+
+    def choose_cap(self, request_class: str, lengths: List[int], native_max: int) -> int:
+        """Sequence cap for this batch: its own longest text, bounded by the class quantile."""
+        cap = min(native_max, max(lengths) if lengths else native_max)
+        q_cap = self._quantile_cap(request_class)
+        if q_cap is not None:
+            cap = min(cap, max(q_cap, self.MIN_CAP_TOKENS))
+        cap = -(-cap // self.CAP_ROUNDING) * self.CAP_ROUNDING
+        cap = min(native_max, cap)
+        # Texts over the native max were always truncated - only count ours
+        over = sum(1 for n in lengths if n > cap) if cap < native_max else 0
+        if over:
+            with self._lock:
+                self._capped[request_class] = self._capped.get(request_class, 0) + over
+        return cap
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            classes = {
+                cls: {
+                    'samples': len(hist),
+                    'p50': int(np.quantile(np.fromiter(hist, dtype=np.int32), 0.5)) if hist else 0,
+                    'p95': int(np.quantile(np.fromiter(hist, dtype=np.int32), 0.95)) if hist else 0,
+                    'capped_texts': self._capped.get(cls, 0)
+                }
+                for cls, hist in self._lengths.items()
+            }
+        return {
+            'quantile': self.quantile,
+            'overflow_mode': self.overflow_mode,
+            'classes': classes
+        }
+
+
 def verify_optimizations():
     """
     🔒 ACK VERIFICATION - We NEVER use a model that hasn't been fully optimized.
@@ -1266,7 +3652,7 @@ class QQMSThrottler:
 
     def _adjust_threads_for_cpu(self):
         """
-        Dynamically adjust torch thread count based on CPU usage.
+        Dynamically adjust inference thread count (torch or ORT) based on CPU usage.
         This is the REAL CPU limiting - not just delays!
         """
         now = time.time()
@@ -1288,7 +3674,7 @@ class QQMSThrottler:
             self.current_threads = min(self.thread_max, self.current_threads + 1)
 
         if self.current_threads != old_threads:
-            torch.set_num_threads(self.current_threads)
+            _set_inference_threads(self.current_threads)
             self.thread_adjustments += 1
             self.last_thread_adjust = now
             print(f"🔧 QQMS: Adjusted threads {old_threads} → {self.current_threads} (CPU: {cpu:.1f}%)", file=sys.stderr)
@@ -1513,8 +3899,101 @@ class RAMGuard:
     def force_cleanup(self):
         """Force garbage collection to free RAM"""
         gc.collect()
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
+        _release_accelerator_memory()
+
+
+# ============================================================================
+# HASHED N-GRAM FEATURES - vectorized text-dependent expansion block
+# ============================================================================
+# Char 1-3 grams over the UTF-8 bytes plus lowercase whitespace-split words,
+# each hashed with a polynomial hash in wrap-around uint64 arithmetic and
+# Fibonacci-mixed down to a 2^20 bin. Texts are processed as one concatenated
+# byte array. The per-text (bin, weight) "seeds" are independent of the
+# output width; fold_hash_seeds maps them onto any hash_dims (bin % dims).
+# HASH_FEATURES_MODE 'legacy' (the default) keeps the original per-gram
+# md5/sha256 loop; these vectorized features are opt-in via 'fast'.
+HASH_SEED_BITS = 20
+_HASH_POLY = np.uint64(257)
+_HASH_MIX = np.uint64(0x9E3779B97F4A7C15)
+_HASH_WORD_SALT = np.uint64(0xC2B2AE3D27D4EB4F)
+_HASH_SHIFT = np.uint64(64 - HASH_SEED_BITS)
+_WHITESPACE_BYTES = np.frombuffer(b' \t\n\r\x0b\x0c', dtype=np.uint8)
+
+
+def _concat_bytes(chunks: List[bytes]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Concatenated bytes (as uint64, +1 so NUL still hashes), owning text per byte, per-text lengths."""
+    lengths = np.fromiter((len(c) for c in chunks), dtype=np.int64, count=len(chunks))
+    data = np.frombuffer(b''.join(chunks), dtype=np.uint8).astype(np.uint64) + np.uint64(1)
+    owner = np.repeat(np.arange(len(chunks)), lengths)
+    return data, owner, lengths
+
+
+def hashed_ngram_seeds(texts: List[str]) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Per text: (sorted unique uint32 bins < 2^HASH_SEED_BITS, float32 weights)."""
+    count = len(texts)
+    bins_parts, weight_parts, owner_parts = [], [], []
+
+    # Character n-grams (1-3), weight 1 / (n * len + 1) as in the legacy features
+    data, owner, lengths = _concat_bytes([t.encode('utf-8') for t in texts])
+    total = len(data)
+    text_end = np.cumsum(lengths)[owner] if total else np.zeros(0, dtype=np.int64)
+    rolling = data
+    for n in range(1, 4):
+        if n > 1:
+            rolling = rolling[:-1] * _HASH_POLY + data[n - 1:]
+        starts = np.arange(total - n + 1)
+        valid = starts + n <= text_end[:total - n + 1]  # n-gram must not cross into the next text
+        gram_owner = owner[:total - n + 1][valid]
+        bins_parts.append(((rolling[valid] + np.uint64(n)) * _HASH_MIX) >> _HASH_SHIFT)
+        weight_parts.append(1.0 / (n * lengths[gram_owner] + 1))
+        owner_parts.append(gram_owner)
+
+    # Word-level features, weight 1 / (words + 1)
+    ldata, lowner, _ = _concat_bytes([t.lower().encode('utf-8') for t in texts])
+    in_word = ~np.isin(ldata - np.uint64(1), _WHITESPACE_BYTES)
+    word_bytes = np.flatnonzero(in_word)
+    if len(word_bytes):
+        first = np.ones(len(word_bytes), dtype=bool)
+        # A word starts where the previous byte is whitespace or belongs to another text
+        first[1:] = (word_bytes[1:] != word_bytes[:-1] + 1) | (lowner[word_bytes[1:]] != lowner[word_bytes[:-1]])
+        word_starts = np.flatnonzero(first)
+        word_id = np.cumsum(first) - 1
+        pos = np.arange(len(word_bytes)) - word_starts[word_id]
+        powers = np.ones(int(pos.max()) + 1, dtype=np.uint64)
+        powers[1:] = np.cumprod(np.full(len(powers) - 1, _HASH_POLY, dtype=np.uint64))
+        word_hash = np.add.reduceat(ldata[word_bytes] * powers[pos], word_starts)
+        word_owner = lowner[word_bytes[word_starts]]
+        words_per_text = np.bincount(word_owner, minlength=count)
+        bins_parts.append(((word_hash ^ _HASH_WORD_SALT) * _HASH_MIX) >> _HASH_SHIFT)
+        weight_parts.append(1.0 / (words_per_text[word_owner] + 1))
+        owner_parts.append(word_owner)
+
+    # Sum duplicate (text, bin) pairs, then split per text
+    keys = (np.concatenate(owner_parts).astype(np.int64) << HASH_SEED_BITS) | \
+        np.concatenate(bins_parts).astype(np.int64)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    weights = np.bincount(inverse.ravel(), weights=np.concatenate(weight_parts)).astype(np.float32)
+    bins = (unique & ((1 << HASH_SEED_BITS) - 1)).astype(np.uint32)
+    bounds = np.searchsorted(unique >> HASH_SEED_BITS, np.arange(count + 1))
+    return [(bins[bounds[i]:bounds[i + 1]], weights[bounds[i]:bounds[i + 1]]) for i in range(count)]
+
+
+def fold_hash_seeds(seeds: List[Tuple[np.ndarray, np.ndarray]], hash_dims: int,
+                    out: Optional[np.ndarray] = None) -> np.ndarray:
+    """(N, hash_dims) L2-normalized features from seeds: weights summed into bin % hash_dims."""
+    count = len(seeds)
+    sizes = [len(bins) for bins, _ in seeds]
+    rows = np.repeat(np.arange(count, dtype=np.int64), sizes)
+    cols = np.concatenate([bins for bins, _ in seeds]).astype(np.int64) % hash_dims if count else np.zeros(0, np.int64)
+    weights = np.concatenate([w for _, w in seeds]) if count else np.zeros(0, np.float32)
+    features = np.bincount(rows * hash_dims + cols, weights=weights, minlength=count * hash_dims)
+    features = features.reshape(count, hash_dims)
+    norms = np.linalg.norm(features, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    if out is None:
+        out = np.empty((count, hash_dims), dtype=np.float32)
+    np.divide(features, norms, out=out, casting='same_kind')
+    return out
 
 
 class DimensionExpander:
@@ -1545,11 +4024,24 @@ class DimensionExpander:
         # Hash-based features for additional dimensions
         self.hash_seeds = [42, 1337, 7777, 31415, 27182]
 
+        # Precomputed gather indices for the batched polynomial / Fourier features
+        self._index_cache: Dict[Tuple, Tuple[np.ndarray, np.ndarray]] = {}
+        self._cache_lock = threading.Lock()
+
     def expand(self, embedding: np.ndarray, target_dims: int, text: str = "") -> np.ndarray:
         """
         Expand embedding from native dims to ANY target dimension.
 
         TRULY DYNAMIC - no hardcoded limits! Expands to exactly target_dims.
+        Single-vector wrapper around expand_batch.
+        """
+        if target_dims <= embedding.shape[-1]:
+            return embedding[:target_dims]
+        return self.expand_batch(embedding.reshape(1, -1), target_dims, [text])[0]
+
+    def expand_batch(self, embeddings: np.ndarray, target_dims: int, texts: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Expand an (N, native) matrix to (N, target_dims) in one pass.
 
         Uses multiple techniques combined:
         - Random projections (deterministic, reproducible)
@@ -1557,16 +4049,39 @@ class DimensionExpander:
         - Polynomial feature combinations
         - Fourier feature expansion
         - Padding for any remaining dimensions
-        """
-        current_dims = embedding.shape[-1]
 
+        Rows with and without text get different feature layouts (the hash
+        block only exists when there is text), so they are expanded as two
+        groups - each row matches what expand() gives for it alone.
+        """
+        current_dims = embeddings.shape[-1]
         if target_dims <= current_dims:
-            return embedding[:target_dims]
+            return embeddings[:, :target_dims]
+
+        texts = list(texts) if texts is not None else [""] * len(embeddings)
+        with_text = [i for i, t in enumerate(texts) if t]
+        if 0 < len(with_text) < len(texts):
+            without_text = [i for i, t in enumerate(texts) if not t]
+            first = self._expand_group(embeddings[with_text], target_dims, [texts[i] for i in with_text])
+            result = np.empty((len(texts), target_dims), dtype=first.dtype)
+            result[with_text] = first
+            result[without_text] = self._expand_group(embeddings[without_text], target_dims, None)
+            return result
+        return self._expand_group(embeddings, target_dims, texts if with_text else None)
 
+    def _expand_group(self, embeddings: np.ndarray, target_dims: int, texts: Optional[List[str]]) -> np.ndarray:
+        """
+        expand_batch for rows that all have text (texts given) or all lack it
+        (texts=None). Every block is written straight into one preallocated
+        float32 (N, target_dims) buffer - no per-block arrays or concatenation.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        count, current_dims = embeddings.shape
         dims_needed = target_dims - current_dims
 
-        # Build expanded features - allocate proportionally based on need
-        expanded_features = [embedding]
+        out = np.empty((count, target_dims), dtype=np.float32)
+        out[:, :current_dims] = embeddings
+        offset = current_dims
 
         # Calculate proportional allocation for each technique
         # This ensures we can hit ANY target dimension
@@ -1575,77 +4090,91 @@ class DimensionExpander:
         # 1. Random Projections - up to 40% of expansion
         proj_dims = min(remaining, int(dims_needed * 0.4))
         if proj_dims > 0:
-            projected = self._random_projection_expand(embedding, proj_dims)
-            expanded_features.append(projected)
-            remaining -= projected.shape[-1]
+            self._random_projection_expand(embeddings, proj_dims, out=out[:, offset:offset + proj_dims])
+            offset += proj_dims
+            remaining -= proj_dims
 
         # 2. Hash-based expansion - up to 20% (if text provided)
-        if remaining > 0 and text:
+        if remaining > 0 and texts:
             hash_dims = min(remaining, int(dims_needed * 0.2))
             if hash_dims > 0:
-                hash_features = self._hash_based_features(text, hash_dims)
-                expanded_features.append(hash_features)
-                remaining -= hash_features.shape[-1]
+                self._hash_based_features_batch(texts, hash_dims, out=out[:, offset:offset + hash_dims])
+                offset += hash_dims
+                remaining -= hash_dims
 
         # 3. Polynomial features - up to 25%
         if remaining > 0:
             poly_dims = min(remaining, int(dims_needed * 0.25))
             if poly_dims > 0:
-                poly_features = self._polynomial_features(embedding, poly_dims)
-                expanded_features.append(poly_features)
-                remaining -= poly_features.shape[-1]
+                self._polynomial_features_batch(embeddings, poly_dims, out=out[:, offset:offset + poly_dims])
+                offset += poly_dims
+                remaining -= poly_dims
 
         # 4. Fourier features - up to 15%
         if remaining > 0:
             fourier_dims = min(remaining, int(dims_needed * 0.15))
             if fourier_dims > 0:
-                fourier_features = self._fourier_features(embedding, fourier_dims)
-                expanded_features.append(fourier_features)
-                remaining -= fourier_features.shape[-1]
+                self._fourier_features_batch(embeddings, fourier_dims, out=out[:, offset:offset + fourier_dims])
+                offset += fourier_dims
+                remaining -= fourier_dims
 
         # 5. Zero-padding for any remaining dimensions (guarantees exact target)
         if remaining > 0:
-            padding = np.zeros(remaining)
-            expanded_features.append(padding)
-
-        # Combine all features
-        result = np.concatenate(expanded_features)
+            out[:, offset:] = 0
 
-        # Ensure exact target dims (truncate if any rounding caused overshoot)
-        result = result[:target_dims]
+        # Re-normalize each row in place
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
 
-        # Re-normalize
-        norm = np.linalg.norm(result)
-        if norm > 0:
-            result = result / norm
-
-        return result
-
-    def _random_projection_expand(self, embedding: np.ndarray, target_extra_dims: int) -> np.ndarray:
+    def _random_projection_expand(self, embedding: np.ndarray, target_extra_dims: int,
+                                  out: Optional[np.ndarray] = None) -> np.ndarray:
         """Expand using random projections - creates new feature space"""
         if target_extra_dims <= 0:
-            return np.array([])
+            return np.zeros(embedding.shape[:-1] + (0,), dtype=np.float32)
 
         # Get or create projection matrix (cached and deterministic)
-        cache_key = (len(embedding), target_extra_dims)
-        if cache_key not in self.projection_cache:
-            # LOW-07 fix: LRU eviction - remove oldest entry if cache is full
-            if len(self.projection_cache) >= self.MAX_PROJECTION_CACHE_SIZE:
-                self.projection_cache.popitem(last=False)  # Remove oldest (first) item
-
-            np.random.seed(42)  # Deterministic
-            # Random projection matrix
-            proj_matrix = np.random.randn(len(embedding), target_extra_dims) / np.sqrt(len(embedding))
-            self.projection_cache[cache_key] = proj_matrix
-        else:
-            # LOW-07 fix: Move to end for LRU ordering (mark as recently used)
-            self.projection_cache.move_to_end(cache_key)
+        n = embedding.shape[-1]
+        cache_key = (n, target_extra_dims)
+        with self._cache_lock:
+            proj = self.projection_cache.get(cache_key)
+            if proj is None:
+                # LOW-07 fix: LRU eviction - remove oldest entry if cache is full
+                if len(self.projection_cache) >= self.MAX_PROJECTION_CACHE_SIZE:
+                    self.projection_cache.popitem(last=False)  # Remove oldest (first) item
+
+                # Local seeded generator: deterministic without touching the global RNG.
+                # RandomState(42) yields the same matrix the old np.random.seed(42) path did.
+                rng = np.random.RandomState(42)
+                proj = (rng.randn(n, target_extra_dims) / np.sqrt(n)).astype(np.float32)
+                self.projection_cache[cache_key] = proj
+            else:
+                # LOW-07 fix: Move to end for LRU ordering (mark as recently used)
+                self.projection_cache.move_to_end(cache_key)
 
-        proj = self.projection_cache[cache_key]
-        return embedding @ proj
+        embedding = np.asarray(embedding, dtype=np.float32)
+        if out is None:
+            return embedding @ proj
+        np.matmul(embedding, proj, out=out)
+        return out
 
     def _hash_based_features(self, text: str, target_dims: int) -> np.ndarray:
         """Generate features based on text hashing (n-grams, char patterns)"""
+        return self._hash_based_features_batch([text], target_dims)[0]
+
+    def _hash_based_features_batch(self, texts: List[str], target_dims: int,
+                                   out: Optional[np.ndarray] = None) -> np.ndarray:
+        """(N, target_dims) hashed n-gram features - vectorized with SPECMEM_HASH_FEATURES=fast."""
+        if out is None:
+            out = np.empty((len(texts), target_dims), dtype=np.float32)
+        if HASH_FEATURES_MODE == 'legacy':
+            for row, text in enumerate(texts):
+                out[row] = self._legacy_hash_features(text, target_dims)
+            return out
+        return fold_hash_seeds(hashed_ngram_seeds(texts), target_dims, out=out)
+
+    def _legacy_hash_features(self, text: str, target_dims: int) -> np.ndarray:
+        """Original per-gram md5 / per-word sha256 features (EMBEDDING_TRANSFORM_VERSION 1)."""
         features = np.zeros(target_dims)
 
         # Character n-grams (1-3)
@@ -1672,48 +4201,148 @@ class DimensionExpander:
 
     def _polynomial_features(self, embedding: np.ndarray, target_dims: int) -> np.ndarray:
         """Generate polynomial feature combinations"""
-        features = []
-        n = len(embedding)
-
-        # Quadratic interactions (pairs of dimensions)
-        count = 0
-        for i in range(min(n, 100)):  # Limit to first 100 dims for efficiency
-            for j in range(i, min(n, 100)):
-                if count >= target_dims:
-                    break
-                features.append(embedding[i] * embedding[j])
-                count += 1
-            if count >= target_dims:
-                break
+        return self._polynomial_features_batch(embedding.reshape(1, -1), target_dims)[0]
 
-        # Pad if needed
-        while len(features) < target_dims:
-            features.append(0.0)
-
-        return np.array(features[:target_dims])
+    def _polynomial_features_batch(self, embeddings: np.ndarray, target_dims: int,
+                                   out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Quadratic interactions e[i]*e[j] (i <= j < 100, row-major) for every
+        row at once via precomputed index pairs; zero-padded past the pairs.
+        """
+        n = embeddings.shape[-1]
+        cache_key = ('poly', n, target_dims)
+        pairs = self._index_cache.get(cache_key)
+        if pairs is None:
+            # Limit to first 100 dims for efficiency
+            rows, cols = np.triu_indices(min(n, 100))
+            pairs = (rows[:target_dims], cols[:target_dims])
+            if len(self._index_cache) >= self.MAX_PROJECTION_CACHE_SIZE:
+                self._index_cache.clear()
+            self._index_cache[cache_key] = pairs
+        rows, cols = pairs
+
+        if out is None:
+            out = np.empty((len(embeddings), target_dims), dtype=np.float32)
+        np.multiply(embeddings[:, rows], embeddings[:, cols], out=out[:, :len(rows)])
+        out[:, len(rows):] = 0
+        return out
 
     def _fourier_features(self, embedding: np.ndarray, target_dims: int) -> np.ndarray:
         """Generate Fourier-based features (periodic patterns)"""
-        features = []
-        n = len(embedding)
+        return self._fourier_features_batch(embedding.reshape(1, -1), target_dims)[0]
 
-        # Use different frequencies
-        freqs = [0.5, 1.0, 2.0, 4.0, 8.0]
+    def _fourier_features_batch(self, embeddings: np.ndarray, target_dims: int,
+                                out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Interleaved sin/cos(2*pi*f*e[i]) over the frequency grid (frequency
+        major, then dimension) for every row at once; zero-padded past the grid.
+        """
+        n = embeddings.shape[-1]
+        cache_key = ('fourier', n, target_dims)
+        grid = self._index_cache.get(cache_key)
+        if grid is None:
+            # Use different frequencies; each (freq, dim) pair yields a sin and a cos
+            freqs = np.array([0.5, 1.0, 2.0, 4.0, 8.0])
+            pairs = min(len(freqs) * n, (target_dims + 1) // 2)
+            k = np.arange(pairs)
+            grid = ((2 * np.pi * freqs[k // n]).astype(np.float32), k % n)
+            if len(self._index_cache) >= self.MAX_PROJECTION_CACHE_SIZE:
+                self._index_cache.clear()
+            self._index_cache[cache_key] = grid
+        scales, dims = grid
+
+        if out is None:
+            out = np.empty((len(embeddings), target_dims), dtype=np.float32)
+        angles = embeddings[:, dims] * scales
+        # sin -> even columns, cos -> odd columns (the last cos may fall past target_dims)
+        sin_cols = min(len(dims), (target_dims + 1) // 2)
+        cos_cols = min(len(dims), target_dims // 2)
+        np.sin(angles[:, :sin_cols], out=out[:, 0:2 * sin_cols:2])
+        np.cos(angles[:, :cos_cols], out=out[:, 1:2 * cos_cols:2])
+        out[:, 2 * len(dims):] = 0
+        return out
+
+
+class PCAProjection:
+    """
+    A fitted PCA reduced to what serving needs: one float32 matmul.
 
-        for freq in freqs:
-            for i in range(n):
-                if len(features) >= target_dims:
-                    break
-                # Sin and cos features at different frequencies
-                features.append(np.sin(2 * np.pi * freq * embedding[i]))
-                if len(features) < target_dims:
-                    features.append(np.cos(2 * np.pi * freq * embedding[i]))
+    transform(X) == (X - mean) @ components.T, computed as X @ W - offset with
+    W = components.T (contiguous) and offset = mean @ W precomputed, so a batch
+    is a single BLAS call with no (N, native) centred temporary. Persisted as
+    an uncompressed .npz (plain arrays, loaded with allow_pickle=False).
+    """
 
-        # Pad if needed
-        while len(features) < target_dims:
-            features.append(0.0)
+    def __init__(self, mean: np.ndarray, components: np.ndarray,
+                 explained_variance_ratio: Optional[np.ndarray] = None):
+        self.mean = np.ascontiguousarray(mean, dtype=np.float32)
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+        if explained_variance_ratio is None:
+            explained_variance_ratio = np.zeros(len(self.components), dtype=np.float32)
+        self.explained_variance_ratio = np.asarray(explained_variance_ratio, dtype=np.float32)
+        self._prepare()
 
-        return np.array(features[:target_dims])
+    def _prepare(self):
+        self.weights = np.ascontiguousarray(self.components.T)
+        self.offset = self.mean @ self.weights
+
+    @property
+    def n_components(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def from_sklearn(cls, pca) -> 'PCAProjection':
+        """Convert a fitted sklearn PCA / IncrementalPCA (whiten=False)."""
+        return cls(pca.mean_, pca.components_, pca.explained_variance_ratio_)
+
+    def align_signs(self, previous: 'PCAProjection'):
+        """Flip components so each points the same way as its counterpart in `previous`."""
+        if previous.components.shape != self.components.shape:
+            return
+        signs = np.sign(np.einsum('ij,ij->i', self.components, previous.components))
+        signs[signs == 0] = 1
+        self.components *= signs[:, None]
+        self._prepare()
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        X = np.asarray(embeddings, dtype=np.float32)
+        if X.ndim == 1:
+            return X @ self.weights - self.offset
+        result = X @ self.weights
+        result -= self.offset
+        return result
+
+    def save(self, path: Path):
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            np.savez(f, mean=self.mean, components=self.components,
+                     explained_variance_ratio=self.explained_variance_ratio)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'PCAProjection':
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['mean'], data['components'], data['explained_variance_ratio'])
+
+
+def fit_pca_projections(X: np.ndarray, dims_list: List[int], random_state: int = 42) -> Dict[int, PCAProjection]:
+    """
+    Fit projections for several target dims with ONE randomized SVD at the
+    largest dims - smaller targets are prefixes of the same component basis.
+    """
+    from sklearn.utils.extmath import randomized_svd
+
+    X = np.asarray(X, dtype=np.float32)
+    n_samples, n_features = X.shape
+    dims_list = sorted(d for d in set(dims_list) if 0 < d < n_features and d <= n_samples)
+    if not dims_list:
+        return {}
+    mean = X.mean(axis=0)
+    centred = X - mean
+    total_variance = float(np.einsum('ij,ij->', centred, centred, dtype=np.float64)) or 1.0
+    _, singular, components = randomized_svd(centred, n_components=dims_list[-1], random_state=random_state)
+    ratio = singular ** 2 / total_variance
+    return {d: PCAProjection(mean, components[:d], ratio[:d]) for d in dims_list}
 
 
 class AdaptivePCA:
@@ -1721,45 +4350,141 @@ class AdaptivePCA:
     Self-training PCA that learns from actual data for optimal compression.
     Incrementally improves as more embeddings are processed.
     Now supports VARIABLE target dimensions!
+
+    Training never runs on a request thread: samples go into a fixed-size,
+    lock-protected reservoir (Algorithm R - a uniform sample of everything seen,
+    not the first N) and fits run on a background worker against a snapshot of
+    it. Until a fit lands, requests keep using the previous models, or plain
+    truncation when there are none yet.
+
+    After the first fit, traffic keeps flowing into a bounded window of recent
+    vectors. Once enough new samples arrived and the refit interval elapsed, a
+    background thread refits every model on that window with IncrementalPCA
+    (partial_fit in chunks, so memory stays at one window + one chunk) and
+    swaps the whole model dict in at once. Component signs are aligned with
+    the previous fit so unchanged directions keep their orientation.
+
+    Models published by the offline trainer (--train-pca) live in
+    pca_models/published/v<N>/ with a CURRENT pointer; the server hot-loads a
+    new version when CURRENT changes and stops training in-process from then on.
+
+    scope=None is the global model set; a table scope (memories, codebase_files,
+    code_definitions) keeps its own models under pca_models/tables/<table>/,
+    trained and published only from that table's texts.
+
+    `basis` fingerprints the current model set (same files -> same id in every
+    process). It is part of the embedding_hash namespace, and the server
+    re-embeds a table when the basis its rows were written with changes.
+
+    Tunables (env):
+    - SPECMEM_PCA_RESERVOIR: vectors kept for the first fit (default 4096)
+    - SPECMEM_PCA_REFIT_SEC: minimum seconds between refits (default 0 = refits off)
+    - SPECMEM_PCA_REFIT_WINDOW: recent vectors kept for refits (default 4096)
+    - SPECMEM_PCA_REFIT_MIN_NEW: new vectors required before a refit (default 1024)
+    - SPECMEM_PCA_ONLINE: '0' never trains in the serving process (published models only)
+    - SPECMEM_PCA_KEEP_VERSIONS: published versions kept on disk (default 3)
+    - SPECMEM_PCA_PER_TABLE: '1' enables the table scopes (default '0' - global
+      only). Query requests must then carry "table" too, or they are projected
+      with the global set while stored rows use the table's
     """
 
-    def __init__(self, cache_dir: Path, min_samples: int = 100):
+    REFIT_CHUNK = 1024  # Rows per partial_fit call (raised to n_components when needed)
+
+    def __init__(self, cache_dir: Path, min_samples: int = 100, scope: Optional[str] = None):
         self.cache_dir = cache_dir
+        self.scope = scope
+        self.model_dir = self.scope_dir(cache_dir, scope)
         self.min_samples = min_samples
-        self.pca_models: Dict[int, PCA] = {}  # Multiple PCA models for different target dims
-        self.training_buffer: List[np.ndarray] = []
+        self.pca_models: Dict[int, PCAProjection] = {}  # Multiple PCA models for different target dims
         self.samples_seen = 0
+
+        # First-fit sample reservoir (allocated on the first sample, once native dims are known)
+        self.reservoir_size = max(min_samples, int(os.environ.get('SPECMEM_PCA_RESERVOIR', '4096')))
+        self._reservoir: Optional[np.ndarray] = None
+        self._reservoir_fill = 0
+        self._reservoir_seen = 0
+        self._train_at = min_samples
+        self._rng = np.random.default_rng()
         self.is_trained = False
+        self.epoch = 0  # Bumped whenever the fitted models change (invalidates transform memos)
+        self._basis: Tuple[Optional[Dict[int, PCAProjection]], str] = (None, 'none')
+
+        # Continuous refresh on recent traffic
+        self.refit_interval = float(os.environ.get('SPECMEM_PCA_REFIT_SEC', '0'))
+        self.refit_min_new = int(os.environ.get('SPECMEM_PCA_REFIT_MIN_NEW', '1024'))
+        self.recent: deque = deque(maxlen=max(self.min_samples, int(os.environ.get('SPECMEM_PCA_REFIT_WINDOW', '4096'))))
+        self._new_since_fit = 0
+        self._last_fit = time.time()
+        self._fitting = False  # One background fit (first fit or refit) at a time
+        self._lock = threading.Lock()
+        self.refits = 0
+
+        # Offline-trained artifacts
+        self.online = os.environ.get('SPECMEM_PCA_ONLINE', '1') != '0'
+        self.published_version = 0
+        self._published_mtime = 0.0
 
         self._load_cached()
+        self.check_published()
+
+    @staticmethod
+    def fingerprint(models: Dict[int, PCAProjection]) -> str:
+        """Content hash of a model set ('none' when empty, i.e. plain truncation)."""
+        if not models:
+            return 'none'
+        digest = hashlib.sha256()
+        for dims in sorted(models):
+            digest.update(str(dims).encode())
+            digest.update(models[dims].mean.tobytes())
+            digest.update(models[dims].components.tobytes())
+        return digest.hexdigest()[:12]
+
+    @property
+    def basis(self) -> str:
+        """Fingerprint of the live model set (recomputed only after a swap)."""
+        models = self.pca_models
+        if self._basis[0] is not models:
+            self._basis = (models, self.fingerprint(models))
+        return self._basis[1]
 
     def _load_cached(self):
         """Load pre-trained PCA models if available"""
         try:
-            import pickle
-            pca_dir = self.cache_dir / "pca_models"
+            pca_dir = self.model_dir
             if pca_dir.exists():
-                for pca_file in pca_dir.glob("pca_*.pkl"):
+                for pca_file in pca_dir.glob("pca_*.npz"):
                     dims = int(pca_file.stem.split("_")[1])
-                    with open(pca_file, 'rb') as f:
-                        self.pca_models[dims] = pickle.load(f)
+                    self.pca_models[dims] = PCAProjection.load(pca_file)
+                self._migrate_pickles(pca_dir)
                 if self.pca_models:
                     self.is_trained = True
                     print(f"📂 Loaded {len(self.pca_models)} cached PCA models", file=sys.stderr)
         except Exception as e:
             print(f"⚠️ Could not load PCA cache: {e}", file=sys.stderr)
 
+    def _migrate_pickles(self, pca_dir: Path):
+        """Convert sklearn pickles from older versions to .npz (one-time, needs sklearn to unpickle)."""
+        for pca_file in pca_dir.glob("pca_*.pkl"):
+            dims = int(pca_file.stem.split("_")[1])
+            try:
+                if dims not in self.pca_models:
+                    import pickle
+                    with open(pca_file, 'rb') as f:
+                        projection = PCAProjection.from_sklearn(pickle.load(f))
+                    projection.save(pca_dir / f"pca_{dims}.npz")
+                    self.pca_models[dims] = projection
+                pca_file.unlink()
+            except Exception as e:
+                print(f"⚠️ Could not migrate {pca_file.name}: {e}", file=sys.stderr)
+
     def _save_cached(self):
         """Save trained PCA models to disk"""
         try:
-            import pickle
-            pca_dir = self.cache_dir / "pca_models"
+            pca_dir = self.model_dir
             pca_dir.mkdir(exist_ok=True, parents=True)
 
             for dims, pca in self.pca_models.items():
-                pca_file = pca_dir / f"pca_{dims}.pkl"
-                with open(pca_file, 'wb') as f:
-                    pickle.dump(pca, f)
+                pca.save(pca_dir / f"pca_{dims}.npz")
 
             print(f"💾 Saved {len(self.pca_models)} PCA models", file=sys.stderr)
         except Exception as e:
@@ -1767,52 +4492,259 @@ class AdaptivePCA:
 
     def add_samples(self, embeddings: np.ndarray):
         """Add new embeddings to training buffer"""
-        if self.is_trained:
-            return  # Already trained, skip
+        if not self.online or self.published_version:
+            return  # Projections come from the offline trainer
 
         if len(embeddings.shape) == 1:
             embeddings = embeddings.reshape(1, -1)
 
-        for emb in embeddings:
-            self.training_buffer.append(emb)
-            self.samples_seen += 1
-
-        # Train when we have enough samples
-        if len(self.training_buffer) >= self.min_samples and not self.is_trained:
-            self._train()
-
-    def _train(self):
-        """Train PCA models for multiple dimension targets"""
-        if len(self.training_buffer) < self.min_samples:
+        if self.is_trained:
+            self._observe(embeddings)
             return
 
-        print(f"🎓 Training adaptive PCA on {len(self.training_buffer)} samples...", file=sys.stderr)
-
-        X = np.array(self.training_buffer)
+        with self._lock:
+            self._reservoir_add(np.asarray(embeddings, dtype=np.float32))
+            self.samples_seen += len(embeddings)
+            X = self._training_snapshot()
+        if X is not None:
+            threading.Thread(target=self._train, args=(X,), daemon=True, name="pca-train").start()
+
+    def _training_snapshot(self) -> Optional[np.ndarray]:
+        """Claim the worker and copy the reservoir when a first fit is due. Lock held."""
+        if self._fitting or self.is_trained or self._reservoir is None or self._reservoir_fill < self._train_at:
+            return None
+        self._fitting = True
+        return self._reservoir[:self._reservoir_fill].copy()
+
+    def _reservoir_add(self, embeddings: np.ndarray):
+        """Algorithm R over the incoming rows: a uniform sample of every vector seen. Lock held."""
+        dims = embeddings.shape[1]
+        if self._reservoir is None or self._reservoir.shape[1] != dims:
+            # First sample, or the native dims changed (model switch) - start over
+            self._reservoir = np.empty((self.reservoir_size, dims), dtype=np.float32)
+            self._reservoir_fill = 0
+            self._reservoir_seen = 0
+
+        take = min(len(embeddings), self.reservoir_size - self._reservoir_fill)
+        if take:
+            self._reservoir[self._reservoir_fill:self._reservoir_fill + take] = embeddings[:take]
+            self._reservoir_fill += take
+        rest = embeddings[take:]
+        if len(rest):
+            # Row with global index t replaces a random slot with probability size / (t + 1)
+            seen = self._reservoir_seen + take + np.arange(len(rest))
+            slots = (self._rng.random(len(rest)) * (seen + 1)).astype(np.int64)
+            keep = slots < self.reservoir_size
+            self._reservoir[slots[keep]] = rest[keep]  # Later rows win on duplicate slots, as in serial R
+        self._reservoir_seen += len(embeddings)
+
+    def _train(self, X: np.ndarray):
+        """Train PCA models for multiple dimension targets (background worker)"""
+        try:
+            label = f" ({self.scope})" if self.scope else ""
+            print(f"🎓 Training adaptive PCA{label} on {len(X)} samples "
+                  f"(reservoir of {self._reservoir_seen})...", file=sys.stderr)
+            from sklearn.decomposition import PCA
+
+            # Train PCA models for common dimension targets
+            target_dims_list = [256, 384, 512, 768, 1024, 1536]
+
+            n_samples, n_features = X.shape
+            max_components = min(n_samples, n_features)
+
+            models: Dict[int, PCAProjection] = {}
+            for target_dims in target_dims_list:
+                # PCA requires: n_components <= min(n_samples, n_features)
+                if target_dims >= n_features or target_dims > max_components:
+                    continue  # Can't train for this dimension
+
+                pca = PCA(n_components=target_dims, random_state=42)
+                pca.fit(X)
+
+                variance_explained = pca.explained_variance_ratio_.sum()
+                print(f"  ✅ PCA-{target_dims}: {variance_explained*100:.1f}% variance", file=sys.stderr)
+
+                models[target_dims] = PCAProjection.from_sklearn(pca)
+
+            with self._lock:
+                if self.published_version:
+                    return  # Offline models arrived meanwhile - they win
+                if not models and n_samples < self.reservoir_size:
+                    # Too few samples for any target yet - try again with twice as many
+                    self._train_at = n_samples * 2
+                    return
+                self.pca_models = models  # Atomic swap - readers see the old or the new set
+                self.is_trained = True
+                self.epoch += 1
+                self.recent.extend(X[-self.recent.maxlen:])  # Seed the refit window with the first fit's data
+                self._last_fit = time.time()
+                self._reservoir = None  # Free memory
+
+            self._save_cached()
+        except Exception as e:
+            print(f"⚠️ PCA training failed: {e}", file=sys.stderr)
+        finally:
+            with self._lock:
+                self._fitting = False
+                retry = self._training_snapshot()  # Samples that arrived during a too-small fit
+            if retry is not None:
+                threading.Thread(target=self._train, args=(retry,), daemon=True, name="pca-train").start()
 
-        # Train PCA models for common dimension targets
-        target_dims_list = [256, 384, 512, 768, 1024, 1536]
+    # ─── Continuous refresh ──────────────────────────────────────────────
 
-        n_samples, n_features = X.shape
-        max_components = min(n_samples, n_features)
+    def _observe(self, embeddings: np.ndarray):
+        """Feed post-training traffic into the recent window; kick off a refit when due."""
+        if self.refit_interval <= 0:
+            return
+        with self._lock:
+            self.recent.extend(np.asarray(embeddings, dtype=np.float32))
+            self.samples_seen += len(embeddings)
+            self._new_since_fit += len(embeddings)
+            due = (
+                not self._fitting
+                and self._new_since_fit >= self.refit_min_new
+                and time.time() - self._last_fit >= self.refit_interval
+            )
+            if not due:
+                return
+            self._fitting = True
+            self._new_since_fit = 0
+            X = np.array(self.recent)
+        threading.Thread(target=self._refit, args=(X,), daemon=True, name="pca-refit").start()
 
-        for target_dims in target_dims_list:
-            # PCA requires: n_components <= min(n_samples, n_features)
-            if target_dims >= n_features or target_dims > max_components:
-                continue  # Can't train for this dimension
+    def _refit(self, X: np.ndarray):
+        """Refit every model on a snapshot of recent traffic, then swap them in atomically."""
+        try:
+            from sklearn.decomposition import IncrementalPCA
+            start = time.time()
+            n_samples, n_features = X.shape
+            models: Dict[int, PCAProjection] = {}
+            for target_dims in sorted(self.pca_models):
+                if target_dims >= n_features or target_dims > n_samples:
+                    continue
+                pca = IncrementalPCA(n_components=target_dims)
+                chunk = max(self.REFIT_CHUNK, target_dims)
+                for i in range(0, n_samples, chunk):
+                    batch = X[i:i + chunk]
+                    if len(batch) < target_dims:
+                        break  # partial_fit needs at least n_components rows
+                    pca.partial_fit(batch)
+                projection = PCAProjection.from_sklearn(pca)
+                old = self.pca_models.get(target_dims)
+                if old is not None:
+                    projection.align_signs(old)
+                models[target_dims] = projection
+
+            if models and not self.published_version:
+                # Models we could not refit this round keep their previous fit
+                self.pca_models = {**self.pca_models, **models}
+                self.epoch += 1
+                self.refits += 1
+                variance = ', '.join(
+                    f"{d}:{m.explained_variance_ratio.sum()*100:.1f}%" for d, m in sorted(models.items())
+                )
+                print(f"🔄 PCA refit #{self.refits} on {n_samples} recent samples in "
+                      f"{time.time() - start:.1f}s ({variance})", file=sys.stderr)
+                self._save_cached()
+        except Exception as e:
+            print(f"⚠️ PCA refit failed: {e}", file=sys.stderr)
+        finally:
+            with self._lock:
+                self._fitting = False
+                self._last_fit = time.time()
 
-            pca = PCA(n_components=target_dims, random_state=42)
-            pca.fit(X)
+    # ─── Published (offline) models ──────────────────────────────────────
 
-            variance_explained = pca.explained_variance_ratio_.sum()
-            print(f"  ✅ PCA-{target_dims}: {variance_explained*100:.1f}% variance", file=sys.stderr)
+    @staticmethod
+    def scope_dir(cache_dir: Path, scope: Optional[str] = None) -> Path:
+        """Model directory for the global set (scope=None) or one table's set."""
+        base = Path(cache_dir) / "pca_models"
+        return base if scope is None else base / "tables" / scope
 
-            self.pca_models[target_dims] = pca
+    @staticmethod
+    def publish(cache_dir: Path, models: Dict[int, PCAProjection], info: Dict[str, Any],
+                scope: Optional[str] = None) -> int:
+        """
+        Write models as a new published version and flip CURRENT to it.
+        The version directory is complete before CURRENT changes, so a
+        server polling CURRENT never sees a half-written set.
+        """
+        published = AdaptivePCA.scope_dir(cache_dir, scope) / "published"
+        published.mkdir(parents=True, exist_ok=True)
+        versions = sorted(int(d.name[1:]) for d in published.glob("v[0-9]*") if d.is_dir())
+        version = (versions[-1] if versions else 0) + 1
+
+        staging = published / f".v{version}.{os.getpid()}.tmp"
+        staging.mkdir()
+        for dims, projection in models.items():
+            projection.save(staging / f"pca_{dims}.npz")
+        manifest = dict(info, version=version, created=time.time(), dims={
+            str(d): round(float(m.explained_variance_ratio.sum()), 4) for d, m in sorted(models.items())
+        })
+        with open(staging / "manifest.json", 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(staging, published / f"v{version}")
+
+        current_tmp = published / f"CURRENT.{os.getpid()}.tmp"
+        current_tmp.write_text(str(version))
+        os.replace(current_tmp, published / "CURRENT")
+
+        keep = max(1, int(os.environ.get('SPECMEM_PCA_KEEP_VERSIONS', '3')))
+        for old in versions[:max(0, len(versions) - (keep - 1))]:
+            shutil.rmtree(published / f"v{old}", ignore_errors=True)
+        return version
+
+    def check_published(self) -> bool:
+        """Hot-load the published version CURRENT points at, if it changed. Returns True on swap."""
+        published = self.model_dir / "published"
+        try:
+            mtime = (published / "CURRENT").stat().st_mtime
+            if mtime == self._published_mtime:
+                return False
+            version = int((published / "CURRENT").read_text().strip())
+            if version == self.published_version:
+                self._published_mtime = mtime
+                return False
+            models = {
+                int(f.stem.split("_")[1]): PCAProjection.load(f)
+                for f in (published / f"v{version}").glob("pca_*.npz")
+            }
+            if not models:
+                return False
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"⚠️ Could not load published PCA models: {e}", file=sys.stderr)
+            return False
 
-        self.is_trained = True
-        self.training_buffer = []  # Free memory
+        with self._lock:
+            self.pca_models = models
+            self.published_version = version
+            self._published_mtime = mtime
+            self.is_trained = True
+            self.epoch += 1
+            self._reservoir = None
+            self.recent.clear()
+        label = f"{self.scope} " if self.scope else ""
+        print(f"📦 Loaded published {label}PCA v{version} ({', '.join(str(d) for d in sorted(models))})", file=sys.stderr)
+        return True
 
-        self._save_cached()
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'scope': self.scope or 'global',
+            'trained': self.is_trained,
+            'dims': sorted(self.pca_models),
+            'epoch': self.epoch,
+            'basis': self.basis,
+            'published_version': self.published_version,
+            'online': self.online,
+            'refits': self.refits,
+            'reservoir_samples': self._reservoir_fill if self._reservoir is not None else 0,
+            'fitting': self._fitting,
+            'recent_samples': len(self.recent),
+            'new_since_fit': self._new_since_fit,
+            'refit_interval_sec': self.refit_interval,
+        }
 
     def transform(self, embeddings: np.ndarray, target_dims: int) -> np.ndarray:
         """
@@ -1832,21 +4764,19 @@ class AdaptivePCA:
         if reduction_ratio < 0.10:
             return embeddings[..., :target_dims]
 
-        # Find closest PCA model for larger reductions
-        if target_dims in self.pca_models:
-            pca = self.pca_models[target_dims]
+        # Find closest PCA model for larger reductions (one read - a refit may swap the dict)
+        models = self.pca_models
+        if target_dims in models:
+            pca = models[target_dims]
         else:
             # Find closest model
-            available = sorted(self.pca_models.keys())
+            available = sorted(models.keys())
             closest = min(available, key=lambda x: abs(x - target_dims)) if available else None
-            pca = self.pca_models.get(closest)
+            pca = models.get(closest)
 
-        if pca is not None:
-            # Use learned PCA for optimal compression
-            if len(embeddings.shape) == 1:
-                result = pca.transform(embeddings.reshape(1, -1))[0]
-            else:
-                result = pca.transform(embeddings)
+        if pca is not None and pca.mean.shape[0] == native_dims:
+            # Use learned PCA for optimal compression (float32 matmul, single or batched)
+            result = pca.transform(embeddings)
 
             # If PCA gives more dims than target, truncate
             if result.shape[-1] > target_dims:
@@ -2038,6 +4968,11 @@ class FrankensteinEmbeddings:
                 max_mb=self.low_resource_config.disk_cache_max_mb
             )
 
+        # Reuse embeddings already stored in Postgres (backfill batches only; schema set up at server start)
+        self.pg_index: Optional[PostgresEmbeddingIndex] = None
+        if os.environ.get('SPECMEM_PG_REUSE', '1') != '0':
+            self.pg_index = PostgresEmbeddingIndex(self._get_db_connection)
+
         # QQMS Throttler for CPU management
         self.enable_throttling = enable_throttling
         self.throttler: Optional[QQMSThrottler] = None
@@ -2064,6 +4999,30 @@ class FrankensteinEmbeddings:
         # Set to False on load failure, True on successful load + health check
         self._model_healthy = True
 
+        # Lazy egress expansion: expanded vectors are materialized per response
+        # (or via the bulk "expand" API) and never memoized in RAM
+        self.lazy_expansion = os.environ.get('SPECMEM_LAZY_EXPANSION', '0') == '1'
+
+        # Per-batch sequence caps from the observed token-length distribution
+        self.seq_tracker = SequenceLengthTracker()
+        # Per tier: the ONNX variants may be exported with different max lengths
+        self._tier_max_seq_length: Dict[str, int] = {'fast': 256, 'accurate': 256}  # Refreshed on model load
+        self._active_seq_caps: Dict[str, List[int]] = {'fast': [], 'accurate': []}
+        self._seq_cap_lock = threading.Lock()
+
+        # Model tiers: self.model is the fast tier (always used when tiering is
+        # off), self.accurate_model is loaded lazily on the first routed request
+        self.tier_files = dict(_TIER_ONNX_FILES)
+        self._model_ids: Dict[str, str] = {}
+        self.tiers_enabled = MODEL_TIERS_ENABLED and self.tier_files['fast'] != self.tier_files['accurate']
+        self.medium_tier = os.environ.get('SPECMEM_TIER_MEDIUM', 'fast')
+        self.accurate_model = None
+        self._accurate_healthy = True
+        self.tier_stats: Dict[str, Dict[str, float]] = {
+            tier: {'texts': 0, 'calls': 0, 'encode_ms': 0.0} for tier in ('fast', 'accurate')
+        }
+        self._tier_stats_lock = threading.Lock()
+
         # ═══════════════════════════════════════════════════════════════════
         # OPT-6: LAZY LOADING - Don't load model until first request
         # ═══════════════════════════════════════════════════════════════════
@@ -2075,16 +5034,10 @@ class FrankensteinEmbeddings:
             self.dim_config.native_dims = 384  # MiniLM-L6-v2 is always 384
         else:
             # EAGER MODE: Load model immediately (for high-RAM or heavyOps)
-            print(f"Loading model: {self.base_model} ({_BEST_ONNX_FILE})", file=sys.stderr)
-            # NOTE: backend='onnx' is REQUIRED for model_kwargs file_name to work
-            self.model = SentenceTransformer(
-                self.base_model,
-                device='cpu',
-                backend='onnx',
-                cache_folder=str(self.cache_dir),
-                model_kwargs={"file_name": _BEST_ONNX_FILE}
-            )
+            print(f"Loading model: {self.base_model} ({self.tier_files['fast']})", file=sys.stderr)
+            self.model = self._load_sentence_model(self.tier_files['fast'])
             self.dim_config.native_dims = self.model.get_sentence_embedding_dimension()
+            self._tier_max_seq_length['fast'] = getattr(self.model, 'max_seq_length', None) or self._tier_max_seq_length['fast']
             print(f"   Native dimensions: {self.dim_config.native_dims}", file=sys.stderr)
 
         # Query database for target dimension
@@ -2094,6 +5047,13 @@ class FrankensteinEmbeddings:
         self.adaptive_pca: Optional[AdaptivePCA] = None
         if enable_adaptive_pca:
             self.adaptive_pca = AdaptivePCA(self.cache_dir)
+        # Per-table projections (code and prose have very different variance
+        # structure); a table uses the global set until its own is trained.
+        # Opt-in: every request for the table, queries included, must name it
+        self.table_pca: Dict[str, AdaptivePCA] = {}
+        if enable_adaptive_pca and os.environ.get('SPECMEM_PCA_PER_TABLE', '0') == '1':
+            for table in PostgresEmbeddingIndex.TABLES:
+                self.table_pca[table] = AdaptivePCA(self.cache_dir, scope=table)
 
         # Dimension expander (EXPANSION!)
         self.expander: Optional[DimensionExpander] = None
@@ -2109,7 +5069,8 @@ class FrankensteinEmbeddings:
             'native': 0,
             'avg_latency_ms': 0,
             'disk_cache_hits': 0,
-            'disk_cache_misses': 0
+            'disk_cache_misses': 0,
+            'pg_reuse_hits': 0
         }
         self.latencies = deque(maxlen=100)
 
@@ -2163,8 +5124,214 @@ class FrankensteinEmbeddings:
             return 'specmem_default'
         return f'specmem_{dir_name[:50]}'
 
-    def _ensure_model_loaded(self):
-        """Lazy-load model if it was unloaded during idle pause. THREAD-SAFE.
+    def _load_sentence_model(self, onnx_file: str):
+        """Construct the sentence model for one ONNX variant of the base model."""
+        if TORCH_FREE:
+            if not os.path.isdir(str(self.base_model)):
+                # OnnxSentenceEncoder reads local files only - a hub id can't be served torch-free
+                raise RuntimeError(f"Torch-free mode needs a local model directory, got {self.base_model}")
+            return OnnxSentenceEncoder(self.base_model, onnx_file)
+        # NOTE: backend='onnx' is REQUIRED for model_kwargs file_name to work
+        return SentenceTransformer(
+            self.base_model,
+            device='cpu',
+            backend='onnx',
+            cache_folder=str(self.cache_dir),
+            model_kwargs={"file_name": onnx_file}
+        )
+
+    def _route_tier(self, priority: EmbeddingPriority, request_class: str) -> str:
+        """Pick the model tier for a request: bulk work goes fast, live searches accurate."""
+        if not self.tiers_enabled or request_class.startswith('backfill:'):
+            return 'fast'
+        if priority <= EmbeddingPriority.HIGH:
+            return 'accurate'
+        if priority == EmbeddingPriority.MEDIUM and self.medium_tier == 'accurate':
+            return 'accurate'
+        return 'fast'
+
+    def _model_identity(self, tier: str) -> str:
+        """
+        Native cache identity of a tier's model: base model + ONNX variant +
+        ONNX file content hash, so swapping weights never serves vectors from
+        the old one (tiers never mix either). The dims transform version is
+        left out - native vectors don't depend on it; transformed vectors are
+        namespaced by _memo_scope / embedding_hashes instead.
+        """
+        model_id = self._model_ids.get(tier)
+        if model_id is None:
+            onnx_file = self.tier_files[tier]
+            fingerprint = _file_fingerprint(os.path.join(str(self.base_model), onnx_file))
+            model_id = f"{os.path.basename(str(self.base_model).rstrip('/'))}/{onnx_file}@{fingerprint}"
+            self._model_ids[tier] = model_id
+        return model_id
+
+    def projection_basis(self, table: Optional[str], dims: int) -> Optional[str]:
+        """
+        Identity of the projection a table's vectors are compressed with at
+        `dims` - scope + model-set fingerprint - or None when dims >= native
+        (expansion doesn't depend on learned state).
+        """
+        if dims >= self.dim_config.native_dims:
+            return None
+        pca = self._projection_for(table)
+        if pca is None:
+            return 'truncate'
+        return f"{pca.scope or 'global'}@{pca.basis}"
+
+    def embedding_hashes(self, texts: List[str], dims: int, tier: str = 'fast',
+                         table: Optional[str] = None) -> List[str]:
+        """embedding_hash column values for texts embedded at `dims` by a tier's model for a table."""
+        namespace = f"{self._model_identity(tier)}/t{EMBEDDING_TRANSFORM_VERSION}"
+        basis = self.projection_basis(table, dims)
+        if basis is not None:
+            namespace += f"/pca:{basis}"
+        return [PostgresEmbeddingIndex.content_hash(namespace, dims, text) for text in texts]
+
+    def _transform_memo(self, native_dims: int, target_dims: int) -> Optional['DiskBackedEmbeddingCache']:
+        """Memo to use for a transform: none for identity, none for expansions in lazy mode."""
+        if target_dims == native_dims or (self.lazy_expansion and target_dims > native_dims):
+            return None
+        return self.disk_cache
+
+    def expand_natives(self, natives: np.ndarray, target_dims: int, texts: Optional[List[str]] = None,
+                       table: Optional[str] = None) -> np.ndarray:
+        """
+        Materialize target-dim vectors from stored native vectors (lazy
+        egress expansion / bulk "expand" API). The text-dependent block is
+        rehashed from `texts`, which the caller keeps alongside the natives.
+        Only target_dims >= native is served: expansion is deterministic, so
+        the result equals embed_batch's, while compression depends on the PCA
+        set live at call time and could silently differ from stored rows.
+        """
+        natives = np.asarray(natives, dtype=np.float32).reshape(len(natives), -1)
+        if target_dims < natives.shape[-1]:
+            raise ValueError(f"expand needs dims >= native ({natives.shape[-1]}), got {target_dims}")
+        transformed = self._transform_dims_batch(natives, target_dims, texts, table)
+        norms = np.linalg.norm(transformed, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return transformed / norms
+
+    def _memo_scope(self, model_id: str, table: Optional[str]) -> Tuple[str, int]:
+        """Memo identity + epoch of the transform version and projection set a table's transforms use."""
+        model_id = f"{model_id}/t{EMBEDDING_TRANSFORM_VERSION}"
+        pca = self._projection_for(table)
+        if pca is None:
+            return model_id, 0
+        return (f"{model_id}#{pca.scope}" if pca.scope else model_id), pca.epoch
+
+    def _native_to_target(self, text: str, native: np.ndarray, target_dims: int, model_id: str,
+                          table: Optional[str] = None, memoize: bool = True) -> np.ndarray:
+        """
+        Read-time transform: native vector -> normalized target-dim vector.
+        Memoized per (text, model, projection set, target dims, PCA epoch) when the cache is on
+        and memoize is set (capped encodes aren't the text's canonical vector).
+        """
+        memo = self._transform_memo(native.shape[-1], target_dims) if memoize else None
+        model_id, epoch = self._memo_scope(model_id, table)
+        if memo is not None:
+            cached = memo.get_transformed(text, model_id, target_dims, epoch)
+            if cached is not None:
+                return cached
+
+        # Transform to target dimensions (expand or compress)
+        embedding = self._transform_dims(native, target_dims, text, table)
+
+        # Normalize
+        norm = np.linalg.norm(embedding)
+        if norm > 0:
+            embedding = embedding / norm
+
+        if memo is not None:
+            memo.put_transformed(text, model_id, target_dims, embedding, epoch)
+        return embedding
+
+    def _native_to_target_batch(self, texts: List[str], natives: List[np.ndarray], target_dims: int,
+                                model_id: str, table: Optional[str] = None,
+                                memoize: Optional[List[bool]] = None) -> List[np.ndarray]:
+        """
+        Batched _native_to_target: memo hits are returned as-is and every miss
+        is transformed in one vectorized call, then row-normalized. Rows with
+        memoize[i] False bypass the memo both ways.
+        """
+        if memoize is None:
+            memoize = [True] * len(natives)
+        if len({n.shape[-1] for n in natives}) > 1:
+            # Mixed native dims (model switch mid-batch) - no common matrix
+            return [self._native_to_target(t, n, target_dims, model_id, table, m)
+                    for t, n, m in zip(texts, natives, memoize)]
+
+        out: List[Optional[np.ndarray]] = [None] * len(natives)
+        memo = self._transform_memo(natives[0].shape[-1], target_dims) if natives else None
+        model_id, epoch = self._memo_scope(model_id, table)
+        misses = list(range(len(natives)))
+        if memo is not None:
+            misses = []
+            for i, text in enumerate(texts):
+                if memoize[i]:
+                    out[i] = memo.get_transformed(text, model_id, target_dims, epoch)
+                if out[i] is None:
+                    misses.append(i)
+
+        if misses:
+            matrix = np.stack([natives[i] for i in misses])
+            transformed = self._transform_dims_batch(matrix, target_dims, [texts[i] for i in misses], table=table)
+            norms = np.linalg.norm(transformed, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            transformed = transformed / norms
+            for row, i in enumerate(misses):
+                out[i] = transformed[row]
+                if memo is not None and memoize[i]:
+                    memo.put_transformed(texts[i], model_id, target_dims, transformed[row], epoch)
+        return out
+
+    def _get_tier_model(self, tier: str):
+        """Loaded model for a tier. The accurate tier falls back to fast if it can't load."""
+        if tier == 'accurate' and self.tiers_enabled:
+            try:
+                self._ensure_model_loaded('accurate')
+                return self.accurate_model
+            except RuntimeError:
+                print("[MODEL-RELOAD] Accurate tier unavailable - serving from fast tier", file=sys.stderr)
+                self.tiers_enabled = False
+        self._ensure_model_loaded()
+        return self.model
+
+    def _encode_tier(self, tier: str) -> str:
+        """Tier whose model _get_tier_model actually returns (accurate falls back to fast)."""
+        return 'accurate' if tier == 'accurate' and self.tiers_enabled else 'fast'
+
+    def _record_tier_throughput(self, tier: str, n_texts: int, encode_ms: float):
+        with self._tier_stats_lock:
+            entry = self.tier_stats[tier]
+            entry['texts'] += n_texts
+            entry['calls'] += 1
+            entry['encode_ms'] += encode_ms
+
+    def unload_model(self):
+        """Release every loaded tier. _ensure_model_loaded() reloads on next request."""
+        with self._model_lock:
+            self.model = None
+            self.accurate_model = None
+        gc.collect()
+        # Try to free CUDA memory if available
+        _release_accelerator_memory()
+
+    def _tier_loaded(self, tier: str) -> bool:
+        if tier == 'accurate':
+            return self.accurate_model is not None and self._accurate_healthy
+        return self.model is not None and getattr(self, '_model_healthy', True)
+
+    def _set_tier_model(self, tier: str, model, healthy: bool):
+        if tier == 'accurate':
+            self.accurate_model = model
+            self._accurate_healthy = healthy
+        else:
+            self.model = model
+            self._model_healthy = healthy
+
+    def _ensure_model_loaded(self, tier: str = 'fast'):
+        """Lazy-load a tier's model if it was unloaded during idle pause. THREAD-SAFE.
 
         This allows the server to free RAM when idle but instantly reload
         when a new request comes in. The socket stays open, just the model
@@ -2180,9 +5347,13 @@ class FrankensteinEmbeddings:
 
         Raises RuntimeError if all retries fail, ensuring callers get an
         explicit error instead of silent failure.
+
+        The accurate tier goes through the same load + health check; it must
+        produce vectors of the fast tier's native dims (they share the cache
+        and every projection).
         """
         # Fast path: model already loaded and healthy (no lock needed)
-        if self.model is not None and getattr(self, '_model_healthy', True):
+        if self._tier_loaded(tier):
             return
 
         max_retries = int(os.environ.get('SPECMEM_MODEL_RELOAD_RETRIES', '3'))
@@ -2191,34 +5362,33 @@ class FrankensteinEmbeddings:
         # Slow path: need to load model (with lock)
         with self._model_lock:
             # Double-check inside lock (another thread may have loaded it)
-            if self.model is not None and getattr(self, '_model_healthy', True):
+            if self._tier_loaded(tier):
                 return
 
+            onnx_file = self.tier_files[tier]
             last_error = None
             for attempt in range(1, max_retries + 1):
-                print(f"[MODEL-RELOAD] Loading model: {self.base_model} ({_BEST_ONNX_FILE}) (attempt {attempt}/{max_retries})", file=sys.stderr)
+                print(f"[MODEL-RELOAD] Loading {tier} tier: {self.base_model} ({onnx_file}) (attempt {attempt}/{max_retries})", file=sys.stderr)
                 start = time.time()
                 try:
-                    # NOTE: backend='onnx' is REQUIRED for model_kwargs file_name to work
-                    self.model = SentenceTransformer(
-                        self.base_model,
-                        device='cpu',
-                        backend='onnx',
-                        cache_folder=str(self.cache_dir),
-                        model_kwargs={"file_name": _BEST_ONNX_FILE}
-                    )
+                    model = self._load_sentence_model(onnx_file)
                     load_time = (time.time() - start) * 1000
 
                     # Verify the model actually works by doing a test encode
-                    test_embedding = self.model.encode("health check", show_progress_bar=False)
+                    test_embedding = model.encode("health check", show_progress_bar=False)
                     if test_embedding is None or len(test_embedding) == 0:
                         raise RuntimeError("Model loaded but produced empty embedding on health check")
 
-                    self._model_healthy = True
+                    actual_dims = model.get_sentence_embedding_dimension()
+                    if tier == 'accurate' and actual_dims != self.dim_config.native_dims:
+                        raise RuntimeError(f"Accurate tier is {actual_dims}D, fast tier is {self.dim_config.native_dims}D")
+
+                    self._set_tier_model(tier, model, True)
                     print(f"[MODEL-RELOAD] Model loaded and verified in {load_time:.0f}ms (attempt {attempt}) - ready to embed!", file=sys.stderr)
 
+                    self._tier_max_seq_length[tier] = getattr(model, 'max_seq_length', None) or self._tier_max_seq_length[tier]
+
                     # Update native dims if we didn't know them
-                    actual_dims = self.model.get_sentence_embedding_dimension()
                     if self.dim_config.native_dims != actual_dims:
                         print(f"   Native dims updated: {self.dim_config.native_dims} -> {actual_dims}", file=sys.stderr)
                         self.dim_config.native_dims = actual_dims
@@ -2229,8 +5399,7 @@ class FrankensteinEmbeddings:
 
                 except Exception as e:
                     last_error = e
-                    self.model = None
-                    self._model_healthy = False
+                    self._set_tier_model(tier, None, False)
                     print(f"[MODEL-RELOAD] Attempt {attempt}/{max_retries} failed: {e}", file=sys.stderr)
 
                     if attempt < max_retries:
@@ -2241,8 +5410,8 @@ class FrankensteinEmbeddings:
                         time.sleep(delay_seconds)
 
             # All retries exhausted
-            self._model_healthy = False
-            error_msg = f"Model reload failed after {max_retries} attempts. Last error: {last_error}"
+            self._set_tier_model(tier, None, False)
+            error_msg = f"Model reload ({tier} tier) failed after {max_retries} attempts. Last error: {last_error}"
             print(f"[MODEL-RELOAD] FATAL: {error_msg}", file=sys.stderr)
             raise RuntimeError(error_msg)
 
@@ -2333,7 +5502,36 @@ class FrankensteinEmbeddings:
             self.dim_config.target_dims = new_dims
             self.dim_config.last_refresh = time.time()
 
-    def _transform_dims(self, embedding: np.ndarray, target_dims: int, text: str = "") -> np.ndarray:
+    def _request_table(self, request_class: str) -> Optional[str]:
+        """Project table a request class targets ('backfill:<table>'), if it has projections."""
+        if request_class.startswith('backfill:'):
+            table = request_class.split(':', 1)[1]
+            if table in self.table_pca:
+                return table
+        return None
+
+    def _projection_for(self, table: Optional[str]) -> Optional[AdaptivePCA]:
+        """The table's own projections once trained, otherwise the global set."""
+        pca = self.table_pca.get(table) if table else None
+        if pca is not None and pca.pca_models:
+            return pca
+        return self.adaptive_pca
+
+    def _train_projections(self, natives: np.ndarray, table: Optional[str]):
+        """Feed new native vectors to the global projections and to the target table's own."""
+        if self.adaptive_pca is not None:
+            self.adaptive_pca.add_samples(natives)
+        if table in self.table_pca:
+            self.table_pca[table].add_samples(natives)
+
+    def check_published_projections(self):
+        """Hot-load newly published projection sets (global and per table)."""
+        for pca in [self.adaptive_pca, *self.table_pca.values()]:
+            if pca is not None:
+                pca.check_published()
+
+    def _transform_dims(self, embedding: np.ndarray, target_dims: int, text: str = "",
+                        table: Optional[str] = None) -> np.ndarray:
         """
         Transform embedding to target dimensions.
         Can EXPAND or COMPRESS based on need!
@@ -2348,8 +5546,9 @@ class FrankensteinEmbeddings:
         elif current_dims > target_dims:
             # COMPRESSION needed
             self.stats['compressions'] += 1
-            if self.adaptive_pca is not None:
-                return self.adaptive_pca.transform(embedding, target_dims)
+            pca = self._projection_for(table)
+            if pca is not None:
+                return pca.transform(embedding, target_dims).astype(np.float32, copy=False)
             return embedding[..., :target_dims]
 
         else:
@@ -2358,14 +5557,130 @@ class FrankensteinEmbeddings:
             if self.expander is not None:
                 return self.expander.expand(embedding, target_dims, text)
             # Fallback: zero-padding (not ideal but works)
-            padding = np.zeros(target_dims - current_dims)
+            padding = np.zeros(target_dims - current_dims, dtype=np.float32)
             return np.concatenate([embedding, padding])
 
+    def _transform_dims_batch(self, embeddings: np.ndarray, target_dims: int, texts: Optional[List[str]],
+                              table: Optional[str] = None) -> np.ndarray:
+        """_transform_dims for an (N, native) matrix - one PCA call / one vectorized expansion."""
+        current_dims = embeddings.shape[-1]
+        count = len(embeddings)
+
+        if current_dims == target_dims:
+            self.stats['native'] += count
+            return embeddings
+
+        elif current_dims > target_dims:
+            self.stats['compressions'] += count
+            pca = self._projection_for(table)
+            if pca is not None:
+                return pca.transform(embeddings, target_dims).astype(np.float32, copy=False)
+            return embeddings[:, :target_dims]
+
+        else:
+            self.stats['expansions'] += count
+            if self.expander is not None:
+                return self.expander.expand_batch(embeddings, target_dims, texts)
+            out = np.zeros((count, target_dims), dtype=np.float32)
+            out[:, :current_dims] = embeddings
+            return out
+
+    @contextmanager
+    def _seq_cap(self, tier: str, model, cap: int):
+        """
+        Apply a sequence cap to the shared model for one encode call.
+
+        Concurrent requests share the model, so the effective cap is the max
+        of all in-flight caps - a running batch can be widened by another
+        thread but never truncated below its own cap.
+        """
+        active = self._active_seq_caps[tier]
+        with self._seq_cap_lock:
+            active.append(cap)
+            model.max_seq_length = max(active)
+        try:
+            yield
+        finally:
+            with self._seq_cap_lock:
+                active.remove(cap)
+                model.max_seq_length = max(active, default=self._tier_max_seq_length[tier])
+
+    def _chunk_long_texts(self, texts: List[str], lengths: List[int], cap: int,
+                          native_max: int) -> Tuple[List[str], List[Tuple[int, int]]]:
+        """
+        Split texts above the cap into cap-sized character windows covering
+        what the uncapped model would have seen (up to native max tokens).
+        Returns the flattened pieces and a (start, end) span per input text.
+        """
+        max_chars = (native_max + 1) * SequenceLengthTracker.CHARS_PER_TOKEN_MAX
+        pieces: List[str] = []
+        spans: List[Tuple[int, int]] = []
+        for text, n in zip(texts, lengths):
+            start = len(pieces)
+            if n <= cap:
+                pieces.append(text)
+            else:
+                chars_per_token = len(text[:max_chars]) / max(n, 1)
+                covered = min(n, native_max)
+                windows = -(-covered // cap)
+                window_chars = max(1, int(cap * chars_per_token))
+                for w in range(windows):
+                    piece = text[w * window_chars:(w + 1) * window_chars]
+                    if piece:
+                        pieces.append(piece)
+            spans.append((start, len(pieces)))
+        return pieces, spans
+
+    def _encode(self, texts: List[str], request_class: str, batch_size: int = 32, tier: str = 'fast',
+                with_capped: bool = False):
+        """
+        model.encode() with a per-batch sequence cap. Returns an (N, native) matrix
+        (plus a per-text "capped" mask with with_capped=True).
+
+        The token lengths are recorded per request class, the batch is padded
+        to its own max, and texts above the class quantile are truncated or
+        (SPECMEM_SEQ_OVERFLOW=chunk) split into windows and mean-pooled.
+        Capped vectors depend on the tracker's history, not just (model, text),
+        so callers must not cache or hash them.
+        """
+        model = self._get_tier_model(tier)
+        model_tier = self._encode_tier(tier)
+        encode_start = time.time()
+        native_max = self._tier_max_seq_length[model_tier]
+        lengths = self.seq_tracker.count_tokens(model, texts, native_max)
+        self.seq_tracker.record(request_class, lengths)
+        cap = self.seq_tracker.choose_cap(request_class, lengths, native_max)
+
+        spans = None
+        encode_texts = texts
+        if self.seq_tracker.overflow_mode == 'chunk' and cap < native_max and any(n > cap for n in lengths):
+            encode_texts, spans = self._chunk_long_texts(texts, lengths, cap, native_max)
+
+        with self._seq_cap(model_tier, model, cap):
+            embeddings = model.encode(
+                encode_texts,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+                batch_size=batch_size
+            )
+
+        if spans is not None:
+            pooled = np.stack([embeddings[start:end].mean(axis=0) for start, end in spans])
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            embeddings = pooled / np.where(norms > 0, norms, 1.0)
+
+        self._record_tier_throughput(tier, len(texts), (time.time() - encode_start) * 1000)
+        if with_capped:
+            return embeddings, [cap < native_max and n > cap for n in lengths]
+        return embeddings
+
     def embed_single(
         self,
         text: str,
         force_dims: Optional[int] = None,
-        priority: EmbeddingPriority = EmbeddingPriority.MEDIUM
+        priority: EmbeddingPriority = EmbeddingPriority.MEDIUM,
+        tier: Optional[str] = None,
+        table: Optional[str] = None
     ) -> np.ndarray:
         """
         Generate embedding for a single text with DYNAMIC dimensions.
@@ -2374,6 +5689,8 @@ class FrankensteinEmbeddings:
             text: Input text
             force_dims: Force specific dimensions (None = auto)
             priority: Request priority for throttling
+            tier: 'fast' or 'accurate' model tier (None = route by priority)
+            table: Project table the vector is for (selects its learned projection)
 
         Returns:
             Normalized embedding vector at database target dimension
@@ -2385,18 +5702,21 @@ class FrankensteinEmbeddings:
 
         # Get target dimensions FIRST (before cache check)
         target_dims = force_dims or self._get_target_dims(text)
+        tier = tier if tier in ('fast', 'accurate') else self._route_tier(priority, 'query')
+        model_id = self._model_identity(tier)
 
         # ═══════════════════════════════════════════════════════════════════
-        # OPT-8: Check disk cache BEFORE loading model
+        # OPT-8: Check disk cache BEFORE loading model (native vector, any target dims)
         # ═══════════════════════════════════════════════════════════════════
         if self.disk_cache is not None:
-            cached = self.disk_cache.get(text, target_dims)
+            cached = self.disk_cache.get(text, model_id, self.dim_config.native_dims)
             if cached is not None:
+                embedding = self._native_to_target(text, cached, target_dims, model_id, table)
                 self.stats['disk_cache_hits'] += 1
                 self.stats['total_embeddings'] += 1
                 latency_ms = (time.time() - start_time) * 1000
                 self.latencies.append(latency_ms)
-                return cached
+                return embedding
             self.stats['disk_cache_misses'] += 1
 
         # Apply QQMS throttling to prevent CPU spikes
@@ -2404,27 +5724,27 @@ class FrankensteinEmbeddings:
         if self.throttler is not None:
             throttle_delay = self.throttler.acquire(priority)
 
-        # Ensure model is loaded (lazy-load after idle pause)
-        self._ensure_model_loaded()
+        # Generate embedding at native dims (sequence capped to the query class).
+        # _encode lazy-loads the tier's model after an idle pause.
+        natives, capped = self._encode([text], request_class='query', tier=tier, with_capped=True)
+        native = natives[0]
 
-        # Generate embedding at native dims
-        embedding = self.model.encode(
-            text,
-            convert_to_numpy=True,
-            show_progress_bar=False
-        )
+        # ═══════════════════════════════════════════════════════════════════
+        # OPT-8: Store the NATIVE vector - valid for every future target dim
+        # (unless it was encoded under a sequence cap)
+        # ═══════════════════════════════════════════════════════════════════
+        if self.disk_cache is not None and not capped[0]:
+            try:
+                self.disk_cache.put(text, model_id, native)
+            except Exception as e:
+                # Don't fail on cache write errors
+                pass
 
         # Add to PCA training data
-        if self.adaptive_pca is not None:
-            self.adaptive_pca.add_samples(embedding.reshape(1, -1))
+        self._train_projections(native.reshape(1, -1), table)
 
-        # Transform to target dimensions (expand or compress)
-        embedding = self._transform_dims(embedding, target_dims, text)
-
-        # Normalize
-        norm = np.linalg.norm(embedding)
-        if norm > 0:
-            embedding = embedding / norm
+        # Transform to target dimensions (expand or compress) + normalize
+        embedding = self._native_to_target(text, native, target_dims, model_id, table, memoize=not capped[0])
 
         # Track stats
         latency_ms = (time.time() - start_time) * 1000
@@ -2436,23 +5756,17 @@ class FrankensteinEmbeddings:
         self.stats['dimension_histogram'][dim_bucket] = \
             self.stats['dimension_histogram'].get(dim_bucket, 0) + 1
 
-        # ═══════════════════════════════════════════════════════════════════
-        # OPT-8: Store in disk cache for future requests
-        # ═══════════════════════════════════════════════════════════════════
-        if self.disk_cache is not None:
-            try:
-                self.disk_cache.put(text, target_dims, embedding)
-            except Exception as e:
-                # Don't fail on cache write errors
-                pass
-
         return embedding
 
     def embed_batch(
         self,
         texts: List[str],
         force_dims: Optional[int] = None,
-        priority: EmbeddingPriority = EmbeddingPriority.LOW
+        priority: EmbeddingPriority = EmbeddingPriority.LOW,
+        request_class: str = 'batch',
+        tier: Optional[str] = None,
+        table: Optional[str] = None,
+        truncated: Optional[List[bool]] = None
     ) -> np.ndarray:
         """
         Generate embeddings for multiple texts with batch processing.
@@ -2461,6 +5775,11 @@ class FrankensteinEmbeddings:
             texts: List of input texts
             force_dims: Force specific dimensions (None = use max needed)
             priority: Request priority for throttling (default LOW for batches)
+            request_class: Length-distribution bucket ('batch' or 'backfill:<table>')
+            tier: 'fast' or 'accurate' model tier (None = route by priority/class)
+            table: Project table the vectors are for (None = taken from a backfill request_class)
+            truncated: Optional list, filled with one flag per text - True when the text was
+                encoded under a sequence cap (not cached; callers shouldn't store its embedding_hash)
 
         Returns:
             Matrix of normalized embeddings
@@ -2472,6 +5791,9 @@ class FrankensteinEmbeddings:
 
         # For batch, use database target dims (refreshes if needed)
         target_dims = force_dims or self._get_target_dims()
+        tier = tier if tier in ('fast', 'accurate') else self._route_tier(priority, request_class)
+        model_id = self._model_identity(tier)
+        table = table or self._request_table(request_class)
 
         # ═══════════════════════════════════════════════════════════════════
         # OPT-8: Check disk cache for each text (partial cache hits)
@@ -2481,19 +5803,49 @@ class FrankensteinEmbeddings:
         uncached_texts: List[str] = []
 
         if self.disk_cache is not None:
-            for i, text in enumerate(texts):
-                cached = self.disk_cache.get(text, target_dims)
+            # One batched probe instead of a get() (locks + store read) per text
+            cached_natives = self.disk_cache.get_many(texts, model_id, self.dim_config.native_dims)
+            hit_indices: List[int] = []
+            for i, (text, cached) in enumerate(zip(texts, cached_natives)):
                 if cached is not None:
-                    cached_embeddings[i] = cached
+                    hit_indices.append(i)
                     self.stats['disk_cache_hits'] += 1
                 else:
                     uncached_indices.append(i)
                     uncached_texts.append(text)
                     self.stats['disk_cache_misses'] += 1
+            if hit_indices:
+                # Cached vectors are native - project to the current target at read time
+                transformed = self._native_to_target_batch(
+                    [texts[i] for i in hit_indices], [cached_natives[i] for i in hit_indices], target_dims, model_id,
+                    table
+                )
+                for i, emb in zip(hit_indices, transformed):
+                    cached_embeddings[i] = emb
         else:
             uncached_indices = list(range(len(texts)))
             uncached_texts = texts
 
+        # Rows of the backfilled table may already hold this exact content's embedding
+        if self.pg_index is not None and uncached_texts and request_class.startswith('backfill:'):
+            backfill_table = request_class.split(':', 1)[1]
+            hashes = self.embedding_hashes(uncached_texts, target_dims, tier, backfill_table)
+            stored = self.pg_index.lookup(hashes, target_dims, backfill_table, uncached_texts)
+            if stored:
+                still_indices, still_texts = [], []
+                for idx, text, content_hash in zip(uncached_indices, uncached_texts, hashes):
+                    vec = stored.get(content_hash)
+                    if vec is None:
+                        still_indices.append(idx)
+                        still_texts.append(text)
+                    else:
+                        cached_embeddings[idx] = vec
+                self.stats['pg_reuse_hits'] += len(uncached_texts) - len(still_texts)
+                uncached_indices, uncached_texts = still_indices, still_texts
+
+        if truncated is not None:
+            truncated[:] = [False] * len(texts)
+
         # If all cached, return immediately
         if len(uncached_texts) == 0:
             result = np.array([cached_embeddings[i] for i in range(len(texts))])
@@ -2502,57 +5854,97 @@ class FrankensteinEmbeddings:
             self.stats['total_embeddings'] += len(texts)
             return result
 
+        # Encode + cache native vectors for the misses, then transform to the target dims
+        new_embeddings, capped = self._encode_and_cache(uncached_texts, model_id, tier, priority, request_class, table)
+        transformed = self._native_to_target_batch(
+            uncached_texts, list(new_embeddings), target_dims, model_id, table, [not c for c in capped]
+        )
+        for orig_idx, emb, was_capped in zip(uncached_indices, transformed, capped):
+            cached_embeddings[orig_idx] = emb
+            if truncated is not None:
+                truncated[orig_idx] = was_capped
+
+        # Combine all embeddings in original order
+        embeddings = np.array([cached_embeddings[i] for i in range(len(texts))])
+
+        # Track stats
+        latency_ms = (time.time() - start_time) * 1000
+        self.latencies.append(latency_ms)
+        self.stats['total_embeddings'] += len(texts)
+
+        return embeddings
+
+    def _encode_and_cache(self, texts: List[str], model_id: str, tier: str,
+                          priority: EmbeddingPriority, request_class: str,
+                          table: Optional[str] = None) -> Tuple[np.ndarray, List[bool]]:
+        """
+        Throttle, encode at native dims with the autotuned batch size, feed PCA and
+        cache the natives. Returns (natives, capped mask); capped rows aren't cached.
+        """
         # Apply QQMS throttling for batch processing
         throttle_delay = 0.0
         if self.throttler is not None:
-            throttle_delay = self.throttler.acquire_batch(len(uncached_texts), priority)
-
-        # Limit batch size to prevent CPU spikes
-        max_batch = 16 if self.throttler else 32
+            throttle_delay = self.throttler.acquire_batch(len(texts), priority)
 
-        # Ensure model is loaded (lazy-load after idle pause)
-        self._ensure_model_loaded()
+        # OPT-4: Autotuned batch size (hill-climbed on live texts/sec, capped by CPU/RAM)
+        sizer = get_adaptive_sizer()
+        max_batch = sizer.get_adaptive_batch_size()
 
-        # Generate embeddings for uncached texts only
-        new_embeddings = self.model.encode(
-            uncached_texts,
-            convert_to_numpy=True,
-            show_progress_bar=False,
-            batch_size=max_batch
+        # Generate embeddings for uncached texts only (_encode lazy-loads the tier's model)
+        encode_start = time.time()
+        new_embeddings, capped = self._encode(
+            texts, request_class=request_class, batch_size=max_batch, tier=tier, with_capped=True
         )
+        sizer.record_batch(max_batch, len(texts), (time.time() - encode_start) * 1000)
 
         # Add to PCA training
-        if self.adaptive_pca is not None:
-            self.adaptive_pca.add_samples(new_embeddings)
+        self._train_projections(new_embeddings, table)
 
-        # Transform and cache new embeddings
-        for i, (orig_idx, emb) in enumerate(zip(uncached_indices, new_embeddings)):
-            text = uncached_texts[i]
-            transformed = self._transform_dims(emb, target_dims, text)
-
-            # Normalize
-            norm = np.linalg.norm(transformed)
-            if norm > 0:
-                transformed = transformed / norm
-
-            # Store in cache
-            if self.disk_cache is not None:
-                try:
-                    self.disk_cache.put(text, target_dims, transformed)
-                except:
-                    pass
-
-            cached_embeddings[orig_idx] = transformed
+        # Cache native vectors in one grouped write (a capped vector isn't the text's canonical one)
+        keep = [i for i, c in enumerate(capped) if not c]
+        if self.disk_cache is not None and keep:
+            try:
+                if len(keep) == len(texts):
+                    self.disk_cache.put_many(texts, model_id, new_embeddings)
+                else:
+                    self.disk_cache.put_many([texts[i] for i in keep], model_id, new_embeddings[keep])
+            except:
+                pass
+        return new_embeddings, capped
 
-        # Combine all embeddings in original order
-        embeddings = np.array([cached_embeddings[i] for i in range(len(texts))])
+    def embed_batch_native(
+        self,
+        texts: List[str],
+        priority: EmbeddingPriority = EmbeddingPriority.LOW,
+        request_class: str = 'batch',
+        tier: Optional[str] = None,
+        table: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        Native-dimension vectors for texts (cache first, encode the rest) with
+        no target-dim transform - the compact half of lazy egress expansion.
+        """
+        start_time = time.time()
+        self.last_request_time = time.time()
+        tier = tier if tier in ('fast', 'accurate') else self._route_tier(priority, request_class)
+        model_id = self._model_identity(tier)
 
-        # Track stats
-        latency_ms = (time.time() - start_time) * 1000
-        self.latencies.append(latency_ms)
+        natives: List[Optional[np.ndarray]] = [None] * len(texts)
+        if self.disk_cache is not None:
+            natives = self.disk_cache.get_many(texts, model_id, self.dim_config.native_dims)
+        missing = [i for i, vec in enumerate(natives) if vec is None]
+        self.stats['disk_cache_hits'] += len(texts) - len(missing)
+        self.stats['disk_cache_misses'] += len(missing)
+
+        if missing:
+            table = table or self._request_table(request_class)
+            encoded, _ = self._encode_and_cache([texts[i] for i in missing], model_id, tier, priority, request_class, table)
+            for i, vec in zip(missing, encoded):
+                natives[i] = vec
+
+        self.latencies.append((time.time() - start_time) * 1000)
         self.stats['total_embeddings'] += len(texts)
-
-        return embeddings
+        return np.array(natives, dtype=np.float32)
 
     def get_stats(self) -> Dict[str, Any]:
         """Get embedding statistics including low-resource optimization info"""
@@ -2566,10 +5958,14 @@ class FrankensteinEmbeddings:
             'last_refresh': self.dim_config.last_refresh,
             'refresh_interval': self.dim_config.refresh_interval,
             'pca_trained': self.adaptive_pca.is_trained if self.adaptive_pca else False,
+            'pca': self.adaptive_pca.get_stats() if self.adaptive_pca else None,
+            'pca_tables': {table: pca.get_stats() for table, pca in self.table_pca.items()},
             'ram_usage_mb': round(self.ram_guard.get_ram_usage_mb(), 1),
             'ram_limit_mb': self.ram_guard.MAX_RAM_MB,
             'throttling_enabled': self.enable_throttling,
             'model_loaded': self.model is not None,
+            'accurate_model_loaded': self.accurate_model is not None,
+            'lazy_expansion': self.lazy_expansion,
             'model_healthy': getattr(self, '_model_healthy', True)
         }
 
@@ -2581,17 +5977,43 @@ class FrankensteinEmbeddings:
             'lazy_loading': self.low_resource_config.lazy_loading,
             'disk_cache_enabled': self.low_resource_config.disk_cache_enabled,
             'aggressive_cleanup': self.low_resource_config.aggressive_cleanup,
-            'idle_unload_seconds': self.low_resource_config.idle_unload_seconds
+            'idle_unload_seconds': self.low_resource_config.idle_unload_seconds,
+            'cpu_affinity': _CPU_AFFINITY
         }
 
         # Add disk cache stats if enabled
         if self.disk_cache is not None:
             stats['disk_cache'] = self.disk_cache.get_stats()
 
+        if self.pg_index is not None:
+            stats['pg_reuse'] = self.pg_index.get_stats()
+
         # Add throttler stats if enabled
         if self.throttler is not None:
             stats['throttler'] = self.throttler.get_stats()
 
+        # Token-length distribution and sequence caps per request class
+        stats['sequence_length'] = self.seq_tracker.get_stats()
+
+        # Batch autotuner state (chosen size, measured texts/sec per candidate)
+        stats['adaptive_batch'] = get_adaptive_sizer().get_stats()
+
+        # Per-tier model files and measured throughput
+        with self._tier_stats_lock:
+            stats['tiers'] = {
+                'enabled': self.tiers_enabled,
+                'medium_priority_tier': self.medium_tier,
+                **{
+                    tier: {
+                        'onnx_file': self.tier_files[tier],
+                        'texts': int(entry['texts']),
+                        'calls': int(entry['calls']),
+                        'texts_per_sec': round(entry['texts'] * 1000 / entry['encode_ms'], 1) if entry['encode_ms'] > 0 else 0.0
+                    }
+                    for tier, entry in self.tier_stats.items()
+                }
+            }
+
         return stats
 
 
@@ -2663,6 +6085,16 @@ class EmbeddingServer:
         # Auto-sync codebase_files dimension to match memories
         self._sync_codebase_files_dimension(self.embedder.dim_config.target_dims)
 
+        # embedding_hash column + index for backfill reuse (kept off the request path)
+        if self.embedder.pg_index is not None:
+            self.embedder.pg_index.ensure_schema()
+
+        # Re-embed tables whose PCA basis moved since their rows were written
+        self._bases_path = self.embedder.cache_dir / "pca_models" / "table_bases.json"
+        self._bases_seen: Optional[Tuple[str, ...]] = None
+        self._reembedding: set = set()
+        self._check_projection_bases()
+
         # Start dimension refresh thread (every 60 seconds)
         self._start_dimension_refresh_thread()
 
@@ -2748,6 +6180,12 @@ class EmbeddingServer:
             print(f"Could not get {table_name} dimensions: {e}", file=sys.stderr)
             return self.embedder.dim_config.target_dims
 
+    def _embedding_hash_tables(self) -> List[str]:
+        """Tables whose backfill writes also maintain embedding_hash (see PostgresEmbeddingIndex)."""
+        if self.embedder.pg_index is None:
+            return []
+        return self.embedder.pg_index.hash_tables()
+
     def _sync_codebase_files_dimension(self, target_dims: int) -> bool:
         """
         Auto-sync codebase_files table to match memories dimension.
@@ -2788,6 +6226,177 @@ class EmbeddingServer:
             print(f"⚠️ codebase_files auto-sync failed: {e}", file=sys.stderr)
             return False
 
+    def _check_projection_bases(self):
+        """
+        Compare each table's compression basis with the one its stored rows were
+        written with (pca_models/table_bases.json) and re-embed tables where it
+        moved - a first fit, a refit, a hot-loaded published version or a table
+        switching to its own projections all change the coordinate system, and
+        queries embedded with the new basis don't match rows from the old one.
+        Without a record (first run) the current bases are just recorded.
+        """
+        pcas = [self.embedder.adaptive_pca, *self.embedder.table_pca.values()]
+        seen = tuple(pca.basis if pca is not None else '' for pca in pcas)
+        if seen == self._bases_seen:
+            return
+        try:
+            recorded = json.loads(self._bases_path.read_text())
+        except (OSError, ValueError):
+            recorded = None
+
+        current = {
+            table: self.embedder.projection_basis(table, self._get_table_dimensions(table)) or ''
+            for table in PostgresEmbeddingIndex.TABLES
+        }
+        pending = False
+        if recorded is not None:
+            for table, basis in current.items():
+                if recorded.get(table, basis) != basis and not self._reembed_table(table, recorded.get(table), basis):
+                    current[table] = recorded[table]  # Retry on the next refresh
+                    pending = True
+
+        try:
+            self._bases_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._bases_path.with_suffix('.tmp')
+            tmp_path.write_text(json.dumps(current, indent=2))
+            os.replace(tmp_path, self._bases_path)
+        except OSError as e:
+            print(f"⚠️ Could not record projection bases: {e}", file=sys.stderr)
+        if not pending:
+            self._bases_seen = seen
+
+    def _reembed_table(self, table: str, old_basis: Optional[str], new_basis: str) -> bool:
+        """
+        Re-embed a table whose rows were written under another basis, in the
+        background and in place (_reembed_rows) - old vectors keep serving
+        search until their batch is rewritten. Returns False to retry later.
+        """
+        if table in self._reembedding:
+            return False
+        conn = self._get_db_connection()
+        if not conn:
+            return False
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT 1 FROM information_schema.tables
+                WHERE table_schema = current_schema() AND table_name = %s
+            """, (table,))
+            if cursor.fetchone() is None:
+                cursor.close()
+                conn.close()
+                return True  # Nothing stored, nothing to redo
+            cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE embedding IS NOT NULL")
+            stored = cursor.fetchone()[0]
+            cursor.close()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Re-embed of {table} failed: {e}", file=sys.stderr)
+            try:
+                conn.rollback()
+                conn.close()
+            except Exception:
+                pass
+            return False
+
+        print(f"🔁 PCA basis of {table} changed ({old_basis or 'none'} → {new_basis or 'none'}) - "
+              f"re-embedding {stored} rows", file=sys.stderr)
+        if stored <= 0:
+            return True
+
+        def run():
+            try:
+                self._reembed_rows(table)
+            finally:
+                self._reembedding.discard(table)
+
+        self._reembedding.add(table)
+        threading.Thread(target=run, daemon=True, name=f"reembed-{table}").start()
+        return True
+
+    def _reembed_rows(self, table: str, batch_size: Optional[int] = None) -> Dict:
+        """
+        Walk a table's embedded rows in id order and overwrite each batch with
+        vectors from the current basis. Nothing is NULLed first, so the table
+        stays searchable throughout; a row whose text changed since it was read
+        (a concurrent writer already stored a fresh vector) is left alone.
+        """
+        conn = self._get_db_connection()
+        if not conn:
+            return {'error': 'Could not connect to database', 'processed': 0}
+
+        processed = 0
+        errors = 0
+        last_id = None
+        target_dims = self._get_table_dimensions(table)
+        columns = PostgresEmbeddingIndex.TEXT_COLUMNS[table]
+        unchanged = ' AND '.join(f"{c} IS NOT DISTINCT FROM %s" for c in columns)
+        with_hash = table in self._embedding_hash_tables()
+        set_sql = "embedding = %s::vector, embedding_hash = %s" if with_hash else "embedding = %s::vector"
+        update_sql = f"UPDATE {table} SET {set_sql} WHERE id = %s AND {unchanged}"
+        start_time = time.time()
+
+        try:
+            from psycopg2.extras import execute_batch
+            while True:
+                fetch_size = batch_size or get_adaptive_sizer().get_backfill_fetch_size()
+                cursor = conn.cursor()
+                if last_id is None:
+                    cursor.execute(f"""
+                        SELECT id, {', '.join(columns)} FROM {table}
+                        WHERE embedding IS NOT NULL
+                        ORDER BY id LIMIT %s
+                    """, (fetch_size,))
+                else:
+                    cursor.execute(f"""
+                        SELECT id, {', '.join(columns)} FROM {table}
+                        WHERE embedding IS NOT NULL AND id > %s
+                        ORDER BY id LIMIT %s
+                    """, (last_id, fetch_size))
+                rows = cursor.fetchall()
+                cursor.close()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                texts = [PostgresEmbeddingIndex.row_text(table, r[1:]) for r in rows]
+
+                try:
+                    truncated: List[bool] = []
+                    embeddings = self.embedder.embed_batch(
+                        texts,
+                        force_dims=target_dims,
+                        priority=EmbeddingPriority.LOW,
+                        request_class=f'reembed:{table}',
+                        truncated=truncated
+                    )
+                    if with_hash:
+                        hashes = self.embedder.embedding_hashes(texts, target_dims, table=table)
+                        hashes = [None if cut else h for h, cut in zip(hashes, truncated)]  # Capped: no reuse
+                        update_data = [(emb.tolist(), h, r[0], *r[1:]) for r, emb, h in zip(rows, embeddings, hashes)]
+                    else:
+                        update_data = [(emb.tolist(), r[0], *r[1:]) for r, emb in zip(rows, embeddings)]
+                    update_cursor = conn.cursor()
+                    execute_batch(update_cursor, update_sql, update_data, page_size=200)
+                    conn.commit()
+                    update_cursor.close()
+                    processed += len(rows)
+                except Exception as e:
+                    print(f"  ✗ Re-embed batch of {table} failed: {e}", file=sys.stderr)
+                    errors += len(rows)
+                    conn.rollback()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Re-embed of {table} stopped after {processed} rows: {e}", file=sys.stderr)
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return {'error': str(e), 'processed': processed}
+
+        total_time = time.time() - start_time
+        print(f"✅ Re-embedded {processed} {table} rows in {total_time:.1f}s", file=sys.stderr)
+        return {'status': 'completed', 'processed': processed, 'errors': errors, 'dimensions': target_dims}
+
     def _start_dimension_refresh_thread(self):
         """
         Start background thread to refresh dimension from database every 60 seconds.
@@ -2801,6 +6410,10 @@ class EmbeddingServer:
                 if self.shutdown_requested:
                     break
 
+                # Pick up projections published by --train-pca
+                self.embedder.check_published_projections()
+                self._check_projection_bases()
+
                 # Trigger dimension refresh in embedder
                 old_dims = self.embedder.dim_config.target_dims
                 changed = self.embedder._refresh_target_dimension()
@@ -2843,22 +6456,12 @@ class EmbeddingServer:
                 last_activity = max(server_last_time, throttler_last_time)
                 idle_time = time.time() - last_activity
                 # FIX: model is in self.embedder.model, not self.model!
-                if idle_time > self.idle_timeout and hasattr(self.embedder, 'model') and self.embedder.model is not None:
+                if idle_time > self.idle_timeout and (self.embedder.model is not None or self.embedder.accurate_model is not None):
                     print(f"💤 Idle for {idle_time:.0f}s (>{self.idle_timeout}s), PAUSING - unloading model to save RAM...", file=sys.stderr)
                     print(f"   Socket still listening - will lazy-load model on next request!", file=sys.stderr)
                     # Unload model to free RAM, but DON'T shutdown the server
                     try:
-                        del self.embedder.model
-                        self.embedder.model = None
-                        import gc
-                        gc.collect()
-                        # Try to free CUDA memory if available
-                        try:
-                            import torch
-                            if torch.cuda.is_available():
-                                torch.cuda.empty_cache()
-                        except:
-                            pass
+                        self.embedder.unload_model()
                         print(f"✅ Model unloaded - RAM freed. Server still running.", file=sys.stderr)
                     except Exception as e:
                         print(f"⚠️ Error unloading model: {e}", file=sys.stderr)
@@ -2910,16 +6513,7 @@ class EmbeddingServer:
             On next request, _ensure_model_loaded() will reload it."""
             try:
                 if hasattr(self.embedder, 'model') and self.embedder.model is not None:
-                    del self.embedder.model
-                    self.embedder.model = None
-                    import gc
-                    gc.collect()
-                    try:
-                        import torch
-                        if torch.cuda.is_available():
-                            torch.cuda.empty_cache()
-                    except Exception:
-                        pass
+                    self.embedder.unload_model()
                     print(f"[KYS-UNLOAD] Model released from memory. Socket still listening.", file=sys.stderr)
                     print(f"[KYS-UNLOAD] Model will reload on next embedding request.", file=sys.stderr)
                 else:
@@ -3023,12 +6617,13 @@ class EmbeddingServer:
         thread.start()
         print(f"   KYS Watchdog: ENABLED (mode={self.kys_mode}, timeout={self.kys_timeout}s)", file=sys.stderr)
 
-    def _process_codebase_files(self, batch_size: int = 200, limit: int = 0, project_path: str = None) -> Dict:
+    def _process_codebase_files(self, batch_size: Optional[int] = None, limit: int = 0, project_path: str = None) -> Dict:
         """
         Process codebase_files without embeddings.
         TRUE ADAPTABILITY: Detects codebase_files dimension dynamically!
         FAST BATCH PROCESSING: Large batches, minimal delays, CRITICAL priority
         NO LIMIT BY DEFAULT: limit=0 means process ALL files
+        AUTOTUNED FETCH: batch_size=None follows the adaptive sizer each round-trip
         Target: ~5000 files in under 2 minutes!
 
         project_path: Filter to only process files from this project (file_path LIKE 'project_path%')
@@ -3049,6 +6644,7 @@ class EmbeddingServer:
 
         # TRUE ADAPTABILITY: Use codebase_files dimension, not memories
         target_dims = self._get_table_dimensions('codebase_files')
+        hash_tables = self._embedding_hash_tables()
 
         try:
             # Get TOTAL count first for progress tracking
@@ -3083,13 +6679,14 @@ class EmbeddingServer:
 
             # Calculate how many to process (all if limit=0)
             to_process = total_missing if limit == 0 else min(limit, total_missing)
-            total_batches = (to_process + batch_size - 1) // batch_size
+            estimate_size = batch_size or get_adaptive_sizer().get_backfill_fetch_size()
+            total_batches = (to_process + estimate_size - 1) // estimate_size
             print(f"📂 Processing {to_process} files in ~{total_batches} batches...", file=sys.stderr)
 
             # CHUNKED FETCH: Keep fetching batches until done
             while processed < to_process:
                 batch_num += 1
-                fetch_size = min(batch_size, to_process - processed)
+                fetch_size = min(batch_size or get_adaptive_sizer().get_backfill_fetch_size(), to_process - processed)
 
                 # Fetch next batch - always gets files without embeddings
                 cursor = conn.cursor()
@@ -3115,26 +6712,37 @@ class EmbeddingServer:
                     break  # No more files to process
 
                 ids = [r[0] for r in rows]
-                texts = [f"{r[1]}\n{r[2]}" for r in rows]  # path + content
+                texts = [PostgresEmbeddingIndex.row_text('codebase_files', r[1:]) for r in rows]  # path + content
 
                 try:
                     # Generate embeddings - LOW priority to avoid CPU spikes during cold start
+                    truncated: List[bool] = []
                     embeddings = self.embedder.embed_batch(
                         texts,
                         force_dims=target_dims,
-                        priority=EmbeddingPriority.LOW
+                        priority=EmbeddingPriority.LOW,
+                        request_class='backfill:codebase_files',
+                        truncated=truncated
                     )
                     # Throttle between batches to keep CPU reasonable during startup
                     import time
                     time.sleep(0.5)
 
                     # Write back to database - BATCH UPDATE for max speed!
+                    # embedding_hash lets later re-indexes reuse these rows instead of re-embedding
                     from psycopg2.extras import execute_batch
                     update_cursor = conn.cursor()
-                    update_data = [(emb.tolist(), fid) for fid, emb in zip(ids, embeddings)]
+                    if 'codebase_files' in hash_tables:
+                        hashes = self.embedder.embedding_hashes(texts, target_dims, table='codebase_files')
+                        hashes = [None if cut else h for h, cut in zip(hashes, truncated)]  # Capped: no reuse
+                        update_data = [(emb.tolist(), h, fid) for fid, emb, h in zip(ids, embeddings, hashes)]
+                        update_sql = "UPDATE codebase_files SET embedding = %s::vector, embedding_hash = %s WHERE id = %s"
+                    else:
+                        update_data = [(emb.tolist(), fid) for fid, emb in zip(ids, embeddings)]
+                        update_sql = "UPDATE codebase_files SET embedding = %s::vector WHERE id = %s"
                     execute_batch(
                         update_cursor,
-                        "UPDATE codebase_files SET embedding = %s::vector WHERE id = %s",
+                        update_sql,
                         update_data,
                         page_size=200  # Batch 200 updates at once
                     )
@@ -3177,10 +6785,11 @@ class EmbeddingServer:
         except Exception as e:
             return {'error': str(e), 'processed': processed}
 
-    def _process_memories(self, batch_size: int = 50, limit: int = 1000) -> Dict:
+    def _process_memories(self, batch_size: Optional[int] = None, limit: int = 1000) -> Dict:
         """
         Process memories without embeddings.
         TRUE ADAPTABILITY: Detects memories dimension dynamically!
+        batch_size=None uses the autotuned encode batch size.
         """
         conn = self._get_db_connection()
         if not conn:
@@ -3190,6 +6799,7 @@ class EmbeddingServer:
         errors = 0
         # TRUE ADAPTABILITY: Use memories table dimension
         target_dims = self._get_table_dimensions('memories')
+        hash_tables = self._embedding_hash_tables()
         print(f"📐 Using {target_dims}D for memories (table-specific)", file=sys.stderr)
 
         try:
@@ -3207,34 +6817,53 @@ class EmbeddingServer:
             print(f"🧠 Processing {len(rows)} memories...", file=sys.stderr)
 
             # Process in batches
-            for i in range(0, len(rows), batch_size):
-                batch = rows[i:i + batch_size]
+            batch_num = 0
+            i = 0
+            while i < len(rows):
+                step = batch_size or get_adaptive_sizer().get_adaptive_batch_size()
+                batch = rows[i:i + step]
+                i += step
+                batch_num += 1
                 ids = [r[0] for r in batch]
-                texts = [r[1] for r in batch]
+                texts = [PostgresEmbeddingIndex.row_text('memories', r[1:]) for r in batch]
 
                 try:
                     # Generate embeddings
+                    truncated: List[bool] = []
                     embeddings = self.embedder.embed_batch(
                         texts,
                         force_dims=target_dims,
-                        priority=EmbeddingPriority.LOW
+                        priority=EmbeddingPriority.LOW,
+                        request_class='backfill:memories',
+                        truncated=truncated
                     )
 
-                    # Write back to database
+                    # Write back to database (with embedding_hash for later reuse)
                     update_cursor = conn.cursor()
+                    hashes = (self.embedder.embedding_hashes(texts, target_dims, table='memories')
+                              if 'memories' in hash_tables else None)
+                    if hashes is not None:
+                        hashes = [None if cut else h for h, cut in zip(hashes, truncated)]  # Capped: no reuse
                     for j, (mem_id, embedding) in enumerate(zip(ids, embeddings)):
                         embedding_list = embedding.tolist()
-                        update_cursor.execute("""
-                            UPDATE memories
-                            SET embedding = %s::vector
-                            WHERE id = %s
-                        """, (embedding_list, str(mem_id)))
+                        if hashes is not None:
+                            update_cursor.execute("""
+                                UPDATE memories
+                                SET embedding = %s::vector, embedding_hash = %s
+                                WHERE id = %s
+                            """, (embedding_list, hashes[j], str(mem_id)))
+                        else:
+                            update_cursor.execute("""
+                                UPDATE memories
+                                SET embedding = %s::vector
+                                WHERE id = %s
+                            """, (embedding_list, str(mem_id)))
                         processed += 1
 
                     conn.commit()
                     update_cursor.close()
 
-                    print(f"  ✓ Batch {i//batch_size + 1}: {len(batch)} memories", file=sys.stderr)
+                    print(f"  ✓ Batch {batch_num}: {len(batch)} memories", file=sys.stderr)
 
                 except Exception as e:
                     print(f"  ✗ Batch error: {e}", file=sys.stderr)
@@ -3255,12 +6884,13 @@ class EmbeddingServer:
         except Exception as e:
             return {'error': str(e), 'processed': processed}
 
-    def _process_code_definitions(self, batch_size: int = 200, limit: int = 0, project_path: str = None) -> Dict:
+    def _process_code_definitions(self, batch_size: Optional[int] = None, limit: int = 0, project_path: str = None) -> Dict:
         """
         FAST BATCH PROCESSING for code_definitions table.
         Generates embeddings from name + signature + docstring.
 
         NO LIMIT BY DEFAULT: limit=0 means process ALL definitions
+        AUTOTUNED FETCH: batch_size=None follows the adaptive sizer each round-trip
         CRITICAL priority = NO THROTTLING for max speed!
         Target: ~50,000 definitions in under 5 minutes!
 
@@ -3281,6 +6911,7 @@ class EmbeddingServer:
 
         # Use code_definitions dimension
         target_dims = self._get_table_dimensions('code_definitions')
+        hash_tables = self._embedding_hash_tables()
 
         try:
             # Get TOTAL count first for progress tracking
@@ -3313,13 +6944,14 @@ class EmbeddingServer:
 
             # Calculate how many to process (all if limit=0)
             to_process = total_missing if limit == 0 else min(limit, total_missing)
-            total_batches = (to_process + batch_size - 1) // batch_size
+            estimate_size = batch_size or get_adaptive_sizer().get_backfill_fetch_size()
+            total_batches = (to_process + estimate_size - 1) // estimate_size
             print(f"🔧 Processing {to_process} definitions in ~{total_batches} batches...", file=sys.stderr)
 
             # CHUNKED FETCH: Keep fetching batches until done
             while processed < to_process:
                 batch_num += 1
-                fetch_size = min(batch_size, to_process - processed)
+                fetch_size = min(batch_size or get_adaptive_sizer().get_backfill_fetch_size(), to_process - processed)
 
                 # Fetch next batch
                 cursor = conn.cursor()
@@ -3346,17 +6978,17 @@ class EmbeddingServer:
 
                 ids = [r[0] for r in rows]
                 # Create embedding text: type + name + signature + docstring + file
-                texts = [
-                    f"{r[1]} {r[2]}\n{r[3] or ''}\n{r[4] or ''}\nFile: {r[6]}\nLanguage: {r[5]}"
-                    for r in rows
-                ]
+                texts = [PostgresEmbeddingIndex.row_text('code_definitions', r[1:]) for r in rows]
 
                 try:
                     # Generate embeddings - LOW priority to avoid CPU spikes during cold start
+                    truncated: List[bool] = []
                     embeddings = self.embedder.embed_batch(
                         texts,
                         force_dims=target_dims,
-                        priority=EmbeddingPriority.LOW
+                        priority=EmbeddingPriority.LOW,
+                        request_class='backfill:code_definitions',
+                        truncated=truncated
                     )
                     import time
                     time.sleep(0.5)
@@ -3364,10 +6996,17 @@ class EmbeddingServer:
                     # Write back to database - BATCH UPDATE for max speed!
                     from psycopg2.extras import execute_batch
                     update_cursor = conn.cursor()
-                    update_data = [(emb.tolist(), str(fid)) for fid, emb in zip(ids, embeddings)]
+                    if 'code_definitions' in hash_tables:
+                        hashes = self.embedder.embedding_hashes(texts, target_dims, table='code_definitions')
+                        hashes = [None if cut else h for h, cut in zip(hashes, truncated)]  # Capped: no reuse
+                        update_data = [(emb.tolist(), h, str(fid)) for fid, emb, h in zip(ids, embeddings, hashes)]
+                        update_sql = "UPDATE code_definitions SET embedding = %s::vector, embedding_hash = %s WHERE id = %s"
+                    else:
+                        update_data = [(emb.tolist(), str(fid)) for fid, emb in zip(ids, embeddings)]
+                        update_sql = "UPDATE code_definitions SET embedding = %s::vector WHERE id = %s"
                     execute_batch(
                         update_cursor,
-                        "UPDATE code_definitions SET embedding = %s::vector WHERE id = %s",
+                        update_sql,
                         update_data,
                         page_size=200
                     )
@@ -3415,6 +7054,7 @@ class EmbeddingServer:
         - {"texts": [...]} -> Batch embeddings
         - {"text": "...", "dims": N} -> Force specific dimensions
         - {"text": "...", "priority": "critical"} -> Set request priority
+        - {"texts": [...], "table": "code_definitions"} -> Use that table's learned projection
         - {"stats": true}  -> Get statistics
         - {"refresh_dimension": true} -> Force dimension refresh from database
 
@@ -3424,6 +7064,18 @@ class EmbeddingServer:
         - {"type": "get_dimension"} -> Get dimension info
         - {"type": "set_dimension", "dimension": N} -> Set target dimension
 
+        Cache management:
+        - {"type": "cache_stats"} -> Size, tiers and entry histograms
+        - {"type": "cache_purge", "model": "...", "dims": N, "hash_prefix": "ab12"} -> Purge matches
+          (hash_prefix is a cache-key prefix: key = sha256(model_id:text)[:16] hex)
+        - {"type": "cache_compact"} -> Reclaim dead segment space now
+
+        Lazy egress expansion:
+        - {"texts": [...], "compact": true} -> Native vectors only, no expansion
+          (dims below native are served as regular compressed embeddings - expand can't produce them)
+        - {"type": "expand", "natives": [[...]], "texts": [...], "dims": N, "table": "..."}
+          -> Materialize target-dim embeddings (dims >= native) from compact vectors + their texts in bulk
+
         Priority levels: critical, high, medium (default), low, trivial
         """
         # BACKWARDS COMPATIBILITY: Handle "type" field from server.mjs/server.py clients
@@ -3472,6 +7124,22 @@ class EmbeddingServer:
                 return {'status': 'ok', 'dimension': new_dim}
             else:
                 return {'error': 'Invalid dimension value'}
+        elif req_type in ('cache_stats', 'cache_purge', 'cache_compact'):
+            cache = self.embedder.disk_cache
+            if cache is None:
+                return {'error': 'Disk cache is disabled'}
+            if req_type == 'cache_stats':
+                return {'cache': cache.get_stats(), 'histograms': cache.histograms(), 'models': dict(cache.models)}
+            if req_type == 'cache_purge':
+                dims = request.get('dims')
+                return cache.purge(
+                    model=request.get('model'),
+                    dims=int(dims) if dims is not None else None,
+                    hash_prefix=request.get('hash_prefix')
+                )
+            return cache.compact()
+        elif req_type == 'expand':
+            return self._handle_expand(request)
         elif req_type == 'embed':
             # Already handled by text/texts fields below
             pass
@@ -3480,7 +7148,8 @@ class EmbeddingServer:
             # Client sends: {type: 'batch_embed', texts: [...]}
             # Response: {embeddings: [[...], [...], ...]}
             pass
-        elif req_type and req_type not in ['embed', 'health', 'get_dimension', 'set_dimension', 'kys', 'batch_embed']:
+        elif req_type and req_type not in ['embed', 'health', 'get_dimension', 'set_dimension', 'kys', 'batch_embed',
+                                           'cache_stats', 'cache_purge', 'cache_compact', 'expand']:
             # Unknown type - return error
             return {'error': f'Unknown request type: {req_type}'}
 
@@ -3534,20 +7203,20 @@ class EmbeddingServer:
 
         # Process codebase files - generate embeddings for files without them
         if request.get('process_codebase'):
-            batch_size = request.get('batch_size', 200)  # Large batches for speed!
+            batch_size = request.get('batch_size')  # None = autotuned fetch size
             limit = request.get('limit', 0)  # 0 = ALL files, no limit!
             project_path = request.get('project_path')  # Per-project filtering
             return self._process_codebase_files(batch_size=batch_size, limit=limit, project_path=project_path)
 
         # Process memories - generate embeddings for memories without them
         if request.get('process_memories'):
-            batch_size = request.get('batch_size', 50)
+            batch_size = request.get('batch_size')  # None = autotuned batch size
             limit = request.get('limit', 1000)
             return self._process_memories(batch_size=batch_size, limit=limit)
 
         # Process code_definitions - FAST batch processing for semantic code search
         if request.get('process_code_definitions'):
-            batch_size = request.get('batch_size', 200)  # Larger batches for speed
+            batch_size = request.get('batch_size')  # None = autotuned fetch size
             limit = request.get('limit', 0)  # 0 = ALL, no limit by default!
             project_path = request.get('project_path')  # Per-project filtering
             return self._process_code_definitions(batch_size=batch_size, limit=limit, project_path=project_path)
@@ -3583,12 +7252,28 @@ class EmbeddingServer:
         # Force dimensions (any value supported)
         force_dims = request.get('dims')
 
+        compact = request.get('compact') and ('text' in request or 'texts' in request)
+        if compact and (force_dims or self.embedder._get_target_dims()) < self.embedder.dim_config.native_dims:
+            # Compression depends on the live PCA set, so expand won't serve it - project here instead
+            compact = False
+
+        if compact:
+            # Lazy egress: ship native vectors, the caller expands on demand with its texts
+            if 'texts' in request and 'priority' not in request:
+                priority = EmbeddingPriority.LOW
+            texts = [request['text']] if 'text' in request else request['texts']
+            response = self._compact_response(texts, force_dims, priority, request.get('tier'), request.get('table'))
+            response['priority'] = priority_str
+            return response
+
         if 'text' in request:
             # Single text
             embedding = self.embedder.embed_single(
                 request['text'],
                 force_dims=force_dims,
-                priority=priority
+                priority=priority,
+                tier=request.get('tier'),
+                table=request.get('table')
             )
             return {
                 'embedding': embedding.tolist(),
@@ -3608,7 +7293,9 @@ class EmbeddingServer:
             embeddings = self.embedder.embed_batch(
                 request['texts'],
                 force_dims=force_dims,
-                priority=priority
+                priority=priority,
+                tier=request.get('tier'),
+                table=request.get('table')
             )
             return {
                 'embeddings': embeddings.tolist(),
@@ -3622,6 +7309,45 @@ class EmbeddingServer:
         else:
             return {'error': 'Missing text or texts field'}
 
+    def _compact_response(self, texts: List[str], force_dims: Optional[int], priority: EmbeddingPriority,
+                          tier: Optional[str], table: Optional[str] = None) -> Dict:
+        """Native vectors only - a fixed native_dims per text; "expand" rehashes the caller's texts."""
+        natives = self.embedder.embed_batch_native(texts, priority=priority, tier=tier, table=table)
+        target_dims = force_dims or self.embedder._get_target_dims()
+        return {
+            'natives': natives.tolist(),
+            'native_dims': natives.shape[1] if len(natives) else self.embedder.dim_config.native_dims,
+            'dimensions': target_dims,
+            'target_dims': target_dims,
+            'transform_version': EMBEDDING_TRANSFORM_VERSION,
+            'model': 'frankenstein-v5-dynamic',
+            'count': len(natives)
+        }
+
+    def _handle_expand(self, request: Dict) -> Dict:
+        """Bulk egress expansion: natives + their texts -> target-dim embeddings."""
+        natives = request.get('natives')
+        if not natives:
+            return {'error': 'Missing natives field'}
+        if request.get('transform_version', EMBEDDING_TRANSFORM_VERSION) != EMBEDDING_TRANSFORM_VERSION:
+            return {'error': f"Stale transform_version (server is v{EMBEDDING_TRANSFORM_VERSION}) - re-embed"}
+        texts = request.get('texts')
+        if texts is None or len(texts) != len(natives):
+            return {'error': 'texts must match natives length'}
+        target_dims = request.get('dims') or self.embedder._get_target_dims()
+        native_dims = len(natives[0]) if isinstance(natives[0], list) else self.embedder.dim_config.native_dims
+        if target_dims < native_dims:
+            return {'error': f'expand only serves dims >= native ({native_dims}) - request compressed embeddings directly'}
+        embeddings = self.embedder.expand_natives(
+            np.asarray(natives, dtype=np.float32), target_dims, texts, request.get('table')
+        )
+        return {
+            'embeddings': embeddings.tolist(),
+            'dimensions': embeddings.shape[1],
+            'model': 'frankenstein-v5-dynamic',
+            'count': len(embeddings)
+        }
+
     def _handle_connection(self, conn):
         """
         Handle a single client connection in a separate thread.
@@ -3766,6 +7492,10 @@ class EmbeddingServer:
         server.listen(32)
         server.settimeout(60)  # 60 second timeout on accept to check shutdown
 
+        # Refill the RAM tier from access history while connections queue up
+        if self.embedder.disk_cache is not None:
+            self.embedder.disk_cache.start_warm()
+
         # Start idle monitor
         self._start_idle_monitor()
 
@@ -3842,6 +7572,120 @@ class EmbeddingServer:
             print(f"✅ Shutdown complete. Will restart on next embedding request.", file=sys.stderr)
 
 
+# ============================================================================
+# OFFLINE PCA TRAINING - `frankenstein-embeddings.py --train-pca`
+# ============================================================================
+# Streams the seed corpus (specmem_overflow.training_data, see seed_docs.py)
+# and/or the project's tables through the embedder in batches, fits every
+# target dim with one randomized SVD and publishes versioned artifact sets
+# that running servers hot-load (AdaptivePCA.check_published): a global set
+# from all streamed texts, plus one set per project table from its own texts.
+
+def _overflow_db_connection():
+    """Connection to the specmem_overflow database that seed_docs.py fills."""
+    import psycopg2
+    return psycopg2.connect(
+        host=os.environ.get('OVERFLOW_DB_HOST', os.environ.get('SPECMEM_DB_HOST', 'localhost')),
+        port=os.environ.get('OVERFLOW_DB_PORT', os.environ.get('SPECMEM_DB_PORT', '5432')),
+        dbname=os.environ.get('OVERFLOW_DB_NAME', 'specmem_overflow'),
+        user=os.environ.get('OVERFLOW_DB_USER', os.environ.get('SPECMEM_DB_USER', 'specmem_westayunprofessional')),
+        password=os.environ.get('OVERFLOW_DB_PASSWORD', os.environ.get('SPECMEM_DB_PASSWORD', 'specmem_westayunprofessional')),
+        connect_timeout=5
+    )
+
+
+def _stream_text_batches(conn, query: str, limit: int, batch_size: int):
+    """Yield lists of texts from a server-side cursor - the corpus never sits in RAM."""
+    cursor = conn.cursor(name=f"pca_train_{os.getpid()}")
+    cursor.itersize = batch_size
+    try:
+        cursor.execute(query + " LIMIT %s", (limit,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [row[0] for row in rows if row[0]]
+    finally:
+        cursor.close()
+
+
+# Text per row exactly as the backfill jobs build it, so projections see what gets stored
+_PCA_TRAINING_QUERIES = {
+    'training_data': "SELECT input_text FROM training_data WHERE input_text IS NOT NULL",
+    'memories': "SELECT content FROM memories WHERE content IS NOT NULL",
+    'codebase_files': "SELECT file_path || E'\\n' || content FROM codebase_files WHERE content IS NOT NULL",
+    'code_definitions': (
+        "SELECT definition_type || ' ' || name || E'\\n' || COALESCE(signature, '') || E'\\n' || "
+        "COALESCE(docstring, '') || E'\\nFile: ' || COALESCE(file_path, '') || E'\\nLanguage: ' || COALESCE(language, '') "
+        "FROM code_definitions"
+    ),
+}
+
+
+def train_pca_offline(embedder: 'FrankensteinEmbeddings', sources: List[str], dims_list: List[int],
+                      limit: int, batch_size: int) -> int:
+    """
+    Embed up to `limit` texts per source, fit projections and publish them.
+    The global set is always fitted; per-table sets only with SPECMEM_PCA_PER_TABLE=1.
+    Returns the number of artifact sets published (0 = none).
+    """
+    by_source: Dict[str, np.ndarray] = {}
+    for source in sources:
+        connect = _overflow_db_connection if source == 'training_data' else embedder._get_db_connection
+        try:
+            conn = connect()
+        except Exception as e:
+            conn = None
+            print(f"⚠️ {source}: {e}", file=sys.stderr)
+        if conn is None:
+            print(f"⚠️ Skipping {source}: no database connection", file=sys.stderr)
+            continue
+        natives: List[np.ndarray] = []
+        embedded = 0
+        try:
+            for texts in _stream_text_batches(conn, _PCA_TRAINING_QUERIES[source], limit, batch_size):
+                batch = embedder.embed_batch_native(texts, request_class=f'backfill:{source}', tier='fast')
+                natives.append(batch)
+                embedded += len(batch)
+                print(f"   {source}: {embedded}/{limit} embedded", file=sys.stderr)
+        finally:
+            conn.close()
+        if natives:
+            by_source[source] = np.concatenate(natives)
+
+    if not by_source:
+        print("❌ No training texts found - run seed_docs.py --seed first", file=sys.stderr)
+        return 0
+
+    info = {
+        'model': embedder._model_identity('fast'),
+        'sources': {source: int(len(X)) for source, X in by_source.items()},
+    }
+    fits = [(None, np.concatenate(list(by_source.values())))]
+    if os.environ.get('SPECMEM_PCA_PER_TABLE', '0') == '1':
+        fits += [(source, X) for source, X in by_source.items() if source in PostgresEmbeddingIndex.TABLES]
+
+    published = 0
+    for scope, X in fits:
+        label = scope or 'global'
+        print(f"🎓 Fitting {label} PCA {dims_list} on {len(X)} x {X.shape[1]} (randomized SVD)...", file=sys.stderr)
+        start = time.time()
+        models = fit_pca_projections(X, dims_list)
+        if not models:
+            print(f"⚠️ {label}: no target dims fit {len(X)} samples of {X.shape[1]}D", file=sys.stderr)
+            continue
+        for dims, projection in sorted(models.items()):
+            print(f"  ✅ PCA-{dims}: {projection.explained_variance_ratio.sum()*100:.1f}% variance", file=sys.stderr)
+        version = AdaptivePCA.publish(embedder.cache_dir, models, dict(
+            info, scope=label, native_dims=int(X.shape[1]), samples=int(len(X)),
+            fit_seconds=round(time.time() - start, 2)
+        ), scope=scope)
+        print(f"📦 Published {label} PCA v{version} to "
+              f"{AdaptivePCA.scope_dir(embedder.cache_dir, scope) / 'published'}", file=sys.stderr)
+        published += 1
+    return published
+
+
 def main():
     import argparse
 
@@ -3929,6 +7773,35 @@ def main():
         action='store_true',
         help='QQMS v2: Enable PostgreSQL overflow queue for durability'
     )
+    # Offline PCA training (never runs inside the server)
+    parser.add_argument(
+        '--train-pca',
+        action='store_true',
+        help='Fit PCA projections from the training corpus, publish them and exit'
+    )
+    parser.add_argument(
+        '--pca-source',
+        default='training_data',
+        choices=['training_data', 'memories', 'codebase_files', 'code_definitions', 'all'],
+        help='--train-pca corpus: specmem_overflow.training_data, one project table, or all of them'
+    )
+    parser.add_argument(
+        '--pca-dims',
+        default='256,384,512,768,1024,1536',
+        help='--train-pca target dimensions, comma separated'
+    )
+    parser.add_argument(
+        '--pca-limit',
+        type=int,
+        default=50000,
+        help='--train-pca maximum texts to embed per source (default: 50000)'
+    )
+    parser.add_argument(
+        '--pca-batch',
+        type=int,
+        default=256,
+        help='--train-pca texts fetched and embedded per batch (default: 256)'
+    )
 
     args = parser.parse_args()
 
@@ -3942,6 +7815,23 @@ def main():
     _resource_config = ResourceConfig()
     _adaptive_sizer = AdaptiveBatchSizer(_resource_config)
 
+    if args.train_pca:
+        embedder = FrankensteinEmbeddings(
+            db_config={
+                'host': args.db_host,
+                'port': args.db_port,
+                'database': args.db_name,
+                'user': args.db_user,
+                'password': args.db_password
+            },
+            enable_adaptive_pca=False,
+            enable_throttling=False
+        )
+        sources = list(_PCA_TRAINING_QUERIES) if args.pca_source == 'all' else [args.pca_source]
+        dims_list = [int(d) for d in args.pca_dims.split(',') if d.strip()]
+        published = train_pca_offline(embedder, sources, dims_list, args.pca_limit, args.pca_batch)
+        sys.exit(0 if published else 1)
+
     print("=" * 70, file=sys.stderr)
     print(f"FRANKENSTEIN EMBEDDINGS v5 - Project: {PROJECT_DIR_NAME}", file=sys.stderr)
     print("=" * 70, file=sys.stderr)